@@ -2,27 +2,43 @@ from __future__ import annotations
 
 import asyncio
 import base64
+import bisect
+import concurrent.futures
+import copy
+import ctypes
+import ctypes.util
 import fcntl
+import hashlib
+import heapq
+import io
+import itertools
 import json
 import logging
+import math
 import os
 import pty
 import re
+import select
 import shlex
 import shutil
+import signal
+import socket
 import subprocess
 import struct
 import termios
 import tempfile
 import threading
 import time
-from collections import deque
+import uuid
+import weakref
+import zlib
+from collections import OrderedDict, deque
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional
+from typing import Awaitable, Callable, Optional
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, UploadFile, File, Form, HTTPException
-from fastapi.responses import Response
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect, UploadFile, File, Form, HTTPException
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 
 app = FastAPI()
@@ -33,6 +49,7 @@ CONFIG_PATH = Path(
 ).expanduser()
 REPO_ROOT = Path(__file__).resolve().parents[2]
 LIVE_HELPER_PACKAGE = "com.meinzeug.codexspeech.viewer.live"
+VIEWER_PACKAGE = "com.meinzeug.codexspeech.viewer"
 LIVE_HELPER_APK = REPO_ROOT / "apps" / "android-viewer-live" / "app" / "build" / "outputs" / "apk" / "debug" / "app-debug.apk"
 VIEWER_APK = REPO_ROOT / "apps" / "android-viewer" / "app" / "build" / "outputs" / "apk" / "debug" / "app-debug.apk"
 GRADLE_VIEWER = REPO_ROOT / "apps" / "android-viewer" / "gradle-8.5" / "bin" / "gradle"
@@ -42,6 +59,88 @@ ANDROID_LIVE_DIR = REPO_ROOT / "apps" / "android-viewer-live"
 
 CURSOR_POS_QUERY = b"\x1b[6n"
 
+H264_START_CODE = b"\x00\x00\x00\x01"
+LIVE_STREAM_BIT_RATE = int(os.environ.get("LIVE_STREAM_BIT_RATE", "4000000"))
+LIVE_STREAM_QUEUE_SIZE = 240
+LIVE_STREAM_GOP_LIMIT = 8 * 1024 * 1024
+
+RUNNER_LOG_LINES = 2000
+RUNNER_LOG_LEGACY_LINES = 400
+RUNNER_LOG_BATCH = 1000
+RUNNER_LOG_DIR = Path(
+    os.environ.get("CODEX_RUNNER_LOG_DIR", str(CONFIG_PATH.parent / "runner-logs"))
+).expanduser()
+RUNNER_LOG_RUNS = 30
+RUNNER_LOG_SEGMENT_BYTES = 4 * 1024 * 1024
+RUNNER_LOG_SEGMENTS = 16
+RUNNER_LOG_INDEX_STRIDE = 128
+RUNNER_LOG_INDEX_RECORD = struct.Struct("<QQd")
+FLUTTER_COMMAND = os.environ.get("CODEX_FLUTTER_CMD", "flutter")
+FLUTTER_RELOAD_TIMEOUT = 60.0
+FLUTTER_RELOAD_HISTORY = 50
+PROJECT_INDEX_TTL = 300.0
+PROJECT_INDEX_MAX_NODES = 200_000
+PROJECT_SCAN_WORKERS = 8
+PROJECT_SCAN_BUDGET = 30.0
+DIR_LISTING_TTL = 5.0
+DIR_LISTING_CACHE_SIZE = 256
+DIR_LISTING_MAX_LIMIT = 2000
+DIR_TREE_MAX_DEPTH = 4
+DIR_TREE_MAX_ENTRIES = 2000
+DIR_BATCH_MAX_OPERATIONS = 500
+DIR_DELETE_INLINE_SECONDS = 2.0
+DIR_DELETE_PROGRESS_EVERY = 1000
+DIR_INDEX_MAX_DEPTH = 6
+DIR_INDEX_MAX_DIRS = 200_000
+# Share of fs.inotify.max_user_watches the index may take; the rest stays with editors and other tools.
+DIR_INDEX_WATCH_SHARE = 0.75
+DIR_INDEX_RESCAN_INTERVAL = 300.0
+DIR_USAGE_PATH = CONFIG_PATH.parent / "dir-usage.json"
+DIR_FRECENCY_HALF_LIFE = 7 * 24 * 3600.0
+DIR_FRECENCY_WEIGHT = 4.0
+DIR_SUGGEST_PREFIX_CHARS = 2
+PROJECT_SCAN_SKIP = frozenset(
+    {
+        ".git",
+        ".idea",
+        ".vscode",
+        ".gradle",
+        "node_modules",
+        "build",
+        "dist",
+        ".venv",
+        "venv",
+        "__pycache__",
+        ".cache",
+        ".android",
+        ".flutter-plugins",
+        ".flutter-plugins-dependencies",
+        "android/.gradle",
+        "ios/Pods",
+    }
+)
+
+ADB_SERVER_HOST = os.environ.get("ADB_SERVER_HOST", "127.0.0.1")
+ADB_SERVER_PORT = int(os.environ.get("ANDROID_ADB_SERVER_PORT", "5037"))
+ADB_NATIVE = os.environ.get("CODEX_ADB_NATIVE", "1") != "0"
+ADB_SHELL_POOL_SIZE = 4
+ADB_SHELL_TIMEOUT = 120.0
+ADB_COMMAND_TIMEOUT = 120.0
+ADB_INSTALL_TIMEOUT = 600.0
+ADB_BINARY_OUTPUT_LIMIT = 256 * 1024 * 1024
+
+COMMAND_CONCURRENCY = {
+    "default": 4,
+    "adb": 16,
+    "adb-install": 2,
+    "build": 1,
+    "git": 1,
+    "pm2": 1,
+    "encode": 2,
+}
+COMMAND_OUTPUT_LIMIT = 1024 * 1024
+DISCONNECT_POLL_INTERVAL = 0.5
+
 STT_MODEL_NAME = os.environ.get("STT_MODEL", "small")
 STT_DEVICE = os.environ.get("STT_DEVICE", "cpu")
 STT_COMPUTE_TYPE = os.environ.get("STT_COMPUTE_TYPE", "int8")
@@ -62,6 +161,21 @@ class DirRenameRequest(BaseModel):
 class DirDeleteRequest(BaseModel):
     path: str
     recursive: bool = False
+    # Answer 202 with the job when a recursive delete outlasts DIR_DELETE_INLINE_SECONDS.
+    background: bool = False
+
+
+class DirBatchOperation(BaseModel):
+    op: str
+    path: Optional[str] = None
+    src: Optional[str] = None
+    dst: Optional[str] = None
+    recursive: bool = False
+
+
+class DirBatchRequest(BaseModel):
+    operations: list[DirBatchOperation]
+    stop_on_error: bool = False
 
 
 class RunnerStartRequest(BaseModel):
@@ -124,11 +238,255 @@ class LiveKeyRequest(BaseModel):
     keycode: int
 
 
+class LiveScriptStep(BaseModel):
+    op: str
+    x: Optional[int] = None
+    y: Optional[int] = None
+    x2: Optional[int] = None
+    y2: Optional[int] = None
+    duration_ms: Optional[int] = None
+    text: Optional[str] = None
+    keycode: Optional[int] = None
+    ms: Optional[int] = None
+
+
+class LiveScriptRequest(BaseModel):
+    device_id: Optional[str] = None
+    steps: list[LiveScriptStep] = []
+    name: Optional[str] = None
+    save_as: Optional[str] = None
+
+
+class LiveRecordRequest(BaseModel):
+    device_id: Optional[str] = None
+    name: Optional[str] = None
+
+
 class SettingsPayload(BaseModel):
     terminal: Optional[dict] = None
     stt: Optional[dict] = None
 
 
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+METRICS_RATIO_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 5.0)
+
+
+def _format_metric_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    value = float(value)
+    return str(int(value)) if value.is_integer() and abs(value) < 1e15 else repr(value)
+
+
+def _escape_label_value(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape_label_value(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Metric:
+    """One metric family; label values are passed positionally in `labelnames` order."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        self._values: dict[tuple, float] = {}
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_metric_value(value)}" for key, value in items]
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, *labels) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), callback=None):
+        super().__init__(name, help, labelnames)
+        # Called at scrape time; returns {label values: value} for state that lives elsewhere.
+        self.callback: Optional[Callable[[], dict[tuple, float]]] = callback
+
+    def set(self, value: float, *labels) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, amount: float = 1.0, *labels) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, *labels) -> None:
+        self.inc(-amount, *labels)
+
+    def samples(self) -> list[str]:
+        if self.callback is None:
+            return super().samples()
+        try:
+            items = sorted(self.callback().items())
+        except Exception:
+            logger.exception("Metric callback for %s failed", self.name)
+            return []
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_metric_value(value)}" for key, value in items]
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = METRICS_LATENCY_BUCKETS
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket (not cumulative) counts, then sum and count.
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = sorted((key, ([*counts], total, count)) for key, (counts, total, count) in self._series.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_metric_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_metric_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Metrics rendered by /metrics in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: tuple[str, ...] = (), callback=None) -> Gauge:
+        return self.register(Gauge(name, help, labelnames, callback))
+
+    def histogram(
+        self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = METRICS_LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+HTTP_REQUEST_DURATION = METRICS.histogram(
+    "codex_http_request_duration_seconds", "HTTP request latency until the response is sent.", ("method", "route", "status")
+)
+HTTP_REQUESTS_IN_FLIGHT = METRICS.gauge("codex_http_requests_in_flight", "HTTP requests being handled.")
+PTY_SESSIONS = METRICS.gauge("codex_pty_sessions", "Active Codex terminal sessions.")
+PTY_SESSIONS_TOTAL = METRICS.counter("codex_pty_sessions_total", "Codex terminal sessions started.")
+PTY_OUTPUT_BYTES = METRICS.counter("codex_pty_output_bytes_total", "Bytes read from Codex terminals.")
+PTY_INPUT_BYTES = METRICS.counter("codex_pty_input_bytes_total", "Bytes written to Codex terminals.")
+PTY_FRAMES = METRICS.counter("codex_pty_frames_total", "WebSocket messages sent to terminal clients.")
+STT_QUEUE_DEPTH = METRICS.gauge("codex_stt_queue_depth", "Transcriptions waiting or running.")
+STT_REQUESTS = METRICS.counter("codex_stt_requests_total", "Transcription requests by outcome.", ("status",))
+STT_DURATION = METRICS.histogram("codex_stt_duration_seconds", "Time spent transcribing one file.")
+STT_AUDIO_SECONDS = METRICS.counter("codex_stt_audio_seconds_total", "Seconds of audio transcribed.")
+STT_REAL_TIME_FACTOR = METRICS.histogram(
+    "codex_stt_real_time_factor", "Transcription time divided by audio duration.", buckets=METRICS_RATIO_BUCKETS
+)
+ADB_COMMAND_DURATION = METRICS.histogram(
+    "codex_adb_command_duration_seconds", "adb command latency.", ("command", "transport")
+)
+ADB_COMMAND_ERRORS = METRICS.counter("codex_adb_command_errors_total", "Failed adb commands.", ("command",))
+LIVE_SNAPSHOT_CAPTURE = METRICS.histogram("codex_live_snapshot_capture_seconds", "Screen capture time per snapshot.")
+LIVE_SNAPSHOT_ENCODE = METRICS.histogram(
+    "codex_live_snapshot_encode_seconds", "Frame encode time on snapshot cache misses.", ("format",)
+)
+LIVE_SNAPSHOTS = METRICS.counter("codex_live_snapshots_total", "Snapshot responses by result.", ("result",))
+LIVE_SNAPSHOT_BYTES = METRICS.counter("codex_live_snapshot_bytes_total", "Snapshot bytes sent.")
+RUNNER_OUTPUT_LINES = METRICS.counter("codex_runner_output_lines_total", "Lines of runner process output.", ("process",))
+RUNNER_EXITS = METRICS.counter("codex_runner_exits_total", "Runner processes that exited.", ("process",))
+
+
+def adb_command_label(args: list[str]) -> str:
+    """The adb subcommand, e.g. `shell` for `-s emulator-5554 shell ...`."""
+    if len(args) >= 2 and args[0] == "-s":
+        args = args[2:]
+    return args[0] if args else ""
+
+
+class MetricsMiddleware:
+    """Per-route request latency; the route is the path template, so ids do not explode cardinality."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                route = scope.get("route")
+                HTTP_REQUEST_DURATION.observe(
+                    time.perf_counter() - started,
+                    scope["method"],
+                    getattr(route, "path", "unmatched"),
+                    str(status),
+                )
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+
+
+app.add_middleware(MetricsMiddleware)
+
+
 class HeadlessPTY:
     def __init__(self, command: list[str], cwd: Path, env: dict[str, str]):
         self.command = command
@@ -188,6 +546,11 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+def metrics():
+    return Response(content=METRICS.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 def expand_dir_path(value: str) -> Path:
     if not value:
         return Path.home()
@@ -197,7 +560,66 @@ def expand_dir_path(value: str) -> Path:
     return (Path.home() / raw).resolve()
 
 
-def list_directory_suggestions(query: Optional[str], limit: int = 200) -> dict:
+class DirListingCache:
+    """Sorted subdirectory names per directory, reused while the directory's mtime is unchanged.
+
+    Entries also expire after `ttl` seconds, so changes the mtime does not
+    reflect (a symlink target appearing, coarse mtime resolution) show up soon.
+    """
+
+    def __init__(self, ttl: float = DIR_LISTING_TTL, size: int = DIR_LISTING_CACHE_SIZE):
+        self.ttl = ttl
+        self.size = size
+        self._lock = threading.Lock()
+        self._entries: dict[str, tuple[int, float, list[str]]] = {}
+        self.reads = 0
+
+    def names(self, base: Path) -> list[str]:
+        key = str(base)
+        mtime_ns = base.stat().st_mtime_ns
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(key)
+        if cached and cached[0] == mtime_ns and now - cached[1] < self.ttl:
+            return cached[2]
+        self.reads += 1
+        names = []
+        with os.scandir(base) as entries:
+            for entry in entries:
+                try:
+                    # d_type answers this for everything but symlinks
+                    if entry.is_dir():
+                        names.append(entry.name)
+                except OSError:
+                    continue
+        # Sorted once per read so pages and prefixes are found by bisection.
+        names.sort()
+        with self._lock:
+            self._entries.pop(key, None)
+            if len(self._entries) >= self.size:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = (mtime_ns, now, names)
+        return names
+
+    def invalidate(self, path: Optional[Path] = None) -> None:
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(str(path), None)
+
+
+DIR_LISTINGS = DirListingCache()
+# Cursor for the page after a first page that only held the parent entry; no name contains a slash.
+DIR_CURSOR_START = "/"
+
+
+def list_directory_suggestions(query: Optional[str], limit: int = 200, cursor: Optional[str] = None) -> dict:
+    """Subdirectories of the queried directory in name order, one page at a time.
+
+    Pass the returned `next_cursor` back as `cursor` to get the following page.
+    The parent directory is listed first on the first page only and counts toward `limit`.
+    """
     raw = (query or "").strip()
     if not raw:
         base = Path.home()
@@ -214,31 +636,546 @@ def list_directory_suggestions(query: Optional[str], limit: int = 200) -> dict:
         raise HTTPException(status_code=404, detail=f"Directory not found: {base}")
     if not base.is_dir():
         raise HTTPException(status_code=400, detail=f"Not a directory: {base}")
+    limit = max(1, min(limit, DIR_LISTING_MAX_LIMIT))
 
-    dirs = []
     try:
-        for child in base.iterdir():
-            if child.is_dir() and child.name.startswith(prefix):
-                dirs.append(str(child))
+        names = DIR_LISTINGS.names(base)
     except PermissionError as exc:
         raise HTTPException(status_code=403, detail=str(exc)) from exc
 
-    dirs.sort()
-    if base.parent != base:
-        parent = str(base.parent)
-        if parent not in dirs:
-            dirs.insert(0, parent)
-    return {"base": str(base), "dirs": dirs[:limit]}
+    dirs = []
+    if not cursor and base.parent != base:
+        dirs.append(str(base.parent))
+    wanted = limit - len(dirs)
+    start = bisect.bisect_left(names, prefix)
+    if cursor and cursor != DIR_CURSOR_START:
+        start = max(start, bisect.bisect_right(names, cursor))
+    page = []
+    for name in names[start : start + wanted + 1]:
+        if not name.startswith(prefix):
+            break
+        page.append(name)
+    if len(page) > wanted:
+        next_cursor = page[wanted - 1] if wanted else DIR_CURSOR_START
+    else:
+        next_cursor = None
+    dirs.extend(str(base / name) for name in page[:wanted])
+    return {"base": str(base), "dirs": dirs, "next_cursor": next_cursor}
+
+
+def char_mask(text: str) -> int:
+    """64-bit set of the characters in `text`; a match needs all query bits present."""
+    mask = 0
+    for char in set(text):
+        mask |= 1 << (ord(char) & 63)
+    return mask
+
+
+def _subsequence(query: str, text: str, start: int) -> Optional[list[int]]:
+    positions = []
+    pos = start
+    for char in query:
+        pos = text.find(char, pos)
+        if pos < 0:
+            return None
+        positions.append(pos)
+        pos += 1
+    return positions
+
+
+def fuzzy_match_score(query: str, text: str) -> Optional[float]:
+    """Score `query` as a subsequence of `text` (both lowercase), or None if it does not match.
+
+    Matches inside the last path component, at word starts and in consecutive
+    runs score higher; long paths and spread-out matches score lower.
+    """
+    name_start = text.rfind("/") + 1
+    positions = _subsequence(query, text, name_start)
+    score = 5.0 if positions is not None else 0.0
+    if positions is None:
+        positions = _subsequence(query, text, 0)
+        if positions is None:
+            return None
+    previous = -2
+    for pos in positions:
+        if pos == previous + 1:
+            score += 3.0
+        if pos == 0 or text[pos - 1] in "/-_. ":
+            score += 2.0
+        previous = pos
+    score -= (positions[-1] - positions[0]) * 0.05
+    score -= len(text) * 0.01
+    return score
+
+
+def inotify_watch_budget() -> int:
+    """Watches the directory index may add, derived from the per-user inotify limit."""
+    try:
+        limit = int(Path("/proc/sys/fs/inotify/max_user_watches").read_text())
+    except (OSError, ValueError):
+        limit = 8192
+    return max(1, min(DIR_INDEX_MAX_DIRS, int(limit * DIR_INDEX_WATCH_SHARE)))
+
+
+class InotifyWatcher:
+    """Directory create/delete/move events from inotify(7), called through ctypes."""
+
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ONLYDIR = 0x01000000
+    IN_ISDIR = 0x40000000
+    MASK = IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_ONLYDIR
+    EVENT = struct.Struct("iIII")
+
+    def __init__(self, callback: Callable[[str, str, int], None], max_watches: Optional[int] = None):
+        self.callback = callback
+        self.max_watches = max_watches or inotify_watch_budget()
+        self.exhausted = False
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self._fd = self._libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._lock = threading.Lock()
+        self._paths: dict[int, str] = {}
+        self._wds: dict[str, int] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="dir-watch", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=2)
+        os.close(self._fd)
+
+    def add(self, path: str) -> bool:
+        with self._lock:
+            if path in self._wds:
+                return True
+            if len(self._wds) >= self.max_watches:
+                self.exhausted = True
+                return False
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), self.MASK)
+            if wd < 0:
+                # ENOSPC means fs.inotify.max_user_watches is used up
+                self.exhausted = self.exhausted or ctypes.get_errno() == 28
+                return False
+            self._paths[wd] = path
+            self._wds[path] = wd
+            return True
+
+    def remove(self, paths: list[str]) -> None:
+        with self._lock:
+            for path in paths:
+                wd = self._wds.pop(path, None)
+                if wd is not None:
+                    self._paths.pop(wd, None)
+                    self._libc.inotify_rm_watch(self._fd, wd)
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._wds)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            ready, _, _ = select.select([self._fd], [], [], 0.5)
+            if not ready:
+                continue
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            except OSError:
+                return
+            offset = 0
+            while offset + self.EVENT.size <= len(data):
+                wd, mask, _cookie, length = self.EVENT.unpack_from(data, offset)
+                raw_name = data[offset + self.EVENT.size : offset + self.EVENT.size + length]
+                offset += self.EVENT.size + length
+                with self._lock:
+                    parent = self._paths.get(wd)
+                    if mask & self.IN_IGNORED and parent is not None:
+                        self._paths.pop(wd, None)
+                        self._wds.pop(parent, None)
+                if mask & self.IN_Q_OVERFLOW:
+                    parent = ""
+                if parent is None or mask & self.IN_IGNORED:
+                    continue
+                try:
+                    self.callback(parent, os.fsdecode(raw_name.rstrip(b"\0")), mask)
+                except Exception:
+                    logger.exception("Directory watch callback failed")
+
+
+class DirIndex:
+    """Directories under the configured roots, ranked by fuzzy match and frecency.
+
+    The index is built once in a background thread, then kept current from
+    inotify events; where inotify is unavailable or out of watches it is
+    rebuilt every DIR_INDEX_RESCAN_INTERVAL seconds instead. Usage comes from
+    the working directories Codex sessions start in.
+    """
+
+    def __init__(
+        self,
+        roots: Optional[list[Path]] = None,
+        usage_path: Path = DIR_USAGE_PATH,
+        max_depth: int = DIR_INDEX_MAX_DEPTH,
+        max_dirs: int = DIR_INDEX_MAX_DIRS,
+    ):
+        self._roots = roots
+        self.usage_path = usage_path
+        self.max_depth = max_depth
+        self.max_dirs = max_dirs
+        self.home = str(Path.home())
+        self._lock = threading.Lock()
+        self._entries: dict[str, tuple[str, int]] = {}
+        # Indexed paths by parent, so removing a subtree only visits that subtree.
+        self._children: dict[str, set[str]] = {}
+        # Indexed paths by the first DIR_SUGGEST_PREFIX_CHARS characters of their name.
+        self._prefixes: dict[str, set[str]] = {}
+        self._root_texts: list[str] = []
+        self._usage: Optional[dict[str, list[float]]] = None
+        self._recent: dict[str, list[str]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.watcher: Optional[InotifyWatcher] = None
+        self.ready = False
+        self.built_at: Optional[float] = None
+
+    def roots(self) -> list[Path]:
+        if self._roots is not None:
+            return self._roots
+        env_roots = os.environ.get("CODEX_DIR_ROOTS")
+        if env_roots:
+            values = env_roots.split(os.pathsep)
+        else:
+            values = (load_config().get("dirs", {}) or {}).get("roots") or ["~"]
+        return [Path(value).expanduser() for value in values if value]
+
+    def ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="dir-index", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self.watcher:
+            self.watcher.stop()
+            self.watcher = None
+
+    def wait_ready(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while not self.ready and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self.ready
+
+    def _run(self) -> None:
+        try:
+            self.watcher = InotifyWatcher(self._on_event)
+            self.watcher.start()
+        except OSError as exc:
+            logger.info("Directory index falls back to rescans: %s", exc)
+            self.watcher = None
+        while not self._stop.is_set():
+            try:
+                self.rebuild()
+            except Exception:
+                logger.exception("Directory index build failed")
+            if self.watcher and not self.watcher.exhausted:
+                return
+            self._stop.wait(DIR_INDEX_RESCAN_INTERVAL)
+
+    def rebuild(self) -> None:
+        roots = self.roots()
+        # Read once per build: inotify events resolve their depth against these.
+        self._root_texts = [str(root).rstrip("/") for root in roots]
+        entries: dict[str, tuple[str, int]] = {}
+        for root in roots:
+            self._walk(str(root), entries)
+        children: dict[str, set[str]] = {}
+        prefixes: dict[str, set[str]] = {}
+        self._link(entries, children, prefixes)
+        with self._lock:
+            self._entries = entries
+            self._children = children
+            self._prefixes = prefixes
+            self._recent.clear()
+        self.built_at = time.time()
+        self.ready = True
+
+    def _walk(self, root: str, entries: dict[str, tuple[str, int]], depth: int = 0) -> None:
+        queue: deque[tuple[str, int]] = deque([(root, depth)])
+        while queue and len(entries) < self.max_dirs:
+            current, level = queue.popleft()
+            if current in entries or not os.path.isdir(current):
+                continue
+            entries[current] = self._entry(current)
+            if self.watcher:
+                self.watcher.add(current)
+            if level >= self.max_depth:
+                continue
+            try:
+                with os.scandir(current) as children:
+                    for child in children:
+                        if child.name.startswith(".") or child.name in PROJECT_SCAN_SKIP:
+                            continue
+                        if child.is_dir(follow_symlinks=False):
+                            queue.append((child.path, level + 1))
+            except OSError:
+                continue
+
+    def _entry(self, path: str) -> tuple[str, int]:
+        text = path.lower()
+        if path == self.home or path.startswith(self.home + "/"):
+            text = "~" + text[len(self.home) :]
+        return text, char_mask(text)
+
+    @staticmethod
+    def _name_prefixes(text: str) -> list[str]:
+        name = text[text.rfind("/") + 1 :]
+        return [name[:length] for length in range(1, min(len(name), DIR_SUGGEST_PREFIX_CHARS) + 1)]
+
+    @classmethod
+    def _link(
+        cls, entries: dict[str, tuple[str, int]], children: dict[str, set[str]], prefixes: dict[str, set[str]]
+    ) -> None:
+        for path, (text, _) in entries.items():
+            children.setdefault(os.path.dirname(path), set()).add(path)
+            for prefix in cls._name_prefixes(text):
+                prefixes.setdefault(prefix, set()).add(path)
+
+    def _add_entries(self, added: dict[str, tuple[str, int]]) -> None:
+        """Merge newly found directories into the index; the caller holds the lock."""
+        self._entries.update(added)
+        self._link(added, self._children, self._prefixes)
+        # Cached candidate lists would miss the new paths (removed ones are skipped at search time).
+        self._recent.clear()
+
+    def _depth(self, path: str) -> int:
+        for root_text in self._root_texts:
+            if path.startswith(root_text + "/"):
+                return path[len(root_text) :].count("/")
+        return self.max_depth
+
+    def _on_event(self, parent: str, name: str, mask: int) -> None:
+        if not parent:
+            # The kernel queue overflowed; events were lost.
+            threading.Thread(target=self.rebuild, name="dir-index", daemon=True).start()
+            return
+        if not mask & InotifyWatcher.IN_ISDIR or name.startswith(".") or name in PROJECT_SCAN_SKIP:
+            return
+        path = os.path.join(parent, name)
+        if mask & (InotifyWatcher.IN_CREATE | InotifyWatcher.IN_MOVED_TO):
+            added: dict[str, tuple[str, int]] = {}
+            self._walk(path, added, self._depth(path))
+            with self._lock:
+                self._add_entries(added)
+        elif mask & (InotifyWatcher.IN_DELETE | InotifyWatcher.IN_MOVED_FROM):
+            self._remove_tree(path)
+
+    def _remove_tree(self, path: str) -> None:
+        removed = []
+        with self._lock:
+            siblings = self._children.get(os.path.dirname(path))
+            if siblings is not None:
+                siblings.discard(path)
+            stack = [path]
+            while stack:
+                item = stack.pop()
+                stack.extend(self._children.pop(item, ()))
+                entry = self._entries.pop(item, None)
+                if entry is None:
+                    continue
+                removed.append(item)
+                for prefix in self._name_prefixes(entry[0]):
+                    paths = self._prefixes.get(prefix)
+                    if paths is not None:
+                        paths.discard(item)
+                        if not paths:
+                            del self._prefixes[prefix]
+        if self.watcher and removed:
+            self.watcher.remove(removed)
+
+    def _load_usage(self) -> dict[str, list[float]]:
+        if self._usage is None:
+            try:
+                self._usage = json.loads(self.usage_path.read_text(encoding="utf-8"))
+            except Exception:
+                self._usage = {}
+        return self._usage
+
+    def record_use(self, path: Path) -> None:
+        key = str(path.expanduser())
+        now = time.time()
+        with self._lock:
+            usage = self._load_usage()
+            score, last = usage.get(key, (0.0, now))
+            usage[key] = [self._decay(score, last, now) + 1.0, now]
+            if key not in self._entries and os.path.isdir(key):
+                self._add_entries({key: self._entry(key)})
+            snapshot = json.dumps(usage)
+        try:
+            self.usage_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.usage_path.with_suffix(".tmp")
+            tmp_path.write_text(snapshot, encoding="utf-8")
+            os.replace(tmp_path, self.usage_path)
+        except OSError:
+            logger.warning("Could not save directory usage to %s", self.usage_path)
+
+    @staticmethod
+    def _decay(score: float, last: float, now: float) -> float:
+        return score * 0.5 ** (max(0.0, now - last) / DIR_FRECENCY_HALF_LIFE)
+
+    def frecency(self, path: str, now: Optional[float] = None) -> float:
+        usage = self._load_usage().get(path)
+        if not usage:
+            return 0.0
+        return self._decay(usage[0], usage[1], now or time.time())
+
+    def search(self, query: str, limit: int = 20) -> list[dict]:
+        needle = "".join(query.lower().split())
+        now = time.time()
+        with self._lock:
+            usage = self._load_usage()
+            if not needle:
+                ranked = sorted(
+                    ((self._decay(score, last, now), path) for path, (score, last) in usage.items()),
+                    reverse=True,
+                )
+                return [
+                    {"path": path, "score": round(score, 3), "frecency": round(score, 3)}
+                    for score, path in ranked[:limit]
+                    if path in self._entries
+                ]
+            if len(needle) <= DIR_SUGGEST_PREFIX_CHARS:
+                # Too short to narrow a fuzzy scan: match name prefixes from a precomputed table.
+                scored = []
+                for path in self._prefixes.get(needle, ()):
+                    frecency = self._decay(*usage[path], now) if path in usage else 0.0
+                    score = 5.0 + DIR_FRECENCY_WEIGHT * math.log1p(frecency) - len(path) * 0.01
+                    scored.append((score, frecency, path))
+                return [
+                    {"path": path, "score": round(score, 3), "frecency": round(frecency, 3)}
+                    for score, frecency, path in heapq.nlargest(limit, scored)
+                ]
+            needle_mask = char_mask(needle)
+            candidates = self._entries.keys()
+            for length in range(len(needle) - 1, DIR_SUGGEST_PREFIX_CHARS, -1):
+                if needle[:length] in self._recent:
+                    candidates = self._recent[needle[:length]]
+                    break
+            # [^m]*m[^o]*o... never backtracks, so rejecting a path costs one C-level pass
+            is_subsequence = re.compile("".join(f"[^{re.escape(c)}]*{re.escape(c)}" for c in needle)).match
+            matched = []
+            scored = []
+            for path in candidates:
+                item = self._entries.get(path)
+                if item is None or item[1] & needle_mask != needle_mask or not is_subsequence(item[0]):
+                    continue
+                score = fuzzy_match_score(needle, item[0])
+                if score is None:
+                    continue
+                matched.append(path)
+                frecency = self._decay(*usage[path], now) if path in usage else 0.0
+                scored.append((score + DIR_FRECENCY_WEIGHT * math.log1p(frecency), frecency, path))
+            if len(self._recent) >= 64:
+                self._recent.pop(next(iter(self._recent)))
+            self._recent[needle] = matched
+        return [
+            {"path": path, "score": round(score, 3), "frecency": round(frecency, 3)}
+            for score, frecency, path in heapq.nlargest(limit, scored)
+        ]
+
+    def status(self) -> dict:
+        with self._lock:
+            count = len(self._entries)
+        watcher = self.watcher
+        return {
+            "ready": self.ready,
+            "dirs": count,
+            "built_at": self.built_at,
+            "watcher": "inotify" if watcher and not watcher.exhausted else "rescan",
+            "watches": watcher.count() if watcher else 0,
+            "max_watches": watcher.max_watches if watcher else 0,
+        }
+
+
+DIR_INDEX = DirIndex()
+
+
+def list_directory_tree(base: Path, depth: int, limit: int) -> tuple[dict, bool]:
+    """Subdirectories of `base` down to `depth` levels, breadth first.
+
+    Each node lists at most `limit` children in name order (`more` marks the
+    rest), and the whole tree stops at DIR_TREE_MAX_ENTRIES nodes; the second
+    value reports whether that cap was hit. Nodes below `depth` have
+    `children: None`, meaning "not loaded".
+    """
+    root = {"path": str(base), "children": None, "more": False}
+    queue: deque[tuple[dict, int]] = deque([(root, 0)])
+    total = 0
+    while queue:
+        node, level = queue.popleft()
+        if level >= depth:
+            continue
+        room = DIR_TREE_MAX_ENTRIES - total
+        if room <= 0:
+            return root, True
+        try:
+            names = DIR_LISTINGS.names(Path(node["path"]))
+        except OSError as exc:
+            node["children"] = []
+            node["error"] = str(exc)
+            continue
+        page = names[: min(limit, room) + 1]
+        node["more"] = len(page) > min(limit, room)
+        node["children"] = [
+            {"path": os.path.join(node["path"], name), "children": None, "more": False}
+            for name in page[: min(limit, room)]
+        ]
+        total += len(node["children"])
+        queue.extend((child, level + 1) for child in node["children"])
+    return root, False
 
 
 @app.get("/dirs")
-def dirs(path: Optional[str] = None, limit: int = 200):
-    return list_directory_suggestions(path, limit=limit)
+def dirs(path: Optional[str] = None, limit: int = 200, cursor: Optional[str] = None, depth: int = 0):
+    result = list_directory_suggestions(path, limit=limit, cursor=cursor)
+    if depth > 0:
+        limit = max(1, min(limit, DIR_LISTING_MAX_LIMIT))
+        result["tree"], result["truncated"] = list_directory_tree(
+            Path(result["base"]), min(depth, DIR_TREE_MAX_DEPTH), limit
+        )
+    return result
 
 
-@app.post("/dirs/create")
-def dirs_create(payload: DirCreateRequest):
-    target = expand_dir_path(payload.path)
+@app.get("/dirs/suggest")
+def dirs_suggest(q: str = "", limit: int = 20):
+    DIR_INDEX.ensure_started()
+    limit = max(1, min(limit, 200))
+    started = time.perf_counter()
+    results = DIR_INDEX.search(q, limit)
+    return {
+        "query": q,
+        "results": results,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+        **DIR_INDEX.status(),
+    }
+
+
+def create_directory(path: str) -> dict:
+    target = expand_dir_path(path)
     try:
         target.mkdir(parents=True, exist_ok=False)
     except FileExistsError as exc:
@@ -248,10 +1185,9 @@ def dirs_create(payload: DirCreateRequest):
     return {"status": "ok", "path": str(target)}
 
 
-@app.post("/dirs/rename")
-def dirs_rename(payload: DirRenameRequest):
-    src = expand_dir_path(payload.src)
-    dst = expand_dir_path(payload.dst)
+def rename_directory(src_path: str, dst_path: str) -> dict:
+    src = expand_dir_path(src_path)
+    dst = expand_dir_path(dst_path)
     if not src.exists():
         raise HTTPException(status_code=404, detail="Source not found")
     if dst.exists():
@@ -263,22 +1199,537 @@ def dirs_rename(payload: DirRenameRequest):
     return {"status": "ok", "path": str(dst)}
 
 
-@app.post("/dirs/delete")
-def dirs_delete(payload: DirDeleteRequest):
-    target = expand_dir_path(payload.path)
-    if not target.exists():
-        raise HTTPException(status_code=404, detail="Directory not found")
-    try:
-        if target.is_dir():
-            if payload.recursive:
-                shutil.rmtree(target)
-            else:
-                target.rmdir()
-        else:
-            target.unlink()
-    except Exception as exc:
-        raise HTTPException(status_code=500, detail=str(exc)) from exc
-    return {"status": "ok"}
+def delete_directory(path: str) -> dict:
+    """Delete a file or an empty directory; trees go through `submit_delete_tree`."""
+    target = expand_dir_path(path)
+    if not target.exists() and not target.is_symlink():
+        raise HTTPException(status_code=404, detail="Directory not found")
+    try:
+        if target.is_dir() and not target.is_symlink():
+            target.rmdir()
+        else:
+            target.unlink()
+    except OSError as exc:
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+    return {"status": "ok"}
+
+
+def remove_tree(target: Path, stop: threading.Event, on_line: Callable[[str], None]) -> dict:
+    """Delete `target` bottom-up, reporting progress every DIR_DELETE_PROGRESS_EVERY entries."""
+    counts = {"files": 0, "dirs": 0}
+
+    def progress() -> None:
+        done = counts["files"] + counts["dirs"]
+        if done % DIR_DELETE_PROGRESS_EVERY == 0:
+            on_line(f"Deleted {counts['files']} files, {counts['dirs']} directories")
+
+    def fail(exc: OSError) -> None:
+        raise exc
+
+    for current, dirnames, filenames in os.walk(target, topdown=False, onerror=fail):
+        for name in filenames:
+            if stop.is_set():
+                raise asyncio.CancelledError
+            os.unlink(os.path.join(current, name))
+            counts["files"] += 1
+            progress()
+        for name in dirnames:
+            child = os.path.join(current, name)
+            # os.walk lists symlinks to directories here without descending into them
+            if os.path.islink(child):
+                os.unlink(child)
+                counts["files"] += 1
+            else:
+                os.rmdir(child)
+                counts["dirs"] += 1
+            progress()
+    os.rmdir(target)
+    counts["dirs"] += 1
+    on_line(f"Deleted {counts['files']} files, {counts['dirs']} directories")
+    return counts
+
+
+def is_directory_tree(path: str) -> bool:
+    target = expand_dir_path(path)
+    return target.is_dir() and not target.is_symlink()
+
+
+def submit_delete_tree(path: str) -> Job:
+    target = expand_dir_path(path)
+    if not target.exists():
+        raise HTTPException(status_code=404, detail="Directory not found")
+    if not target.is_dir() or target.is_symlink():
+        raise HTTPException(status_code=400, detail=f"Not a directory: {target}")
+
+    async def delete(job: Job) -> dict:
+        stop = threading.Event()
+        try:
+            return await asyncio.to_thread(remove_tree, target, stop, job.log)
+        except asyncio.CancelledError:
+            stop.set()
+            raise
+        except OSError as exc:
+            raise HTTPException(status_code=500, detail=str(exc)) from exc
+
+    job, _ = JOBS.submit("delete", f"delete {target}", delete, key=f"delete:{target}")
+    return job
+
+
+@app.post("/dirs/create")
+def dirs_create(payload: DirCreateRequest):
+    return create_directory(payload.path)
+
+
+@app.post("/dirs/rename")
+def dirs_rename(payload: DirRenameRequest):
+    return rename_directory(payload.src, payload.dst)
+
+
+@app.post("/dirs/delete")
+async def dirs_delete(payload: DirDeleteRequest, response: Response):
+    """Delete a directory; recursive deletes run as a job and, with `background`, answer 202 if not done within a moment."""
+    if not payload.recursive or not is_directory_tree(payload.path):
+        return await asyncio.to_thread(delete_directory, payload.path)
+    job = submit_delete_tree(payload.path)
+    if not payload.background:
+        await JOBS.wait(job)
+    else:
+        try:
+            await asyncio.wait_for(JOBS.wait(job), timeout=DIR_DELETE_INLINE_SECONDS)
+        except asyncio.TimeoutError:
+            response.status_code = 202
+            return {"status": "accepted", "job": job.to_dict()}
+    if job.status != "succeeded":
+        raise HTTPException(status_code=500, detail=job.error or f"Delete {job.status}")
+    return {"status": "ok", "result": job.result}
+
+
+@app.post("/dirs/batch")
+async def dirs_batch(payload: DirBatchRequest):
+    """Apply create/rename/delete operations in order, reporting a result per operation.
+
+    Recursive deletes are started as jobs and reported as `accepted`; with
+    `stop_on_error` the operations after the first failure are `skipped`.
+    """
+    if len(payload.operations) > DIR_BATCH_MAX_OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"At most {DIR_BATCH_MAX_OPERATIONS} operations per batch")
+    results = []
+    failed = False
+    for index, operation in enumerate(payload.operations):
+        item = {"index": index, "op": operation.op}
+        if failed and payload.stop_on_error:
+            results.append({**item, "status": "skipped"})
+            continue
+        try:
+            if operation.op == "create" and operation.path:
+                item.update(await asyncio.to_thread(create_directory, operation.path))
+            elif operation.op == "rename" and operation.src and operation.dst:
+                item.update(await asyncio.to_thread(rename_directory, operation.src, operation.dst))
+            elif operation.op == "delete" and operation.path:
+                if operation.recursive and is_directory_tree(operation.path):
+                    item.update({"status": "accepted", "job": submit_delete_tree(operation.path).to_dict()})
+                else:
+                    item.update(await asyncio.to_thread(delete_directory, operation.path))
+            else:
+                raise HTTPException(status_code=400, detail=f"Invalid operation: {operation.op}")
+        except HTTPException as exc:
+            failed = True
+            item.update({"status": "error", "status_code": exc.status_code, "detail": exc.detail})
+        results.append(item)
+    return {"status": "error" if failed else "ok", "results": results}
+
+
+class LogSignal:
+    """Wakes asyncio subscribers when output arrives from reader threads.
+
+    Wake-ups are coalesced: a subscriber is notified once and re-armed when
+    it calls `rearm`, so a burst of lines costs one loop callback.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: dict[asyncio.Event, tuple[asyncio.AbstractEventLoop, bool]] = {}
+
+    def subscribe(self, loop: asyncio.AbstractEventLoop) -> asyncio.Event:
+        event = asyncio.Event()
+        with self._lock:
+            self._subscribers[event] = (loop, True)
+        return event
+
+    def unsubscribe(self, event: asyncio.Event) -> None:
+        with self._lock:
+            self._subscribers.pop(event, None)
+
+    def rearm(self, event: asyncio.Event) -> None:
+        event.clear()
+        with self._lock:
+            if event in self._subscribers:
+                self._subscribers[event] = (self._subscribers[event][0], True)
+
+    def notify(self) -> None:
+        with self._lock:
+            armed = [(event, loop) for event, (loop, ready) in self._subscribers.items() if ready]
+            for event, loop in armed:
+                self._subscribers[event] = (loop, False)
+        for event, loop in armed:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # Loop already closed; the subscriber is gone.
+                self.unsubscribe(event)
+
+
+class LogBuffer:
+    """Ring buffer of output lines tagged with sequence numbers.
+
+    Sequence numbers come from one process-wide counter, so they keep
+    increasing across runner processes and restarts and a client's `since`
+    never matches lines from a different run.
+    """
+
+    _sequence = itertools.count(1)
+    _sequence_lock = threading.Lock()
+    _last_issued = 0
+
+    def __init__(self, maxlen: int = RUNNER_LOG_LINES, signal: Optional[LogSignal] = None):
+        self._lock = threading.Lock()
+        self._entries: deque[tuple[int, float, str]] = deque(maxlen=maxlen)
+        self._signal = signal
+        self.dropped_seq = 0
+
+    @classmethod
+    def last_issued(cls) -> int:
+        """Highest sequence number handed out; every line up to it is already in its buffer."""
+        with cls._sequence_lock:
+            return cls._last_issued
+
+    def append(self, line: str) -> int:
+        with LogBuffer._sequence_lock:
+            seq = next(LogBuffer._sequence)
+            LogBuffer._last_issued = seq
+            with self._lock:
+                if len(self._entries) == self._entries.maxlen:
+                    self.dropped_seq = self._entries[0][0]
+                self._entries.append((seq, time.time(), line))
+        if self._signal:
+            self._signal.notify()
+        return seq
+
+    def __iter__(self):
+        with self._lock:
+            lines = [line for _, _, line in self._entries]
+        return iter(lines)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def tail(self, count: int) -> list[str]:
+        with self._lock:
+            start = max(0, len(self._entries) - count)
+            return [self._entries[index][2] for index in range(start, len(self._entries))]
+
+    def since(self, seq: int) -> list[tuple[int, float, str]]:
+        """Entries with a sequence number above `seq`, oldest first."""
+        with self._lock:
+            newer = []
+            # Walk back from the newest entry; cost is proportional to the delta.
+            for entry in reversed(self._entries):
+                if entry[0] <= seq:
+                    break
+                newer.append(entry)
+        newer.reverse()
+        return newer
+
+
+def parse_log_record(raw: bytes) -> tuple[float, str]:
+    stamp, _, text = raw.rstrip(b"\n").partition(b" ")
+    try:
+        ts = float(stamp)
+    except ValueError:
+        ts = 0.0
+    return ts, text.decode("utf-8", errors="replace")
+
+
+@dataclass
+class LogSegment:
+    path: Path
+    first_line: int
+
+    @property
+    def index_path(self) -> Path:
+        return self.path.with_name(self.path.name[: -len(".log")] + ".idx")
+
+    def index(self) -> list[tuple[int, int, float]]:
+        try:
+            data = self.index_path.read_bytes()
+        except FileNotFoundError:
+            return []
+        # Ignore a record the writer has only half flushed.
+        usable = len(data) - len(data) % RUNNER_LOG_INDEX_RECORD.size
+        return list(RUNNER_LOG_INDEX_RECORD.iter_unpack(data[:usable]))
+
+    def entry_for_line(self, line: int) -> tuple[int, int]:
+        """Closest indexed (line, offset) at or before `line`."""
+        index = self.index()
+        position = bisect.bisect_right([entry[0] for entry in index], line) - 1
+        if position < 0:
+            return self.first_line, 0
+        return index[position][0], index[position][1]
+
+    def records(self, line: int, offset: int = 0):
+        """Yield (line number, raw record) from a known line/offset pair to the end of the segment."""
+        with self.path.open("rb") as handle:
+            handle.seek(offset)
+            for raw in handle:
+                if not raw.endswith(b"\n"):
+                    return
+                yield line, raw
+                line += 1
+
+
+def log_segments(directory: Path, stream: str) -> list[LogSegment]:
+    segments = []
+    for path in directory.glob(f"{stream}.*.log"):
+        first = path.name[len(stream) + 1 : -len(".log")]
+        if first.isdigit():
+            segments.append(LogSegment(path, int(first)))
+    segments.sort(key=lambda segment: segment.first_line)
+    return segments
+
+
+class LogSegmentWriter:
+    """Appends one stream's lines to rotating segment files with a sparse index.
+
+    Each line is stored as `<unix time> <text>`. Every RUNNER_LOG_INDEX_STRIDE
+    lines the index file gets a (line number, byte offset, timestamp) record,
+    which is enough to seek by line or time without reading whole segments.
+    """
+
+    def __init__(self, directory: Path, stream: str):
+        self.directory = directory
+        self.stream = stream
+        self.line = 0
+        self._log = None
+        self._index = None
+        self._offset = 0
+        self._segment_lines = 0
+        self.closed = False
+        # The runner's reader thread appends while stop() may close the writer from another thread.
+        self._lock = threading.Lock()
+
+    def _rotate(self) -> None:
+        self._close_files()
+        base = self.directory / f"{self.stream}.{self.line:010d}"
+        self._log = open(f"{base}.log", "ab")
+        self._index = open(f"{base}.idx", "ab")
+        self._offset = 0
+        self._segment_lines = 0
+        for segment in log_segments(self.directory, self.stream)[:-RUNNER_LOG_SEGMENTS]:
+            segment.path.unlink(missing_ok=True)
+            segment.index_path.unlink(missing_ok=True)
+
+    def append(self, text: str, ts: Optional[float] = None) -> None:
+        ts = time.time() if ts is None else ts
+        data = f"{ts:.3f} {text}\n".encode("utf-8", errors="replace")
+        with self._lock:
+            if self.closed:
+                return
+            if self._log is None or self._offset >= RUNNER_LOG_SEGMENT_BYTES:
+                self._rotate()
+            if self._segment_lines % RUNNER_LOG_INDEX_STRIDE == 0:
+                self._index.write(RUNNER_LOG_INDEX_RECORD.pack(self.line, self._offset, ts))
+                self._index.flush()
+            self._log.write(data)
+            self._log.flush()
+            self._offset += len(data)
+            self._segment_lines += 1
+            self.line += 1
+
+    def _close_files(self) -> None:
+        for handle in (self._log, self._index):
+            if handle:
+                handle.close()
+        self._log = None
+        self._index = None
+
+    def close(self) -> None:
+        with self._lock:
+            self.closed = True
+            self._close_files()
+
+
+class RunLog:
+    """One runner session on disk: a metadata file plus segment files per stream."""
+
+    def __init__(self, directory: Path, meta: dict):
+        self.directory = directory
+        self.meta = meta
+        self._lock = threading.Lock()
+        self._writers: dict[str, LogSegmentWriter] = {}
+        self._write_meta()
+
+    def _write_meta(self) -> None:
+        (self.directory / "meta.json").write_text(json.dumps(self.meta, indent=2), encoding="utf-8")
+
+    def writer(self, stream: str) -> LogSegmentWriter:
+        with self._lock:
+            if stream not in self._writers:
+                self._writers[stream] = LogSegmentWriter(self.directory, stream)
+            return self._writers[stream]
+
+    def close(self) -> None:
+        with self._lock:
+            for writer in self._writers.values():
+                writer.close()
+            self.meta["stopped_at"] = time.time()
+            self._write_meta()
+
+
+class RunnerLogStore:
+    """Runner output kept on disk across runs, with tail, seek and search."""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def open_run(self, meta: dict) -> RunLog:
+        with self._lock:
+            self.root.mkdir(parents=True, exist_ok=True)
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            for suffix in itertools.count(1):
+                run_id = f"{stamp}-{suffix}"
+                directory = self.root / run_id
+                if not directory.exists():
+                    break
+            directory.mkdir()
+            # The new run has no meta.json yet, so it is not in the list; keep room for it.
+            for old in self._run_dirs()[RUNNER_LOG_RUNS - 1 :]:
+                shutil.rmtree(old, ignore_errors=True)
+        return RunLog(directory, dict(meta, id=run_id, started_at=time.time(), stopped_at=None))
+
+    def _run_dirs(self) -> list[Path]:
+        if not self.root.is_dir():
+            return []
+        dirs = [path for path in self.root.iterdir() if path.is_dir() and (path / "meta.json").exists()]
+        return sorted(dirs, key=lambda path: path.name, reverse=True)
+
+    def run_dir(self, run_id: str) -> Path:
+        if run_id == "latest":
+            dirs = self._run_dirs()
+            if not dirs:
+                raise HTTPException(status_code=404, detail="No runner logs recorded yet")
+            return dirs[0]
+        directory = self.root / run_id
+        if "/" in run_id or run_id.startswith(".") or not (directory / "meta.json").exists():
+            raise HTTPException(status_code=404, detail=f"Runner log not found: {run_id}")
+        return directory
+
+    def segments(self, run_id: str, stream: str) -> list[LogSegment]:
+        if not re.fullmatch(r"[A-Za-z0-9_-]+", stream):
+            raise HTTPException(status_code=400, detail=f"Invalid stream: {stream}")
+        segments = log_segments(self.run_dir(run_id), stream)
+        if not segments:
+            raise HTTPException(status_code=404, detail=f"No {stream} output in run {run_id}")
+        return segments
+
+    def line_count(self, segments: list[LogSegment]) -> int:
+        last = segments[-1]
+        index = last.index()
+        count, offset = (index[-1][0], index[-1][1]) if index else (last.first_line, 0)
+        for _ in last.records(count, offset):
+            count += 1
+        return count
+
+    def runs(self) -> list[dict]:
+        runs = []
+        for directory in self._run_dirs():
+            try:
+                meta = json.loads((directory / "meta.json").read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            streams = {}
+            for path in directory.glob("*.log"):
+                name = path.name.split(".", 1)[0]
+                streams[name] = streams.get(name, 0) + path.stat().st_size
+            meta["streams"] = streams
+            runs.append(meta)
+        return runs
+
+    def read(self, run_id: str, stream: str, start: int, count: int) -> dict:
+        segments = self.segments(run_id, stream)
+        run_id = segments[0].path.parent.name
+        first = segments[0].first_line
+        start = max(start, first)
+        lines = []
+        for position, segment in enumerate(segments):
+            following = segments[position + 1].first_line if position + 1 < len(segments) else None
+            if following is not None and following <= start:
+                continue
+            line, offset = segment.entry_for_line(max(start, segment.first_line))
+            for line, raw in segment.records(line, offset):
+                if line < start:
+                    continue
+                ts, text = parse_log_record(raw)
+                lines.append({"line": line, "t": ts, "text": text})
+                if len(lines) >= count:
+                    break
+            if len(lines) >= count:
+                break
+        return {"run": run_id, "stream": stream, "first_line": first, "lines": lines}
+
+    def tail(self, run_id: str, stream: str, count: int) -> dict:
+        segments = self.segments(run_id, stream)
+        run_id = segments[0].path.parent.name
+        total = self.line_count(segments)
+        result = self.read(run_id, stream, max(0, total - count), count)
+        result["total"] = total
+        return result
+
+    def line_at(self, run_id: str, stream: str, ts: float) -> int:
+        """Number of the first line logged at or after `ts`."""
+        segments = self.segments(run_id, stream)
+        # Start at the last indexed line stamped before `ts`; timestamps only grow.
+        start, line, offset = 0, segments[0].first_line, 0
+        for position, segment in enumerate(segments):
+            earlier = [entry for entry in segment.index() if entry[2] < ts]
+            if not earlier:
+                break
+            start, (line, offset, _) = position, earlier[-1]
+        for position in range(start, len(segments)):
+            if position > start:
+                line, offset = segments[position].first_line, 0
+            for number, raw in segments[position].records(line, offset):
+                if parse_log_record(raw)[0] >= ts:
+                    return number
+        return self.line_count(segments)
+
+    def search(
+        self, query: str, run_id: Optional[str] = None, stream: Optional[str] = None, limit: int = 100
+    ) -> list[dict]:
+        """Case-insensitive substring search, newest run first, streaming line by line."""
+        needle = query.lower().encode("utf-8")
+        directories = [self.run_dir(run_id)] if run_id else self._run_dirs()
+        matches = []
+        for directory in directories:
+            names = sorted({path.name.split(".", 1)[0] for path in directory.glob("*.log")})
+            for name in names:
+                if stream and name != stream:
+                    continue
+                for segment in log_segments(directory, name):
+                    for line, raw in segment.records(segment.first_line):
+                        # Match on the raw record, then make sure the hit is not in the timestamp.
+                        if needle not in raw.lower():
+                            continue
+                        ts, text = parse_log_record(raw)
+                        if query.lower() not in text.lower():
+                            continue
+                        matches.append({"run": directory.name, "stream": name, "line": line, "t": ts, "text": text})
+                        if len(matches) >= limit:
+                            return matches
+        return matches
+
+
+RUNNER_LOGS = RunnerLogStore(RUNNER_LOG_DIR)
 
 
 @dataclass
@@ -287,7 +1738,10 @@ class RunnerProcess:
     command: list[str]
     cwd: Path
     env: dict[str, str]
-    output: deque[str] = field(default_factory=lambda: deque(maxlen=400))
+    output: LogBuffer = field(default_factory=LogBuffer)
+    log_writer: Optional[LogSegmentWriter] = None
+    line_handler: Optional[Callable[[str], Optional[str]]] = None
+    on_exit: Optional[Callable[[], None]] = None
     process: Optional[subprocess.Popen] = None
     started_at: Optional[float] = None
     exited_at: Optional[float] = None
@@ -321,11 +1775,30 @@ class RunnerProcess:
             return
         try:
             for line in self.process.stdout:
-                self.output.append(line.rstrip())
+                line = line.rstrip()
+                if self.line_handler:
+                    line = self.line_handler(line)
+                    if line is None:
+                        continue
+                for text in line.split("\n"):
+                    self._log(text)
+                    RUNNER_OUTPUT_LINES.inc(1, self.name)
         finally:
             if self.process:
                 self.exit_code = self.process.poll()
             self.exited_at = time.time()
+            RUNNER_EXITS.inc(1, self.name)
+            if self.on_exit:
+                self.on_exit()
+
+    def _log(self, line: str) -> None:
+        self.output.append(line)
+        if self.log_writer:
+            try:
+                self.log_writer.append(line)
+            except OSError as exc:
+                logger.warning("Runner log write failed, disabling: %s", exc)
+                self.log_writer = None
 
     def write(self, data: str) -> None:
         with self._lock:
@@ -351,6 +1824,123 @@ class RunnerProcess:
             self.exited_at = time.time()
 
 
+class FlutterMachine:
+    """Drives `flutter run --machine` over its JSON-RPC stdin/stdout protocol.
+
+    Output lines that are daemon messages are decoded here: responses
+    complete pending requests, events update the app state, and log events
+    are turned back into plain text for the runner log. Every hot reload or
+    restart is timed from request to response and kept in `history`.
+    """
+
+    def __init__(self):
+        self.process: Optional[RunnerProcess] = None
+        self.app_id: Optional[str] = None
+        self.app_started = False
+        self.history: deque[dict] = deque(maxlen=FLUTTER_RELOAD_HISTORY)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._pending: dict[int, concurrent.futures.Future] = {}
+
+    def handle_line(self, line: str) -> Optional[str]:
+        stripped = line.strip()
+        if not (stripped.startswith("[{") and stripped.endswith("}]")):
+            return line
+        try:
+            messages = json.loads(stripped)
+        except ValueError:
+            return line
+        texts = []
+        for message in messages:
+            if not isinstance(message, dict):
+                continue
+            if "id" in message and ("result" in message or "error" in message):
+                with self._lock:
+                    future = self._pending.pop(message["id"], None)
+                if future and not future.done():
+                    future.set_result(message)
+                continue
+            event = message.get("event")
+            params = message.get("params") or {}
+            if event == "app.start":
+                self.app_id = params.get("appId")
+                texts.append(f"Launching app on {params.get('deviceId')}")
+            elif event == "app.started":
+                self.app_started = True
+                texts.append("App started")
+            elif event == "app.stop":
+                self.app_started = False
+                texts.append("App stopped")
+            elif event == "app.log":
+                texts.append(params.get("log", ""))
+            elif event == "daemon.logMessage":
+                texts.append(params.get("message", ""))
+            elif event == "app.progress" and params.get("message"):
+                texts.append(params["message"])
+            elif event == "app.debugPort":
+                texts.append(f"VM service at {params.get('wsUri')}")
+        return "\n".join(texts) if texts else None
+
+    def close(self) -> None:
+        self.app_started = False
+        with self._lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for future in pending:
+            if not future.done():
+                future.set_exception(RuntimeError("flutter run exited"))
+
+    def _request(self, method: str, params: dict) -> tuple[int, concurrent.futures.Future]:
+        request_id = next(self._ids)
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        with self._lock:
+            self._pending[request_id] = future
+        self.process.write(json.dumps([{"id": request_id, "method": method, "params": params}]) + "\n")
+        return request_id, future
+
+    async def restart(self, full_restart: bool) -> dict:
+        if not self.process or not self.app_id:
+            raise HTTPException(status_code=409, detail="Flutter app is not running yet")
+        record = {"type": "restart" if full_restart else "hot", "started_at": time.time(), "ok": False}
+        started = time.monotonic()
+        request_id, future = self._request(
+            "app.restart", {"appId": self.app_id, "fullRestart": full_restart, "pause": False, "reason": "manual"}
+        )
+        try:
+            response = await asyncio.wait_for(asyncio.wrap_future(future), FLUTTER_RELOAD_TIMEOUT)
+        except asyncio.TimeoutError:
+            record["error"] = f"No response after {FLUTTER_RELOAD_TIMEOUT:g}s"
+        except RuntimeError as exc:
+            record["error"] = str(exc)
+        else:
+            if "error" in response:
+                error = response["error"]
+                record["error"] = error.get("message", str(error)) if isinstance(error, dict) else str(error)
+            else:
+                result = response.get("result") or {}
+                record["code"] = result.get("code", 0)
+                record["message"] = result.get("message", "")
+                record["ok"] = record["code"] == 0
+                if not record["ok"]:
+                    record["error"] = record["message"] or f"Reload failed with code {record['code']}"
+        finally:
+            with self._lock:
+                self._pending.pop(request_id, None)
+        record["duration_ms"] = int((time.monotonic() - started) * 1000)
+        self.history.append(record)
+        return record
+
+    def status(self) -> dict:
+        history = list(self.history)
+        stats: dict = {"count": len(history), "failures": sum(1 for item in history if not item["ok"])}
+        for kind in ("hot", "restart"):
+            times = [item["duration_ms"] for item in history if item["ok"] and item["type"] == kind]
+            if times:
+                ordered = sorted(times)
+                stats[kind] = {"last_ms": times[-1], "p50_ms": ordered[len(ordered) // 2], "max_ms": ordered[-1]}
+        return {"app_id": self.app_id, "app_started": self.app_started, "reload_stats": stats, "reloads": history}
+
+
 class RunnerManager:
     def __init__(self):
         self._lock = threading.Lock()
@@ -362,7 +1952,10 @@ class RunnerManager:
         self.metro: Optional[RunnerProcess] = None
         self.app: Optional[RunnerProcess] = None
         self.flutter: Optional[RunnerProcess] = None
+        self.flutter_machine: Optional[FlutterMachine] = None
         self.last_error: Optional[str] = None
+        self.log_signal = LogSignal()
+        self.run_log: Optional[RunLog] = None
 
     def _env(self) -> dict[str, str]:
         env = os.environ.copy()
@@ -374,9 +1967,13 @@ class RunnerManager:
             for proc in (self.metro, self.app, self.flutter):
                 if proc:
                     proc.stop()
+            if self.run_log:
+                self.run_log.close()
+                self.run_log = None
             self.metro = None
             self.app = None
             self.flutter = None
+            self.flutter_machine = None
             self.project_type = None
             self.cwd = None
             self.device_id = None
@@ -396,16 +1993,66 @@ class RunnerManager:
                 "app_running": self.app is not None and self.app.process is not None and self.app.process.poll() is None,
                 "flutter_running": self.flutter is not None and self.flutter.process is not None and self.flutter.process.poll() is None,
                 "last_error": self.last_error,
+                "run_id": self.run_log.meta["id"] if self.run_log else None,
+                "flutter": self.flutter_machine.status() if self.flutter_machine else None,
             }
 
     def logs(self) -> dict:
         with self._lock:
             return {
-                "metro": list(self.metro.output) if self.metro else [],
-                "app": list(self.app.output) if self.app else [],
-                "flutter": list(self.flutter.output) if self.flutter else [],
+                "metro": self.metro.output.tail(RUNNER_LOG_LEGACY_LINES) if self.metro else [],
+                "app": self.app.output.tail(RUNNER_LOG_LEGACY_LINES) if self.app else [],
+                "flutter": self.flutter.output.tail(RUNNER_LOG_LEGACY_LINES) if self.flutter else [],
             }
 
+    def logs_since(self, since: int, limit: int = RUNNER_LOG_BATCH) -> dict:
+        """Lines from all runner processes newer than `since`, in sequence order.
+
+        `reset` tells the client its cursor is from before a backend restart,
+        `truncated` that lines between `since` and the oldest returned line
+        were already dropped from the ring buffer, `more` that only the oldest
+        `limit` lines were returned and the client should ask again right away.
+        """
+        # Lines appended while the buffers are read get numbers above the snapshot and are left for
+        # the next call; otherwise a line landing in an already-read buffer would fall behind the cursor.
+        latest = LogBuffer.last_issued()
+        reset = since > latest
+        if reset:
+            since = 0
+        with self._lock:
+            processes = [proc for proc in (self.metro, self.app, self.flutter) if proc]
+        entries = []
+        truncated = False
+        for proc in processes:
+            if since < proc.output.dropped_seq:
+                truncated = True
+            entries.extend(
+                (seq, ts, proc.name, line) for seq, ts, line in proc.output.since(since) if seq <= latest
+            )
+        entries.sort()
+        more = len(entries) > limit
+        if more:
+            entries = entries[:limit]
+        return {
+            "seq": entries[-1][0] if more else max(since, latest),
+            "reset": reset,
+            "truncated": truncated,
+            "more": more,
+            "lines": [{"seq": seq, "t": round(ts, 3), "stream": name, "line": line} for seq, ts, name, line in entries],
+        }
+
+    def _open_run_log(self) -> None:
+        try:
+            self.run_log = RUNNER_LOGS.open_run(
+                {"project_type": self.project_type, "cwd": str(self.cwd), "device_id": self.device_id}
+            )
+        except OSError as exc:
+            logger.warning("Runner logs will not be persisted: %s", exc)
+            self.run_log = None
+
+    def _log_writer(self, stream: str) -> Optional[LogSegmentWriter]:
+        return self.run_log.writer(stream) if self.run_log else None
+
     def start_react_native(self, cwd: Path, device_id: str, mode: str, metro_port: int) -> None:
         self.stop()
         self.project_type = "react-native"
@@ -413,12 +2060,12 @@ class RunnerManager:
         self.device_id = device_id
         self.mode = mode
         self.metro_port = metro_port
-
-        if mode == "adb":
-            run_adb(["-s", device_id, "reverse", f"tcp:{metro_port}", f"tcp:{metro_port}"])
+        self._open_run_log()
 
         self.metro = RunnerProcess(
             name="metro",
+            output=LogBuffer(signal=self.log_signal),
+            log_writer=self._log_writer("metro"),
             command=["npx", "react-native", "start", "--port", str(metro_port)],
             cwd=cwd,
             env=self._env(),
@@ -430,6 +2077,8 @@ class RunnerManager:
             run_cmd += ["--deviceId", device_id]
         self.app = RunnerProcess(
             name="app",
+            output=LogBuffer(signal=self.log_signal),
+            log_writer=self._log_writer("app"),
             command=run_cmd,
             cwd=cwd,
             env=self._env(),
@@ -441,30 +2090,45 @@ class RunnerManager:
         self.project_type = "flutter"
         self.cwd = cwd
         self.device_id = device_id
+        self._open_run_log()
 
+        machine = FlutterMachine()
         self.flutter = RunnerProcess(
             name="flutter",
-            command=["flutter", "run", "-d", device_id],
+            output=LogBuffer(signal=self.log_signal),
+            log_writer=self._log_writer("flutter"),
+            command=shlex.split(FLUTTER_COMMAND) + ["run", "--machine", "-d", device_id],
             cwd=cwd,
             env=self._env(),
+            line_handler=machine.handle_line,
+            on_exit=machine.close,
         )
+        machine.process = self.flutter
+        self.flutter_machine = machine
         self.flutter.start()
 
-    def hot_reload(self) -> None:
-        with self._lock:
-            if self.project_type == "flutter" and self.flutter:
-                self.flutter.write("r\n")
-
-    def hot_restart(self) -> None:
+    async def reload(self, full_restart: bool) -> Optional[dict]:
+        """Hot reload or restart the Flutter app; None when no Flutter session is running."""
         with self._lock:
-            if self.project_type == "flutter" and self.flutter:
-                self.flutter.write("R\n")
+            machine = self.flutter_machine if self.project_type == "flutter" else None
+        if machine is None:
+            return None
+        return await machine.restart(full_restart)
 
-    def dev_menu(self, device_id: str) -> None:
-        run_adb(["-s", device_id, "shell", "input", "keyevent", "82"])
+    async def dev_menu(self, device_id: str) -> None:
+        await run_adb_async(["-s", device_id, "shell", "input", "keyevent", "82"])
 
 
 RUNNER = RunnerManager()
+METRICS.gauge(
+    "codex_runner_processes_running",
+    "Runner processes currently alive.",
+    ("process",),
+    callback=lambda: {
+        (name,): float(proc is not None and proc.process is not None and proc.process.poll() is None)
+        for name, proc in (("metro", RUNNER.metro), ("app", RUNNER.app), ("flutter", RUNNER.flutter))
+    },
+)
 
 
 def resolve_workdir(path_override: Optional[str]) -> Path:
@@ -483,19 +2147,71 @@ def resolve_workdir(path_override: Optional[str]) -> Path:
     return cwd
 
 
+class ProjectFileCache:
+    """Parsed contents of project files, re-read only when their size or mtime change."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: dict[tuple[str, Callable], tuple[int, int, object]] = {}
+        self.reads = 0
+
+    def get(self, path: Path, parser: Callable[[str], object]):
+        """Return `parser(text of path)`, or None if the file is missing or unreadable."""
+        key = (str(path), parser)
+        try:
+            stat = path.stat()
+        except OSError:
+            with self._lock:
+                self._entries.pop(key, None)
+            return None
+        with self._lock:
+            cached = self._entries.get(key)
+        if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+        self.reads += 1
+        try:
+            value = parser(path.read_text(encoding="utf-8"))
+        except Exception:
+            value = None
+        with self._lock:
+            self._entries[key] = (stat.st_mtime_ns, stat.st_size, value)
+        return value
+
+
+PROJECT_FILES = ProjectFileCache()
+
+
+def parse_package_json(text: str) -> dict:
+    data = json.loads(text)
+    deps = data.get("dependencies", {})
+    dev_deps = data.get("devDependencies", {})
+    return {"react_native": "react-native" in deps or "react-native" in dev_deps}
+
+
+def parse_gradle_ids(text: str) -> dict:
+    application_id = re.search(r'applicationId\s*[= ]\s*["\']([^"\']+)["\']', text)
+    namespace = re.search(r'namespace\s*[= ]\s*["\']([^"\']+)["\']', text)
+    return {
+        "application_id": application_id.group(1) if application_id else None,
+        "namespace": namespace.group(1) if namespace else None,
+    }
+
+
+def parse_manifest_package(text: str) -> Optional[str]:
+    match = re.search(r'<manifest[^>]+package=["\\\']([^"\\\']+)["\\\']', text)
+    return match.group(1) if match else None
+
+
+def react_native_in_package_json(package_json: Path) -> bool:
+    metadata = PROJECT_FILES.get(package_json, parse_package_json)
+    return bool(metadata and metadata["react_native"])
+
+
 def detect_project_type(cwd: Path) -> Optional[str]:
     if (cwd / "pubspec.yaml").exists():
         return "flutter"
-    package_json = cwd / "package.json"
-    if package_json.exists():
-        try:
-            data = json.loads(package_json.read_text(encoding="utf-8"))
-        except Exception:
-            return None
-        deps = data.get("dependencies", {})
-        dev_deps = data.get("devDependencies", {})
-        if "react-native" in deps or "react-native" in dev_deps:
-            return "react-native"
+    if react_native_in_package_json(cwd / "package.json"):
+        return "react-native"
     return None
 
 
@@ -505,157 +2221,797 @@ def detect_android_package(cwd: Path) -> Optional[str]:
         cwd / "android" / "app" / "build.gradle.kts",
     ]
     for gradle_file in gradle_files:
-        if not gradle_file.exists():
-            continue
-        try:
-            content = gradle_file.read_text(encoding="utf-8")
-        except Exception:
-            continue
-        match = re.search(r'applicationId\s*[= ]\s*["\']([^"\']+)["\']', content)
-        if match:
-            return match.group(1)
-        match = re.search(r'namespace\s*[= ]\s*["\']([^"\']+)["\']', content)
-        if match:
-            return match.group(1)
+        ids = PROJECT_FILES.get(gradle_file, parse_gradle_ids)
+        if ids and (ids["application_id"] or ids["namespace"]):
+            return ids["application_id"] or ids["namespace"]
     manifest = cwd / "android" / "app" / "src" / "main" / "AndroidManifest.xml"
-    if manifest.exists():
-        try:
-            content = manifest.read_text(encoding="utf-8")
-            match = re.search(r'<manifest[^>]+package=["\\\']([^"\\\']+)["\\\']', content)
-            if match:
-                return match.group(1)
-        except Exception:
-            pass
-    return None
+    return PROJECT_FILES.get(manifest, parse_manifest_package)
 
 
 def detect_rn_package(cwd: Path) -> Optional[str]:
     return detect_android_package(cwd)
 
 
+@dataclass
+class ProjectNode:
+    mtime_ns: int
+    checked_at: float
+    project: Optional[dict]
+    children: list[str]
+    package_json_mtime_ns: Optional[int] = None
+
+
+class ProjectIndex:
+    """Per-directory cache of project detection and subdirectories for `scan_projects`.
+
+    A directory is re-read only when its own mtime changes (an entry was added,
+    removed or renamed), its package.json changes, or the entry is older than
+    `ttl` (which also picks up edits to Gradle files and manifests).
+    """
+
+    def __init__(self, ttl: float = PROJECT_INDEX_TTL, max_nodes: int = PROJECT_INDEX_MAX_NODES):
+        self.ttl = ttl
+        self.max_nodes = max_nodes
+        self._lock = threading.Lock()
+        self._nodes: dict[str, ProjectNode] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def scan(self, base: Path, max_depth: int) -> list[dict]:
+        results: list[dict] = []
+        queue: deque[tuple[str, int]] = deque([(str(base), 0)])
+        seen: set[str] = set()
+        while queue:
+            current, depth = queue.popleft()
+            if current in seen:
+                continue
+            seen.add(current)
+            node = self.node(current)
+            if node is None:
+                continue
+            if node.project:
+                results.append(dict(node.project))
+                # Do not descend into a detected project root
+                continue
+            if depth >= max_depth:
+                continue
+            queue.extend((child, depth + 1) for child in node.children)
+        return results
+
+    def node(self, path: str) -> Optional[ProjectNode]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self.invalidate(path)
+            return None
+        with self._lock:
+            cached = self._nodes.get(path)
+        if cached and self._fresh(cached, path, stat.st_mtime_ns):
+            self.hits += 1
+            return cached
+        self.misses += 1
+        node = self._read(path, stat.st_mtime_ns)
+        with self._lock:
+            if node is None:
+                self._nodes.pop(path, None)
+            else:
+                if len(self._nodes) >= self.max_nodes:
+                    self._nodes.clear()
+                self._nodes[path] = node
+        return node
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        with self._lock:
+            if path is None:
+                self._nodes.clear()
+            else:
+                self._nodes.pop(path, None)
+
+    def _fresh(self, node: ProjectNode, path: str, mtime_ns: int) -> bool:
+        if node.mtime_ns != mtime_ns or time.monotonic() - node.checked_at > self.ttl:
+            return False
+        if node.package_json_mtime_ns is None:
+            return True
+        try:
+            return os.stat(os.path.join(path, "package.json")).st_mtime_ns == node.package_json_mtime_ns
+        except OSError:
+            return False
+
+    def _read(self, path: str, mtime_ns: int) -> Optional[ProjectNode]:
+        names: set[str] = set()
+        children: list[str] = []
+        package_json_mtime_ns = None
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    names.add(entry.name)
+                    if entry.name == "package.json":
+                        package_json_mtime_ns = entry.stat().st_mtime_ns
+                    # d_type answers this without a stat; symlinks are skipped to avoid cycles
+                    elif entry.name not in PROJECT_SCAN_SKIP and entry.is_dir(follow_symlinks=False):
+                        children.append(entry.path)
+        except NotADirectoryError:
+            return None
+        except PermissionError:
+            children = []
+        except OSError:
+            return None
+        project_type = None
+        if "pubspec.yaml" in names:
+            project_type = "flutter"
+        elif package_json_mtime_ns is not None and react_native_in_package_json(Path(path) / "package.json"):
+            project_type = "react-native"
+        project = None
+        if project_type:
+            project = {
+                "path": path,
+                "project_type": project_type,
+                "android_package": detect_android_package(Path(path)),
+            }
+        return ProjectNode(
+            mtime_ns=mtime_ns,
+            checked_at=time.monotonic(),
+            project=project,
+            children=children,
+            package_json_mtime_ns=package_json_mtime_ns,
+        )
+
+
+PROJECT_INDEX = ProjectIndex()
+
+
+PROJECT_SCAN_EXECUTOR = concurrent.futures.ThreadPoolExecutor(
+    max_workers=PROJECT_SCAN_WORKERS, thread_name_prefix="project-scan"
+)
+
+
 def scan_projects(base: Path, max_depth: int) -> list[dict]:
     max_depth = max(0, min(max_depth, 8))
-    results: list[dict] = []
-    skip_names = {
-        ".git",
-        ".idea",
-        ".vscode",
-        ".gradle",
-        "node_modules",
-        "build",
-        "dist",
-        ".venv",
-        "venv",
-        "__pycache__",
-        ".cache",
-        ".android",
-        ".flutter-plugins",
-        ".flutter-plugins-dependencies",
-        "android/.gradle",
-        "ios/Pods",
+    return PROJECT_INDEX.scan(base, max_depth)
+
+
+async def stream_projects(base: Path, max_depth: int, budget: float = PROJECT_SCAN_BUDGET):
+    """Walk `base` on the scan pool, yielding each project as soon as it is found.
+
+    Directories are read by up to PROJECT_SCAN_WORKERS threads at once. The last
+    item is a summary with `"type": "done"`; `timed_out` is set when the walk was
+    stopped by `budget` (seconds). Closing the generator abandons the walk.
+    """
+    max_depth = max(0, min(max_depth, 8))
+    loop = asyncio.get_running_loop()
+    started = time.monotonic()
+    deadline = started + budget
+    frontier: deque[tuple[str, int]] = deque([(str(base), 0)])
+    seen: set[str] = set()
+    pending: dict[asyncio.Future, int] = {}
+    scanned = found = 0
+    timed_out = False
+    try:
+        while frontier or pending:
+            while frontier and len(pending) < PROJECT_SCAN_WORKERS:
+                path, depth = frontier.popleft()
+                if path in seen:
+                    continue
+                seen.add(path)
+                pending[loop.run_in_executor(PROJECT_SCAN_EXECUTOR, PROJECT_INDEX.node, path)] = depth
+            if not pending:
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                timed_out = True
+                break
+            done, _ = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                depth = pending.pop(future)
+                scanned += 1
+                node = future.result()
+                if node is None:
+                    continue
+                if node.project:
+                    found += 1
+                    yield {"type": "project", **node.project}
+                elif depth < max_depth:
+                    frontier.extend((child, depth + 1) for child in node.children)
+    finally:
+        for future in pending:
+            future.cancel()
+    yield {
+        "type": "done",
+        "scanned": scanned,
+        "projects": found,
+        "timed_out": timed_out,
+        "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
     }
-    queue: list[tuple[Path, int]] = [(base, 0)]
-    seen: set[Path] = set()
 
-    while queue:
-        current, depth = queue.pop(0)
-        if current in seen:
-            continue
-        seen.add(current)
-        if not current.exists() or not current.is_dir():
-            continue
 
-        project_type = detect_project_type(current)
-        if project_type:
-            package = detect_android_package(current) if project_type in ("react-native", "flutter") else None
-            results.append(
-                {
-                    "path": str(current),
-                    "project_type": project_type,
-                    "android_package": package,
-                }
-            )
-            # Do not descend into a detected project root
-            continue
+class AdbError(Exception):
+    """The adb server or device answered a request with FAIL, or dropped a command already sent."""
 
-        if depth >= max_depth:
-            continue
 
+class AdbTimeout(AdbError):
+    """A device command did not finish in time (as opposed to the adb server being unreachable)."""
+
+
+class AdbConnection:
+    """One socket to the local adb server, speaking the host protocol."""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+
+    @classmethod
+    def open(cls, host: str, port: int, timeout: float) -> "AdbConnection":
+        sock = socket.create_connection((host, port), timeout=timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return cls(sock)
+
+    def request(self, service: str) -> None:
+        payload = service.encode("utf-8")
+        self.sock.sendall(b"%04x" % len(payload) + payload)
+        self.read_status()
+
+    def read_status(self) -> None:
+        status = self.read_exact(4)
+        if status == b"OKAY":
+            return
+        if status == b"FAIL":
+            raise AdbError(self.read_string())
+        raise AdbError(f"Unexpected adb response: {status!r}")
+
+    def read_string(self) -> str:
+        length = int(self.read_exact(4), 16)
+        return self.read_exact(length).decode("utf-8", errors="ignore")
+
+    def read_exact(self, size: int) -> bytes:
+        data = bytearray()
+        while len(data) < size:
+            chunk = self.sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("adb server closed the connection")
+            data.extend(chunk)
+        return bytes(data)
+
+    def read_all(self, timeout: Optional[float] = None) -> bytes:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        chunks = []
+        while True:
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise AdbTimeout(f"adb command timed out after {timeout}s")
+                self.sock.settimeout(remaining)
+            try:
+                chunk = self.sock.recv(65536)
+            except TimeoutError as exc:
+                raise AdbTimeout(f"adb command timed out after {timeout}s") from exc
+            if not chunk:
+                return b"".join(chunks)
+            chunks.append(chunk)
+
+    def abort(self) -> None:
+        """Unblock a thread waiting on this connection; that thread still closes it."""
         try:
-            for child in current.iterdir():
-                if not child.is_dir():
-                    continue
-                if child.name in skip_names:
-                    continue
-                # Skip symlinks to avoid cycles
-                if child.is_symlink():
-                    continue
-                queue.append((child, depth + 1))
-        except PermissionError:
-            continue
-    return results
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def close(self) -> None:
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class AdbCancel:
+    """Lets an async caller abort a native adb call that is blocked in a worker thread."""
+
+    def __init__(self):
+        self.cancelled = False
+        self._lock = threading.Lock()
+        self._conns: set[AdbConnection] = set()
+
+    def track(self, conn: AdbConnection) -> None:
+        with self._lock:
+            if self.cancelled:
+                raise ConnectionAbortedError("adb call cancelled")
+            self._conns.add(conn)
+
+    def untrack(self, conn: AdbConnection) -> None:
+        with self._lock:
+            self._conns.discard(conn)
+
+    def cancel(self) -> None:
+        with self._lock:
+            self.cancelled = True
+            conns = list(self._conns)
+        for conn in conns:
+            conn.abort()
+
+
+class AdbShellSession:
+    """A persistent `sh` on the device; commands are delimited by printed exit markers."""
+
+    def __init__(self, serial: Optional[str], conn: AdbConnection):
+        self.serial = serial
+        self.conn = conn
+        self._buffer = bytearray()
+        self._counter = itertools.count(1)
+
+    def run(self, command: str, timeout: float) -> tuple[int, bytes]:
+        marker = f"__codex_done_{next(self._counter)}__"
+        # Pass the command as one word so a syntax error (e.g. an unbalanced quote) fails in the
+        # child shell right away instead of leaving the session waiting for more input.
+        script = f"sh -c {shlex.quote(command)} </dev/null 2>&1; printf '\\n{marker} %d\\n' $?\n"
+        self.conn.sock.sendall(script.encode("utf-8"))
+        token = f"\n{marker} ".encode("ascii")
+        deadline = time.monotonic() + timeout
+        while True:
+            idx = self._buffer.find(token)
+            if idx != -1:
+                end = self._buffer.find(b"\n", idx + len(token))
+                if end != -1:
+                    output = bytes(self._buffer[:idx])
+                    code = int(self._buffer[idx + len(token) : end] or b"0")
+                    del self._buffer[: end + 1]
+                    return code, output
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise AdbTimeout(f"adb shell command timed out: {command}")
+            self.conn.sock.settimeout(remaining)
+            try:
+                chunk = self.conn.sock.recv(65536)
+            except TimeoutError as exc:
+                raise AdbTimeout(f"adb shell command timed out: {command}") from exc
+            if not chunk:
+                raise ConnectionError("adb shell session closed")
+            self._buffer.extend(chunk)
+
+    def alive(self) -> bool:
+        """False once the adb server has closed this idle session, e.g. after its device went away."""
+        sock = self.conn.sock
+        timeout = sock.gettimeout()
+        sock.setblocking(False)
+        try:
+            return sock.recv(1, socket.MSG_PEEK) != b""
+        except BlockingIOError:
+            return True
+        except OSError:
+            return False
+        finally:
+            sock.settimeout(timeout)
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+class AdbClient:
+    """Talks to the adb server directly instead of spawning the `adb` binary for every call."""
+
+    def __init__(self, host: str = ADB_SERVER_HOST, port: int = ADB_SERVER_PORT, timeout: float = 10.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._idle: dict[Optional[str], list[AdbShellSession]] = {}
+        self._open: dict[Optional[str], int] = {}
+        self._cond = threading.Condition()
+
+    def connect(self) -> AdbConnection:
+        return AdbConnection.open(self.host, self.port, self.timeout)
+
+    def host_request(self, service: str) -> str:
+        conn = self.connect()
+        try:
+            conn.request(service)
+            return conn.read_string()
+        finally:
+            conn.close()
+
+    def version(self) -> int:
+        return int(self.host_request("host:version"), 16)
 
+    def devices(self) -> str:
+        return self.host_request("host:devices-l")
+
+    def transport(self, serial: Optional[str]) -> AdbConnection:
+        conn = self.connect()
+        try:
+            conn.request(f"host:transport:{serial}" if serial else "host:transport-any")
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    def exec_out(
+        self,
+        serial: Optional[str],
+        command: str,
+        timeout: float = ADB_COMMAND_TIMEOUT,
+        cancel: Optional[AdbCancel] = None,
+    ) -> bytes:
+        conn = self.transport(serial)
+        try:
+            if cancel:
+                cancel.track(conn)
+            conn.request(f"exec:{command}")
+            try:
+                return conn.read_all(timeout)
+            except OSError as exc:
+                # The command has started on the device; running it again through the binary could repeat it.
+                raise AdbError(f"adb connection lost while running {command}: {exc}") from exc
+        finally:
+            if cancel:
+                cancel.untrack(conn)
+            conn.close()
 
-def run_adb(args: list[str]) -> str:
+    def reverse(self, serial: Optional[str], local: str, remote: str) -> None:
+        conn = self.transport(serial)
+        try:
+            conn.request(f"reverse:forward:{local};{remote}")
+            conn.read_status()
+        finally:
+            conn.close()
+
+    def shell(
+        self,
+        serial: Optional[str],
+        command: str,
+        timeout: float = ADB_SHELL_TIMEOUT,
+        cancel: Optional[AdbCancel] = None,
+    ) -> tuple[int, bytes]:
+        session = self._acquire(serial)
+        try:
+            if cancel:
+                cancel.track(session.conn)
+            result = session.run(command, timeout)
+        except OSError as exc:
+            self._discard(session)
+            # The command has been sent and may have run; running it again through the binary could repeat it.
+            raise AdbError(f"adb shell session lost while running {command}: {exc}") from exc
+        except BaseException:
+            self._discard(session)
+            raise
+        finally:
+            if cancel:
+                cancel.untrack(session.conn)
+        self._release(session)
+        return result
+
+    def _acquire(self, serial: Optional[str]) -> AdbShellSession:
+        with self._cond:
+            while True:
+                idle = self._idle.get(serial)
+                while idle:
+                    session = idle.pop()
+                    if session.alive():
+                        return session
+                    session.close()
+                    self._open[serial] = max(0, self._open.get(serial, 0) - 1)
+                if self._open.get(serial, 0) < ADB_SHELL_POOL_SIZE:
+                    self._open[serial] = self._open.get(serial, 0) + 1
+                    break
+                self._cond.wait()
+        try:
+            conn = self.transport(serial)
+            conn.request("exec:sh")
+        except BaseException:
+            with self._cond:
+                self._open[serial] -= 1
+                self._cond.notify()
+            raise
+        return AdbShellSession(serial, conn)
+
+    def _release(self, session: AdbShellSession) -> None:
+        with self._cond:
+            self._idle.setdefault(session.serial, []).append(session)
+            self._cond.notify()
+
+    def _discard(self, session: AdbShellSession) -> None:
+        session.close()
+        with self._cond:
+            self._open[session.serial] = max(0, self._open.get(session.serial, 0) - 1)
+            self._cond.notify()
+
+    def close(self) -> None:
+        with self._cond:
+            sessions = [session for idle in self._idle.values() for session in idle]
+            self._idle.clear()
+            for session in sessions:
+                self._open[session.serial] = max(0, self._open.get(session.serial, 0) - 1)
+        for session in sessions:
+            session.close()
+
+
+ADB = AdbClient()
+
+
+def adb_native_command(
+    args: list[str], timeout: float = ADB_SHELL_TIMEOUT, cancel: Optional[AdbCancel] = None
+) -> Optional[bytes]:
+    """Run an `adb` argument list over the adb server socket; None if it needs the adb binary."""
+    serial = None
+    if len(args) >= 2 and args[0] == "-s":
+        serial, args = args[1], args[2:]
+    if not args:
+        return None
+    command, rest = args[0], args[1:]
     try:
-        result = subprocess.run(
-            ["adb"] + args,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            check=True,
-        )
-        return result.stdout.strip()
-    except FileNotFoundError as exc:
-        raise HTTPException(status_code=500, detail="adb not found in PATH") from exc
-    except subprocess.CalledProcessError as exc:
-        raise HTTPException(status_code=500, detail=exc.stdout.strip() or "adb command failed") from exc
+        if command == "devices" and serial is None:
+            return ("List of devices attached\n" + ADB.devices()).encode("utf-8")
+        if command == "shell" and rest:
+            code, output = ADB.shell(serial, " ".join(rest), timeout, cancel)
+            if code != 0:
+                detail = output.decode("utf-8", errors="ignore").strip()
+                raise HTTPException(status_code=500, detail=detail or "adb command failed")
+            return output
+        if command == "exec-out" and rest:
+            return ADB.exec_out(serial, " ".join(rest), timeout, cancel)
+        if command == "reverse" and len(rest) == 2 and not rest[0].startswith("-"):
+            ADB.reverse(serial, rest[0], rest[1])
+            return b""
+    except AdbError as exc:
+        raise HTTPException(status_code=500, detail=str(exc) or "adb command failed") from exc
+    return None
 
 
-def run_adb_binary(args: list[str]) -> bytes:
+def try_adb_native(
+    args: list[str], timeout: float = ADB_SHELL_TIMEOUT, cancel: Optional[AdbCancel] = None
+) -> Optional[bytes]:
+    if not ADB_NATIVE:
+        return None
     try:
-        result = subprocess.run(
-            ["adb"] + args,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            check=True,
-        )
-        return result.stdout
-    except FileNotFoundError as exc:
-        raise HTTPException(status_code=500, detail="adb not found in PATH") from exc
-    except subprocess.CalledProcessError as exc:
-        output = exc.stdout.decode("utf-8", errors="ignore") if exc.stdout else "adb command failed"
-        raise HTTPException(status_code=500, detail=output.strip()) from exc
+        return adb_native_command(args, timeout, cancel)
+    except (ConnectionRefusedError, FileNotFoundError, TimeoutError):
+        # No adb server yet (or it does not answer); the adb binary starts one on demand.
+        return None
+    except OSError as exc:
+        # Only raised before the device accepted the service; later failures are AdbErrors.
+        if not (cancel and cancel.cancelled):
+            logger.warning("adb server connection failed, using adb binary: %s", exc)
+        return None
 
 
 def adb_escape_text(value: str) -> str:
-    # adb input text expects no spaces; use %s for spaces.
-    return value.replace(" ", "%s")
+    """`input text` argument as one shell word: spaces become %s, everything else is quoted."""
+    return shlex.quote(value.replace(" ", "%s"))
+
+
+class CommandError(Exception):
+    def __init__(self, message: str, returncode: Optional[int] = None, output: bytes = b""):
+        super().__init__(message)
+        self.returncode = returncode
+        self.output = output
+
 
+class CommandTimeout(CommandError):
+    pass
 
-def run_command(args: list[str], cwd: Optional[Path] = None, timeout: int = 900) -> str:
+
+@dataclass
+class CommandResult:
+    returncode: int
+    stdout: bytes
+    stderr: bytes
+    truncated: bool = False
+
+    def text(self) -> str:
+        return self.stdout.decode("utf-8", errors="ignore").strip()
+
+
+class CappedBuffer:
+    """Collects process output, keeping only the last `limit` bytes."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.chunks: deque[bytes] = deque()
+        self.size = 0
+        self.truncated = False
+
+    def append(self, data: bytes) -> None:
+        self.chunks.append(data)
+        self.size += len(data)
+        while self.size > self.limit:
+            excess = self.size - self.limit
+            head = self.chunks[0]
+            if len(head) <= excess:
+                self.chunks.popleft()
+                self.size -= len(head)
+            else:
+                self.chunks[0] = head[excess:]
+                self.size -= excess
+            self.truncated = True
+
+    def getvalue(self) -> bytes:
+        return b"".join(self.chunks)
+
+
+_command_limits: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, asyncio.Semaphore]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def loop_semaphore(registry: weakref.WeakKeyDictionary, key: str, size: int) -> asyncio.Semaphore:
+    # Semaphores are bound to the loop they are first used on, so keep one set per loop.
+    limits = registry.setdefault(asyncio.get_running_loop(), {})
+    limit = limits.get(key)
+    if limit is None:
+        limit = asyncio.Semaphore(size)
+        limits[key] = limit
+    return limit
+
+
+def command_limit(family: str) -> asyncio.Semaphore:
+    return loop_semaphore(_command_limits, family, COMMAND_CONCURRENCY.get(family, COMMAND_CONCURRENCY["default"]))
+
+
+async def _drain_stream(
+    stream: asyncio.StreamReader, buffer: CappedBuffer, on_line: Optional[Callable[[str], None]] = None
+) -> None:
+    pending = b""
+    while True:
+        chunk = await stream.read(65536)
+        if not chunk:
+            if on_line and pending:
+                on_line(pending.decode("utf-8", errors="replace"))
+            return
+        buffer.append(chunk)
+        if on_line:
+            *lines, pending = (pending + chunk).split(b"\n")
+            for line in lines:
+                on_line(line.rstrip(b"\r").decode("utf-8", errors="replace"))
+
+
+async def _feed_stdin(stream: asyncio.StreamWriter, data: bytes) -> None:
     try:
-        result = subprocess.run(
-            args,
+        stream.write(data)
+        await stream.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        pass
+    finally:
+        stream.close()
+
+
+async def _kill_process(process: asyncio.subprocess.Process) -> None:
+    if process.returncode is None:
+        try:
+            # Each command runs in its own session; take down children (gradle, node) too.
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            process.kill()
+    await process.wait()
+
+
+async def run_process(
+    args: list[str],
+    *,
+    cwd: Optional[Path] = None,
+    env: Optional[dict[str, str]] = None,
+    input: Optional[bytes] = None,
+    timeout: Optional[float] = None,
+    family: str = "default",
+    max_output: int = COMMAND_OUTPUT_LIMIT,
+    merge_stderr: bool = True,
+    on_line: Optional[Callable[[str], None]] = None,
+) -> CommandResult:
+    """Run a command without blocking the event loop.
+
+    Concurrency is bounded per command family, output is capped (keeping the
+    tail), and the process group is killed on timeout or when the awaiting
+    task is cancelled. `on_line` receives stdout lines as they arrive.
+    """
+    async with command_limit(family):
+        process = await asyncio.create_subprocess_exec(
+            *args,
             cwd=str(cwd) if cwd else None,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            check=True,
-            timeout=timeout,
+            env=env,
+            stdin=asyncio.subprocess.PIPE if input is not None else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT if merge_stderr else asyncio.subprocess.PIPE,
+            start_new_session=True,
         )
-        return result.stdout.strip()
+        stdout = CappedBuffer(max_output)
+        stderr = CappedBuffer(max_output)
+
+        async def communicate() -> int:
+            tasks = [_drain_stream(process.stdout, stdout, on_line)]
+            if not merge_stderr:
+                tasks.append(_drain_stream(process.stderr, stderr))
+            if input is not None:
+                tasks.append(_feed_stdin(process.stdin, input))
+            await asyncio.gather(*tasks)
+            return await process.wait()
+
+        try:
+            returncode = await asyncio.wait_for(communicate(), timeout)
+        except asyncio.TimeoutError as exc:
+            await _kill_process(process)
+            raise CommandTimeout(f"Command timed out after {timeout}s", None, stdout.getvalue()) from exc
+        except BaseException:
+            await _kill_process(process)
+            raise
+    return CommandResult(returncode, stdout.getvalue(), stderr.getvalue(), stdout.truncated or stderr.truncated)
+
+
+async def run_command_async(
+    args: list[str],
+    cwd: Optional[Path] = None,
+    timeout: int = 900,
+    family: str = "default",
+    on_line: Optional[Callable[[str], None]] = None,
+) -> str:
+    try:
+        result = await run_process(args, cwd=cwd, timeout=timeout, family=family, on_line=on_line)
     except FileNotFoundError as exc:
         raise HTTPException(status_code=500, detail=f"Command not found: {args[0]}") from exc
-    except subprocess.TimeoutExpired as exc:
-        output = exc.stdout or ""
+    except CommandTimeout as exc:
+        output = exc.output.decode("utf-8", errors="ignore")
         raise HTTPException(status_code=500, detail=f"Command timed out. Output:\n{output}") from exc
-    except subprocess.CalledProcessError as exc:
-        raise HTTPException(status_code=500, detail=exc.stdout.strip() or "Command failed") from exc
+    if result.returncode != 0:
+        raise HTTPException(status_code=500, detail=result.text() or "Command failed")
+    return result.text()
+
+
+async def run_adb_binary_async(
+    args: list[str], timeout: float = ADB_COMMAND_TIMEOUT, on_line: Optional[Callable[[str], None]] = None
+) -> bytes:
+    command = adb_command_label(args)
+    started = time.perf_counter()
+    cancel = AdbCancel()
+    try:
+        async with command_limit("adb"):
+            output = await asyncio.to_thread(try_adb_native, args, timeout, cancel)
+    except HTTPException:
+        ADB_COMMAND_ERRORS.inc(1, command)
+        raise
+    except asyncio.CancelledError:
+        # The worker thread cannot be cancelled; closing its socket makes it return.
+        cancel.cancel()
+        raise
+    if output is not None:
+        ADB_COMMAND_DURATION.observe(time.perf_counter() - started, command, "native")
+        return output
+    family = "adb-install" if "install" in args else "adb"
+    try:
+        result = await run_process(
+            ["adb"] + args, timeout=timeout, family=family, max_output=ADB_BINARY_OUTPUT_LIMIT, on_line=on_line
+        )
+    except FileNotFoundError as exc:
+        ADB_COMMAND_ERRORS.inc(1, command)
+        raise HTTPException(status_code=500, detail="adb not found in PATH") from exc
+    except CommandTimeout as exc:
+        ADB_COMMAND_ERRORS.inc(1, command)
+        raise HTTPException(status_code=500, detail=f"adb command timed out after {timeout}s") from exc
+    if result.returncode != 0:
+        ADB_COMMAND_ERRORS.inc(1, command)
+        raise HTTPException(status_code=500, detail=result.text() or "adb command failed")
+    ADB_COMMAND_DURATION.observe(time.perf_counter() - started, command, "binary")
+    return result.stdout
+
+
+async def run_adb_async(
+    args: list[str], timeout: float = ADB_COMMAND_TIMEOUT, on_line: Optional[Callable[[str], None]] = None
+) -> str:
+    output = await run_adb_binary_async(args, timeout, on_line)
+    return output.decode("utf-8", errors="ignore").strip()
+
+
+async def cancel_on_disconnect(request: Request, awaitable):
+    """Await `awaitable`, cancelling it (and its child process) if the client goes away."""
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                raise HTTPException(status_code=499, detail="Client disconnected")
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
 
 
-def list_adb_devices() -> list[dict]:
-    output = run_adb(["devices", "-l"])
+def parse_adb_devices(output: str) -> list[tuple[str, dict]]:
+    """Parse `adb devices -l` output into (state, device) pairs."""
     devices = []
     for line in output.splitlines():
         line = line.strip()
@@ -666,27 +3022,165 @@ def list_adb_devices() -> list[dict]:
             continue
         serial = parts[0]
         state = parts[1]
-        if state != "device":
-            continue
         details = {"serial": serial}
         for part in parts[2:]:
             if ":" in part:
                 key, value = part.split(":", 1)
                 details[key] = value
         devices.append(
-            {
-                "id": serial,
-                "model": details.get("model", ""),
-                "product": details.get("product", ""),
-                "device": details.get("device", ""),
-                "transport_id": details.get("transport_id", ""),
-            }
+            (
+                state,
+                {
+                    "id": serial,
+                    "model": details.get("model", ""),
+                    "product": details.get("product", ""),
+                    "device": details.get("device", ""),
+                    "transport_id": details.get("transport_id", ""),
+                },
+            )
         )
     return devices
 
 
-def resolve_device_id(device_id: Optional[str]) -> str:
-    devices = list_adb_devices()
+class DeviceRegistry:
+    """Device list kept current by an adb `track-devices` subscription."""
+
+    RETRY_DELAYS = (0.5, 1.0, 2.0, 5.0)
+
+    def __init__(self, client: Optional[AdbClient] = None):
+        self._client = client
+        self._lock = threading.Lock()
+        self._states: dict[str, str] = {}
+        self._details: dict[str, dict] = {}
+        self._connected = False
+        self._conn: Optional[AdbConnection] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._subscribers: dict[asyncio.Queue, asyncio.AbstractEventLoop] = {}
+        self.version = 0
+
+    @property
+    def client(self) -> AdbClient:
+        return self._client or ADB
+
+    def start(self) -> None:
+        if not ADB_NATIVE:
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self._lock:
+            conn = self._conn
+        if conn:
+            try:
+                conn.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._thread:
+            self._thread.join(timeout=2)
+
+    def devices(self) -> Optional[list[dict]]:
+        """Online devices, or None while the registry is not connected to the adb server."""
+        with self._lock:
+            if not self._connected:
+                return None
+            return [dict(self._details[serial]) for serial, state in self._states.items() if state == "device"]
+
+    def subscribe(self, loop: asyncio.AbstractEventLoop) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        with self._lock:
+            queue.put_nowait({"type": "snapshot", "devices": self._all_locked()})
+            self._subscribers[queue] = loop
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        with self._lock:
+            self._subscribers.pop(queue, None)
+
+    def _all_locked(self) -> list[dict]:
+        return [dict(self._details[serial], state=state) for serial, state in self._states.items()]
+
+    def _run(self) -> None:
+        attempt = 0
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = self.client.connect()
+                conn.request("host:track-devices")
+                conn.sock.settimeout(None)
+                with self._lock:
+                    self._conn = conn
+                attempt = 0
+                while not self._stop.is_set():
+                    self._apply(conn.read_string())
+            except (OSError, AdbError, ValueError) as exc:
+                if not self._stop.is_set():
+                    logger.debug("adb track-devices disconnected: %s", exc)
+            finally:
+                if conn:
+                    conn.close()
+                with self._lock:
+                    self._conn = None
+                    self._connected = False
+            delay = self.RETRY_DELAYS[min(attempt, len(self.RETRY_DELAYS) - 1)]
+            attempt += 1
+            self._stop.wait(delay)
+
+    def _apply(self, payload: str) -> None:
+        states: dict[str, str] = {}
+        for line in payload.splitlines():
+            parts = line.split()
+            if len(parts) >= 2:
+                states[parts[0]] = parts[1]
+        with self._lock:
+            previous = dict(self._states)
+            known = set(self._details)
+        details: dict[str, dict] = {}
+        if any(serial not in known or previous.get(serial) != state for serial, state in states.items()):
+            # track-devices only reports states; fetch attributes once per change.
+            details = {device["id"]: device for _, device in parse_adb_devices(self.client.devices())}
+        events = []
+        with self._lock:
+            for serial, state in states.items():
+                if serial in details:
+                    self._details[serial] = details[serial]
+                self._details.setdefault(serial, {"id": serial, "model": "", "product": "", "device": "", "transport_id": ""})
+                if serial not in previous:
+                    events.append({"type": "added", "state": state, "device": dict(self._details[serial])})
+                elif previous[serial] != state:
+                    events.append({"type": "changed", "state": state, "device": dict(self._details[serial])})
+            for serial in previous:
+                if serial not in states:
+                    events.append({"type": "removed", "state": "gone", "device": self._details.pop(serial)})
+            self._states = states
+            self._connected = True
+            self.version += 1
+            subscribers = list(self._subscribers.items())
+        for event in events:
+            for queue, loop in subscribers:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+
+
+DEVICES = DeviceRegistry()
+
+
+async def list_adb_devices() -> list[dict]:
+    DEVICES.start()
+    devices = DEVICES.devices()
+    if devices is not None:
+        return devices
+    output = await run_adb_async(["devices", "-l"])
+    return [device for state, device in parse_adb_devices(output) if state == "device"]
+
+
+async def resolve_device_id(device_id: Optional[str]) -> str:
+    devices = await list_adb_devices()
     if not devices:
         raise HTTPException(status_code=404, detail="No adb devices connected")
     if device_id:
@@ -696,7 +3190,7 @@ def resolve_device_id(device_id: Optional[str]) -> str:
     return devices[0]["id"]
 
 
-def set_rn_debug_host(device_id: str, package: str, host: str, port: int) -> None:
+async def set_rn_debug_host(device_id: str, package: str, host: str, port: int) -> None:
     host_port = f"{host}:{port}"
     xml = (
         "<?xml version='1.0' encoding='utf-8' standalone='yes' ?>\n"
@@ -709,17 +3203,18 @@ def set_rn_debug_host(device_id: str, package: str, host: str, port: int) -> Non
         "mkdir -p shared_prefs && "
         f"echo {encoded} | base64 -d > shared_prefs/com.facebook.react.devsupport.DevInternalSettings.xml"
     )
-    run_adb(["-s", device_id, "shell", "run-as", package, "sh", "-c", cmd])
+    await run_adb_async(["-s", device_id, "shell", "run-as", package, "sh", "-c", cmd])
 
 
-def rn_reload(device_id: str) -> None:
-    run_adb(["-s", device_id, "shell", "input", "text", "RR"])
+async def rn_reload(device_id: str) -> None:
+    await run_adb_async(["-s", device_id, "shell", "input", "text", "RR"])
 
 
 
 def get_stt_model():
     global _stt_model
-    apply_stt_settings(load_config())
+    # Applies changed STT settings through the config subscriber.
+    load_config()
     if _stt_model is not None:
         return _stt_model
     with _stt_lock:
@@ -741,6 +3236,7 @@ def get_stt_model():
 
 def transcribe_file(path: str, language: Optional[str]):
     model = get_stt_model()
+    started = time.perf_counter()
     segments, info = model.transcribe(
         path,
         language=language or None,
@@ -748,7 +3244,14 @@ def transcribe_file(path: str, language: Optional[str]):
         best_of=1,
         vad_filter=True,
     )
+    # Segments are decoded lazily, so the work happens while joining them.
     text = "".join(segment.text for segment in segments).strip()
+    elapsed = time.perf_counter() - started
+    STT_DURATION.observe(elapsed)
+    duration = getattr(info, "duration", None)
+    if duration:
+        STT_AUDIO_SECONDS.inc(duration)
+        STT_REAL_TIME_FACTOR.observe(elapsed / duration)
     return text, info
 
 
@@ -766,7 +3269,12 @@ async def stt(file: UploadFile = File(...), language: Optional[str] = Form(None)
             tmp.write(await file.read())
             tmp_path = tmp.name
 
-        text, info = await asyncio.to_thread(transcribe_file, tmp_path, language)
+        STT_QUEUE_DEPTH.inc()
+        try:
+            text, info = await asyncio.to_thread(transcribe_file, tmp_path, language)
+        finally:
+            STT_QUEUE_DEPTH.dec()
+        STT_REQUESTS.inc(1, "ok")
         elapsed = time.monotonic() - start
         logger.info("STT done in %.2fs (%d chars)", elapsed, len(text))
         return {
@@ -776,9 +3284,11 @@ async def stt(file: UploadFile = File(...), language: Optional[str] = Form(None)
             "duration": getattr(info, "duration", None),
         }
     except RuntimeError as exc:
+        STT_REQUESTS.inc(1, "error")
         logger.exception("STT runtime error")
         raise HTTPException(status_code=500, detail=str(exc)) from exc
     except Exception as exc:
+        STT_REQUESTS.inc(1, "error")
         logger.exception("STT failed")
         raise HTTPException(status_code=500, detail=f"STT failed: {exc}") from exc
     finally:
@@ -826,9 +3336,32 @@ def runner_scan(path: Optional[str] = None, depth: int = 2):
     return {"base": str(cwd), "depth": depth, "projects": projects}
 
 
+@app.get("/runner/scan/stream")
+def runner_scan_stream(
+    path: Optional[str] = None,
+    depth: int = 2,
+    budget: float = PROJECT_SCAN_BUDGET,
+    format: str = "ndjson",
+):
+    cwd = resolve_workdir(path)
+    if not cwd.exists() or not cwd.is_dir():
+        raise HTTPException(status_code=404, detail=f"Working directory not found: {cwd}")
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be ndjson or sse")
+    budget = max(0.1, min(budget, 300.0))
+
+    async def body():
+        async for item in stream_projects(cwd, depth, budget):
+            payload = json.dumps(item)
+            yield f"data: {payload}\n\n" if format == "sse" else payload + "\n"
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(body(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+
 @app.get("/runner/devices")
-def runner_devices():
-    return {"devices": list_adb_devices()}
+async def runner_devices():
+    return {"devices": await list_adb_devices()}
 
 
 @app.get("/runner/status")
@@ -837,12 +3370,84 @@ def runner_status():
 
 
 @app.get("/runner/logs")
-def runner_logs():
-    return RUNNER.logs()
+def runner_logs(since: Optional[int] = None, limit: int = RUNNER_LOG_BATCH):
+    if since is None:
+        return RUNNER.logs()
+    return RUNNER.logs_since(max(0, since), max(1, min(limit, RUNNER_LOG_BATCH)))
+
+
+@app.get("/runner/history")
+def runner_history():
+    return {"runs": RUNNER_LOGS.runs()}
+
+
+@app.get("/runner/history/search")
+def runner_history_search(q: str, run: Optional[str] = None, stream: Optional[str] = None, limit: int = 100):
+    if not q:
+        raise HTTPException(status_code=400, detail="Query is required")
+    return {"query": q, "matches": RUNNER_LOGS.search(q, run, stream, max(1, min(limit, 1000)))}
+
+
+@app.get("/runner/history/{run_id}/{stream}")
+def runner_history_lines(
+    run_id: str,
+    stream: str,
+    tail: Optional[int] = None,
+    line: Optional[int] = None,
+    at: Optional[float] = None,
+    count: int = 200,
+):
+    count = max(1, min(count, 5000))
+    if line is not None:
+        return RUNNER_LOGS.read(run_id, stream, max(0, line), count)
+    if at is not None:
+        return RUNNER_LOGS.read(run_id, stream, RUNNER_LOGS.line_at(run_id, stream, at), count)
+    return RUNNER_LOGS.tail(run_id, stream, max(1, min(tail or count, 5000)))
+
+
+@app.websocket("/runner/logs/stream")
+async def runner_logs_stream(websocket: WebSocket):
+    await websocket.accept()
+    try:
+        since = max(0, int(websocket.query_params.get("since") or 0))
+    except ValueError:
+        since = 0
+    signal = RUNNER.log_signal
+    wake = signal.subscribe(asyncio.get_running_loop())
+
+    async def sender():
+        nonlocal since
+        try:
+            while True:
+                # Re-arm before reading so lines appended meanwhile trigger another pass.
+                signal.rearm(wake)
+                batch = RUNNER.logs_since(since)
+                if batch["lines"] or batch["reset"]:
+                    await websocket.send_text(json.dumps(dict(batch, type="lines")))
+                since = batch["seq"]
+                if not batch["more"]:
+                    await wake.wait()
+        except WebSocketDisconnect:
+            return
+        except Exception:
+            logger.exception("Runner log stream failed")
+            await websocket.close(code=1011)
+
+    sender_task = asyncio.create_task(sender())
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    except Exception:
+        logger.exception("Runner log stream failed")
+    finally:
+        sender_task.cancel()
+        signal.unsubscribe(wake)
 
 
 @app.post("/runner/start")
-def runner_start(payload: RunnerStartRequest):
+async def runner_start(payload: RunnerStartRequest):
     cwd = resolve_workdir(payload.path)
     if not cwd.exists() or not cwd.is_dir():
         raise HTTPException(status_code=404, detail=f"Working directory not found: {cwd}")
@@ -853,14 +3458,16 @@ def runner_start(payload: RunnerStartRequest):
             project_type = "react-native"
     if not project_type:
         raise HTTPException(status_code=400, detail="Project type not detected. Set project_type explicitly.")
-    device_id = resolve_device_id(payload.device_id)
+    device_id = await resolve_device_id(payload.device_id)
     mode = (payload.mode or "adb").lower()
     metro_port = payload.metro_port or 8081
     try:
         if project_type == "react-native":
-            RUNNER.start_react_native(cwd, device_id, mode, metro_port)
+            if mode == "adb":
+                await run_adb_async(["-s", device_id, "reverse", f"tcp:{metro_port}", f"tcp:{metro_port}"])
+            await asyncio.to_thread(RUNNER.start_react_native, cwd, device_id, mode, metro_port)
         elif project_type == "flutter":
-            RUNNER.start_flutter(cwd, device_id)
+            await asyncio.to_thread(RUNNER.start_flutter, cwd, device_id)
         else:
             raise HTTPException(status_code=400, detail=f"Unsupported project type: {project_type}")
     except HTTPException:
@@ -872,8 +3479,8 @@ def runner_start(payload: RunnerStartRequest):
 
 
 @app.post("/runner/open")
-def runner_open(payload: RunnerOpenRequest):
-    device_id = resolve_device_id(payload.device_id)
+async def runner_open(payload: RunnerOpenRequest):
+    device_id = await resolve_device_id(payload.device_id)
     package = payload.package
     if not package:
         cwd = None
@@ -886,7 +3493,7 @@ def runner_open(payload: RunnerOpenRequest):
     if not package:
         raise HTTPException(status_code=400, detail="Android package not detected. Select a project or set package.")
     try:
-        run_adb(
+        await run_adb_async(
             [
                 "-s",
                 device_id,
@@ -906,118 +3513,1294 @@ def runner_open(payload: RunnerOpenRequest):
     return {"status": "ok", "package": package}
 
 
-@app.post("/runner/stop")
-def runner_stop():
-    RUNNER.stop()
-    return {"status": "stopped"}
+@app.post("/runner/stop")
+def runner_stop():
+    RUNNER.stop()
+    return {"status": "stopped"}
+
+
+@app.post("/runner/reload")
+async def runner_reload(payload: RunnerReloadRequest):
+    kind = payload.type.lower()
+    if kind in ("hot", "reload"):
+        full_restart = False
+    elif kind in ("restart", "hot_restart"):
+        full_restart = True
+    else:
+        raise HTTPException(status_code=400, detail="Unknown reload type")
+    record = await RUNNER.reload(full_restart)
+    reload_type = "restart" if full_restart else "hot"
+    if record is None:
+        return {"status": "ignored", "type": reload_type}
+    if not record["ok"]:
+        raise HTTPException(status_code=500, detail=record["error"])
+    return {"status": "ok", "type": reload_type, "duration_ms": record["duration_ms"]}
+
+
+@app.post("/runner/rn/host")
+async def runner_rn_host(payload: RunnerRnHostRequest):
+    if not payload.host:
+        raise HTTPException(status_code=400, detail="Host is required")
+    device_id = await resolve_device_id(payload.device_id)
+    package = payload.package
+    if not package:
+        cwd = resolve_workdir(payload.path)
+        package = detect_android_package(cwd)
+    if not package:
+        raise HTTPException(status_code=400, detail="React Native package not found")
+    try:
+        await set_rn_debug_host(device_id, package, payload.host, payload.port)
+    except HTTPException:
+        raise
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+    return {"status": "ok", "package": package}
+
+
+@app.post("/runner/rn/reload")
+async def runner_rn_reload(payload: RunnerRnReloadRequest):
+    device_id = await resolve_device_id(payload.device_id)
+    try:
+        await rn_reload(device_id)
+    except HTTPException:
+        raise
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+    return {"status": "ok"}
+
+
+@app.post("/runner/devmenu")
+async def runner_devmenu(device_id: Optional[str] = None):
+    resolved = await resolve_device_id(device_id)
+    await RUNNER.dev_menu(resolved)
+    return {"status": "ok"}
+
+
+class H264NalSplitter:
+    """Incrementally split an Annex B H.264 byte stream into NAL units."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._scan = 0
+
+    def feed(self, data: bytes) -> list[bytes]:
+        self._buffer.extend(data)
+        units: list[bytes] = []
+        buffer = self._buffer
+        start = self._find_start(0)
+        if start is None:
+            return units
+        begin, payload = start
+        search = max(payload, self._scan)
+        while True:
+            nxt = self._find_start(search)
+            if nxt is None:
+                break
+            next_begin, next_payload = nxt
+            units.append(H264_START_CODE + bytes(buffer[payload:next_begin]))
+            begin, payload = next_begin, next_payload
+            search = payload
+        del buffer[:begin]
+        # Resume scanning where we stopped; keep two bytes for a split start code.
+        self._scan = max(payload - begin, len(buffer) - 2)
+        return units
+
+    def flush(self) -> list[bytes]:
+        start = self._find_start(0)
+        units = []
+        if start and start[1] < len(self._buffer):
+            units.append(H264_START_CODE + bytes(self._buffer[start[1]:]))
+        self._buffer.clear()
+        self._scan = 0
+        return units
+
+    def _find_start(self, offset: int) -> Optional[tuple[int, int]]:
+        idx = self._buffer.find(b"\x00\x00\x01", offset)
+        if idx == -1:
+            return None
+        begin = idx - 1 if idx > 0 and self._buffer[idx - 1] == 0 else idx
+        return begin, idx + 3
+
+
+def h264_nal_type(unit: bytes) -> int:
+    return unit[len(H264_START_CODE)] & 0x1F if len(unit) > len(H264_START_CODE) else 0
+
+
+class ScreenStreamSubscriber:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=LIVE_STREAM_QUEUE_SIZE)
+        self.needs_keyframe = False
+        self.dropped = 0
+
+
+class ScreenStream:
+    """One long-lived `screenrecord` H.264 pipe per device, fanned out to WebSocket subscribers.
+
+    The encoder is shared, so `bit_rate` and `size` are fixed by the first subscriber; later
+    subscribers get the running stream and see its settings in the `stream` message.
+    """
+
+    def __init__(self, device_id: str, bit_rate: int, size: Optional[str]):
+        self.device_id = device_id
+        self.bit_rate = bit_rate
+        self.size = size
+        self.started_at: Optional[float] = None
+        self.frames = 0
+        self.bytes_out = 0
+        self.restarts = 0
+        self.last_error: Optional[str] = None
+        self._subscribers: set[ScreenStreamSubscriber] = set()
+        self._config: dict[int, bytes] = {}
+        self._gop: list[bytes] = []
+        self._gop_bytes = 0
+        self._process: Optional[subprocess.Popen] = None
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._last_keyframe_request = 0.0
+        self._lock = threading.Lock()
+
+    def command(self) -> list[str]:
+        cmd = [
+            "adb",
+            "-s",
+            self.device_id,
+            "exec-out",
+            "screenrecord",
+            "--output-format=h264",
+            "--bit-rate",
+            str(self.bit_rate),
+        ]
+        if self.size:
+            cmd += ["--size", self.size]
+        return cmd + ["-"]
+
+    def subscribe(self, loop: asyncio.AbstractEventLoop) -> ScreenStreamSubscriber:
+        subscriber = ScreenStreamSubscriber(loop)
+        with self._lock:
+            # Prime late joiners with codec config and the current GOP so they can decode at once.
+            # A GOP longer than the queue cannot be primed; start that client at the next keyframe.
+            backlog = list(self._config.values()) + self._gop
+            if len(backlog) <= subscriber.queue.maxsize:
+                for unit in backlog:
+                    subscriber.queue.put_nowait(unit)
+            else:
+                subscriber.needs_keyframe = True
+            self._subscribers.add(subscriber)
+            if not self._running:
+                self._running = True
+                self.started_at = time.time()
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber: ScreenStreamSubscriber) -> bool:
+        """Remove a subscriber; returns True when the stream has no subscribers left."""
+        with self._lock:
+            self._subscribers.discard(subscriber)
+            if self._subscribers:
+                return False
+            self._running = False
+            process = self._process
+        self._terminate(process)
+        return True
+
+    def request_keyframe(self) -> None:
+        # screenrecord has no keyframe request, so restart the encoder (rate limited).
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_keyframe_request < 2.0:
+                return
+            self._last_keyframe_request = now
+            process = self._process
+        self._terminate(process)
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "device_id": self.device_id,
+                "bit_rate": self.bit_rate,
+                "size": self.size,
+                "subscribers": len(self._subscribers),
+                "frames": self.frames,
+                "bytes": self.bytes_out,
+                "restarts": self.restarts,
+                "started_at": self.started_at,
+                "last_error": self.last_error,
+            }
+
+    @staticmethod
+    def _terminate(process: Optional[subprocess.Popen]) -> None:
+        if process and process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def _run(self) -> None:
+        failures = 0
+        while True:
+            with self._lock:
+                if not self._running:
+                    return
+                self._config.clear()
+                self._gop = []
+                self._gop_bytes = 0
+                try:
+                    self._process = subprocess.Popen(
+                        self.command(),
+                        stdout=subprocess.PIPE,
+                        stderr=subprocess.DEVNULL,
+                    )
+                except FileNotFoundError:
+                    self.last_error = "adb not found in PATH"
+                    self._process = None
+                process = self._process
+            if process is None:
+                break
+            received = self._pump(process)
+            process.wait()
+            if received:
+                failures = 0
+            else:
+                failures += 1
+                self.last_error = f"screenrecord exited with code {process.returncode}"
+                if failures >= 3:
+                    break
+                time.sleep(0.5)
+            # screenrecord stops at its time limit; restart transparently while anyone listens.
+            self.restarts += 1
+        with self._lock:
+            self._running = False
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.loop.call_soon_threadsafe(self._close_subscriber, subscriber)
+
+    def _pump(self, process: subprocess.Popen) -> bool:
+        splitter = H264NalSplitter()
+        received = False
+        assert process.stdout is not None
+        while True:
+            chunk = process.stdout.read1(65536)
+            if not chunk:
+                for unit in splitter.flush():
+                    self._publish(unit)
+                return received
+            received = True
+            for unit in splitter.feed(chunk):
+                self._publish(unit)
+
+    def _publish(self, unit: bytes) -> None:
+        nal_type = h264_nal_type(unit)
+        keyframe = nal_type == 5
+        with self._lock:
+            if nal_type in (7, 8):
+                self._config[nal_type] = unit
+            elif keyframe or (nal_type == 1 and self._gop):
+                if keyframe:
+                    self._gop = []
+                    self._gop_bytes = 0
+                if self._gop_bytes + len(unit) <= LIVE_STREAM_GOP_LIMIT:
+                    self._gop.append(unit)
+                    self._gop_bytes += len(unit)
+            if nal_type in (1, 5):
+                self.frames += 1
+            self.bytes_out += len(unit)
+            config = list(self._config.values())
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.loop.call_soon_threadsafe(self._offer, subscriber, unit, keyframe, config)
+
+    @staticmethod
+    def _offer(subscriber: ScreenStreamSubscriber, unit: bytes, keyframe: bool, config: list[bytes]) -> None:
+        if subscriber.needs_keyframe:
+            if not keyframe:
+                return
+            subscriber.needs_keyframe = False
+            for item in config:
+                subscriber.queue.put_nowait(item)
+        try:
+            subscriber.queue.put_nowait(unit)
+        except asyncio.QueueFull:
+            # Slow client: drop the backlog and resume at the next keyframe.
+            while not subscriber.queue.empty():
+                subscriber.queue.get_nowait()
+            subscriber.dropped += 1
+            subscriber.needs_keyframe = True
+
+    @staticmethod
+    def _close_subscriber(subscriber: ScreenStreamSubscriber) -> None:
+        while subscriber.queue.full():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+
+
+class ScreenStreamManager:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._streams: dict[str, ScreenStream] = {}
+
+    def subscribe(
+        self, device_id: str, bit_rate: int, size: Optional[str], loop: asyncio.AbstractEventLoop
+    ) -> tuple[ScreenStream, ScreenStreamSubscriber]:
+        with self._lock:
+            stream = self._streams.get(device_id)
+            if stream is None:
+                stream = ScreenStream(device_id, bit_rate, size)
+                self._streams[device_id] = stream
+            return stream, stream.subscribe(loop)
+
+    def unsubscribe(self, stream: ScreenStream, subscriber: ScreenStreamSubscriber) -> None:
+        with self._lock:
+            if stream.unsubscribe(subscriber) and self._streams.get(stream.device_id) is stream:
+                del self._streams[stream.device_id]
+
+    def status(self) -> list[dict]:
+        with self._lock:
+            return [stream.status() for stream in self._streams.values()]
+
+
+SCREEN_STREAMS = ScreenStreamManager()
+
+
+@app.websocket("/devices/events")
+async def devices_events(websocket: WebSocket):
+    await websocket.accept()
+    DEVICES.start()
+    queue = DEVICES.subscribe(asyncio.get_running_loop())
+
+    async def sender():
+        try:
+            while True:
+                event = await queue.get()
+                await websocket.send_text(json.dumps(event))
+        except WebSocketDisconnect:
+            return
+        except Exception:
+            logger.exception("Device event stream failed")
+            await websocket.close(code=1011)
+
+    sender_task = asyncio.create_task(sender())
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    except Exception:
+        logger.exception("Device event stream failed")
+    finally:
+        sender_task.cancel()
+        DEVICES.unsubscribe(queue)
+
+
+@app.get("/live/devices")
+async def live_devices():
+    return {"devices": await list_adb_devices()}
+
+
+@dataclass
+class LiveFrame:
+    digest: str
+    content: bytes
+    media_type: str
+    captured_at: float
+
+
+class LiveFrameCache:
+    """Last encoded frame per (device, format, quality, size), keyed by the screen content hash."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._frames: dict[tuple, LiveFrame] = {}
+
+    def get(self, key: tuple, digest: str) -> Optional[LiveFrame]:
+        with self._lock:
+            frame = self._frames.get(key)
+        if frame and frame.digest == digest:
+            return frame
+        return None
+
+    def put(self, key: tuple, frame: LiveFrame) -> None:
+        with self._lock:
+            self._frames[key] = frame
+
+
+LIVE_FRAMES = LiveFrameCache()
+LIVE_SNAPSHOT_MAX_WAIT = 30.0
+LIVE_SNAPSHOT_POLL_INTERVAL = 0.15
+LIVE_TILE_MAX_SESSIONS = 8
+LIVE_TILE_IDLE_SECONDS = 120.0
+
+
+SCREENCAP_PIXEL_FORMATS = {
+    1: ("RGBA", 4),
+    2: ("RGBX", 4),
+    3: ("RGB", 3),
+    4: ("BGR;16", 2),
+    5: ("BGRA", 4),
+}
+# Byte offsets of R, G, B inside one pixel, for the formats we can convert without Pillow.
+RAW_RGB_OFFSETS = {
+    "RGBA": (0, 1, 2),
+    "RGBX": (0, 1, 2),
+    "RGB": (0, 1, 2),
+    "BGRA": (2, 1, 0),
+}
+
+_pillow_image = None
+_pillow_checked = False
+
+
+@dataclass
+class RawScreen:
+    width: int
+    height: int
+    rawmode: str
+    bpp: int
+    pixels: bytes
+
+
+def parse_raw_screencap(data: bytes) -> RawScreen:
+    if len(data) < 12:
+        raise ValueError("Truncated screencap header")
+    width, height, pixel_format = struct.unpack_from("<III", data, 0)
+    spec = SCREENCAP_PIXEL_FORMATS.get(pixel_format)
+    if spec is None:
+        raise ValueError(f"Unsupported screencap pixel format: {pixel_format}")
+    rawmode, bpp = spec
+    size = width * height * bpp
+    # Android 9+ appends a dataspace field, making the header 16 bytes instead of 12.
+    for header in (16, 12):
+        if len(data) - header == size:
+            return RawScreen(width, height, rawmode, bpp, data[header:])
+    if len(data) - 16 > size:
+        return RawScreen(width, height, rawmode, bpp, data[16 : 16 + size])
+    raise ValueError(f"Unexpected screencap size {len(data)} for {width}x{height}")
+
+
+async def capture_live_screen(device_id: str) -> tuple[RawScreen, str]:
+    data = await run_adb_binary_async(["-s", device_id, "exec-out", "screencap"])
+    return await asyncio.to_thread(decode_live_screen, data)
+
+
+def decode_live_screen(data: bytes) -> tuple[RawScreen, str]:
+    if not data:
+        raise HTTPException(status_code=500, detail="Empty screenshot")
+    try:
+        screen = parse_raw_screencap(data)
+    except ValueError as exc:
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+    return screen, hashlib.blake2b(screen.pixels, digest_size=16).hexdigest()
+
+
+def load_pillow():
+    global _pillow_image, _pillow_checked
+    if not _pillow_checked:
+        try:
+            from PIL import Image
+        except ImportError:  # pragma: no cover - optional dependency
+            Image = None
+        _pillow_image = Image
+        _pillow_checked = True
+    return _pillow_image
+
+
+def fit_live_size(width: int, height: int, max_width: int, max_height: int) -> tuple[int, int]:
+    scale = 1.0
+    if max_width > 0 and width > max_width:
+        scale = min(scale, max_width / width)
+    if max_height > 0 and height > max_height:
+        scale = min(scale, max_height / height)
+    return max(1, int(round(width * scale))), max(1, int(round(height * scale)))
+
+
+def raw_screen_to_rgb(screen: RawScreen, step: int = 1) -> tuple[bytes, int, int]:
+    offsets = RAW_RGB_OFFSETS.get(screen.rawmode)
+    if offsets is None:
+        raise HTTPException(status_code=500, detail=f"Pillow is required for {screen.rawmode} screens")
+    bpp = screen.bpp
+    width = (screen.width + step - 1) // step
+    height = (screen.height + step - 1) // step
+    out = bytearray(width * height * 3)
+    if step == 1:
+        for channel, offset in enumerate(offsets):
+            out[channel::3] = screen.pixels[offset::bpp]
+        return bytes(out), width, height
+    row_bytes = screen.width * bpp
+    out_stride = width * 3
+    for y in range(height):
+        row = screen.pixels[y * step * row_bytes : (y * step + 1) * row_bytes]
+        base = y * out_stride
+        for channel, offset in enumerate(offsets):
+            out[base + channel : base + out_stride : 3] = row[offset :: bpp * step]
+    return bytes(out), width, height
+
+
+def encode_png_rgb(rgb: bytes, width: int, height: int) -> bytes:
+    stride = width * 3
+    raw = b"".join(b"\x00" + rgb[y * stride : (y + 1) * stride] for y in range(height))
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw, 1))
+        + chunk(b"IEND", b"")
+    )
+
+
+def ffmpeg_jpeg_args(width: int, height: int, quality: int) -> list[str]:
+    q = max(2, min(31, int(round(31 - (max(1, min(100, quality)) / 100) * 29))))
+    return [
+        "ffmpeg",
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-f",
+        "rawvideo",
+        "-pix_fmt",
+        "rgb24",
+        "-s",
+        f"{width}x{height}",
+        "-i",
+        "pipe:0",
+        "-vframes",
+        "1",
+        "-q:v",
+        str(q),
+        "-f",
+        "mjpeg",
+        "pipe:1",
+    ]
+
+
+async def encode_jpeg_ffmpeg_async(rgb: bytes, width: int, height: int, quality: int) -> bytes:
+    try:
+        result = await run_process(
+            ffmpeg_jpeg_args(width, height, quality),
+            input=rgb,
+            family="encode",
+            merge_stderr=False,
+            max_output=ADB_BINARY_OUTPUT_LIMIT,
+            timeout=30,
+        )
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=500, detail="JPEG output needs Pillow (or ffmpeg) installed") from exc
+    except CommandTimeout as exc:
+        raise HTTPException(status_code=500, detail="ffmpeg timed out encoding JPEG") from exc
+    if result.returncode != 0:
+        raise HTTPException(status_code=500, detail=result.stderr.decode("utf-8", errors="ignore"))
+    return result.stdout
+
+
+def pillow_screen_image(Image, screen: RawScreen, width: int, height: int):
+    # Screens are opaque, so drop the alpha channel while unpacking.
+    rawmode = {"RGBA": "RGBX", "BGRA": "BGRX"}.get(screen.rawmode, screen.rawmode)
+    image = Image.frombytes("RGB", (screen.width, screen.height), screen.pixels, "raw", rawmode)
+    if (width, height) != image.size:
+        image = image.resize((width, height), Image.BILINEAR, reducing_gap=2.0)
+    return image
+
+
+def save_pillow_image(image, fmt: str, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    if fmt == "jpeg":
+        image.save(buffer, "JPEG", quality=max(1, min(100, quality)))
+    else:
+        image.save(buffer, "PNG", compress_level=1)
+    return buffer.getvalue()
+
+
+def decimation_step(screen: RawScreen, width: int, height: int) -> int:
+    return max(1, -(-screen.width // width), -(-screen.height // height))
+
+
+async def encode_live_frame(
+    screen: RawScreen, fmt: str, quality: int, max_width: int = 0, max_height: int = 0
+) -> tuple[bytes, str]:
+    width, height = fit_live_size(screen.width, screen.height, max_width, max_height)
+    media_type = "image/jpeg" if fmt == "jpeg" else "image/png"
+    Image = load_pillow()
+    if Image is not None:
+
+        def encode() -> bytes:
+            return save_pillow_image(pillow_screen_image(Image, screen, width, height), fmt, quality)
+
+        return await asyncio.to_thread(encode), media_type
+
+    # Without Pillow, downscale by whole-pixel decimation.
+    rgb, width, height = await asyncio.to_thread(
+        raw_screen_to_rgb, screen, decimation_step(screen, width, height)
+    )
+    if fmt == "jpeg":
+        return await encode_jpeg_ffmpeg_async(rgb, width, height, quality), media_type
+    return await asyncio.to_thread(encode_png_rgb, rgb, width, height), media_type
+
+
+def live_screen_rgb(screen: RawScreen, max_width: int, max_height: int) -> tuple[bytes, int, int]:
+    width, height = fit_live_size(screen.width, screen.height, max_width, max_height)
+    Image = load_pillow()
+    if Image is not None:
+        return pillow_screen_image(Image, screen, width, height).tobytes(), width, height
+    return raw_screen_to_rgb(screen, decimation_step(screen, width, height))
+
+
+LIVE_ADAPTIVE_LEVELS = (
+    (1.0, 85),
+    (1.0, 70),
+    (0.75, 70),
+    (0.75, 55),
+    (0.5, 55),
+    (0.5, 40),
+    (0.35, 35),
+)
+LIVE_ADAPTIVE_START_LEVEL = 2
+LIVE_ADAPTIVE_TARGET_MS = float(os.environ.get("LIVE_ADAPTIVE_TARGET_MS", "250"))
+LIVE_ADAPTIVE_MIN_INTERVAL_MS = 66
+LIVE_ADAPTIVE_MAX_INTERVAL_MS = 2000
+LIVE_ADAPTIVE_DEFAULT_BANDWIDTH = 1_000_000.0
+LIVE_ADAPTIVE_MAX_CLIENTS = 64
+LIVE_ADAPTIVE_IDLE_SECONDS = 300.0
+
+
+@dataclass
+class LiveAdaptiveDecision:
+    level: int
+    scale: float
+    quality: int
+    interval_ms: int
+    latency_ms: float
+    bandwidth: float
+
+    def headers(self) -> dict[str, str]:
+        return {
+            "X-Live-Level": str(self.level),
+            "X-Live-Scale": f"{self.scale:g}",
+            "X-Live-Quality": str(self.quality),
+            "X-Live-Interval-Ms": str(self.interval_ms),
+            "X-Live-Latency-Ms": str(int(round(self.latency_ms))),
+            "X-Live-Bandwidth": str(int(self.bandwidth)),
+        }
+
+    def limits(self, screen: RawScreen, max_width: int, max_height: int) -> tuple[int, int]:
+        if self.scale >= 1.0:
+            return max_width, max_height
+        width = max(1, int(screen.width * self.scale))
+        height = max(1, int(screen.height * self.scale))
+        return (min(width, max_width) if max_width else width), (min(height, max_height) if max_height else height)
+
+
+@dataclass
+class LiveAdaptiveState:
+    client: str
+    target_ms: float
+    level: int = LIVE_ADAPTIVE_START_LEVEL
+    latency_ms: Optional[float] = None
+    server_ms: Optional[float] = None
+    bandwidth: Optional[float] = None
+    last_size: int = 0
+    last_server_ms: float = 0.0
+    last_waited_ms: float = 0.0
+    reported: bool = False
+    good_frames: int = 0
+    hold: int = 0
+    frames: int = 0
+    updated_at: float = field(default_factory=time.monotonic)
+
+
+class LiveAdaptiveController:
+    """Picks scale, JPEG quality and frame interval per viewer to hold a target latency.
+
+    Viewers identify themselves with `client` and report how long the
+    previous frame took to arrive (`recv_ms`). Together with the frame size
+    and the server-side capture/encode time this gives an end-to-end latency
+    and a bandwidth estimate; the controller steps down a quality ladder
+    when latency exceeds the target and back up once it has stayed well
+    below it for a few frames.
+    """
+
+    ALPHA = 0.3
+    DOWNGRADE = 1.15
+    UPGRADE = 0.6
+    UPGRADE_AFTER = 5
+
+    def __init__(self, levels=LIVE_ADAPTIVE_LEVELS, target_ms: float = LIVE_ADAPTIVE_TARGET_MS):
+        self.levels = levels
+        self.target_ms = target_ms
+        self._lock = threading.Lock()
+        self._clients: dict[str, LiveAdaptiveState] = {}
+
+    def _ewma(self, current: Optional[float], sample: float) -> float:
+        return sample if current is None else current + self.ALPHA * (sample - current)
+
+    def _state(self, client: str, target_ms: Optional[float]) -> LiveAdaptiveState:
+        state = self._clients.get(client)
+        if state is None:
+            now = time.monotonic()
+            for key, other in list(self._clients.items()):
+                if now - other.updated_at > LIVE_ADAPTIVE_IDLE_SECONDS:
+                    del self._clients[key]
+            if len(self._clients) >= LIVE_ADAPTIVE_MAX_CLIENTS:
+                oldest = min(self._clients.values(), key=lambda item: item.updated_at)
+                del self._clients[oldest.client]
+            state = LiveAdaptiveState(client=client, target_ms=self.target_ms)
+            self._clients[client] = state
+        if target_ms and target_ms > 0:
+            state.target_ms = target_ms
+        state.updated_at = time.monotonic()
+        return state
+
+    def _estimate(self, state: LiveAdaptiveState) -> float:
+        if state.latency_ms is not None:
+            return state.latency_ms
+        bandwidth = state.bandwidth or LIVE_ADAPTIVE_DEFAULT_BANDWIDTH
+        return (state.server_ms or 0.0) + state.last_size / bandwidth * 1000
+
+    def _adjust(self, state: LiveAdaptiveState, latency_ms: float) -> None:
+        if state.hold > 0:
+            state.hold -= 1
+            return
+        if latency_ms > state.target_ms * self.DOWNGRADE:
+            state.good_frames = 0
+            if state.level < len(self.levels) - 1:
+                state.level += 1
+                state.hold = 2
+        elif latency_ms < state.target_ms * self.UPGRADE:
+            state.good_frames += 1
+            if state.good_frames >= self.UPGRADE_AFTER and state.level > 0:
+                state.level -= 1
+                state.good_frames = 0
+                state.hold = 3
+        else:
+            state.good_frames = 0
+
+    def _decision(self, state: LiveAdaptiveState) -> LiveAdaptiveDecision:
+        scale, quality = self.levels[state.level]
+        latency = self._estimate(state)
+        # One frame in flight at a time: never ask for frames faster than they arrive.
+        interval = max(LIVE_ADAPTIVE_MIN_INTERVAL_MS, min(LIVE_ADAPTIVE_MAX_INTERVAL_MS, int(latency)))
+        return LiveAdaptiveDecision(
+            level=state.level,
+            scale=scale,
+            quality=quality,
+            interval_ms=interval,
+            latency_ms=latency,
+            bandwidth=state.bandwidth or LIVE_ADAPTIVE_DEFAULT_BANDWIDTH,
+        )
+
+    def decide(
+        self, client: str, recv_ms: Optional[float] = None, target_ms: Optional[float] = None
+    ) -> LiveAdaptiveDecision:
+        with self._lock:
+            state = self._state(client, target_ms)
+            # Samples of 304 responses carry no size information and are skipped.
+            if recv_ms is not None and recv_ms >= 0 and state.last_size > 0:
+                latency = max(0.0, recv_ms - state.last_waited_ms)
+                network_ms = latency - state.last_server_ms
+                if network_ms > 1:
+                    state.bandwidth = self._ewma(state.bandwidth, state.last_size / (network_ms / 1000))
+                state.latency_ms = self._ewma(state.latency_ms, latency)
+                state.reported = True
+                self._adjust(state, latency)
+            return self._decision(state)
+
+    def record(self, client: str, size: int, server_ms: float, waited_ms: float = 0.0) -> None:
+        with self._lock:
+            state = self._state(client, None)
+            state.last_size = size
+            state.last_server_ms = server_ms
+            state.last_waited_ms = waited_ms
+            if size <= 0:
+                return
+            state.frames += 1
+            state.server_ms = self._ewma(state.server_ms, server_ms)
+            if not state.reported:
+                # Without client reports, adapt on server time plus an assumed link speed.
+                self._adjust(state, self._estimate(state))
+
+    def status(self) -> list[dict]:
+        with self._lock:
+            clients = []
+            for state in self._clients.values():
+                decision = self._decision(state)
+                clients.append(
+                    {
+                        "client": state.client,
+                        "target_ms": state.target_ms,
+                        "frames": state.frames,
+                        "reported": state.reported,
+                        "server_ms": round(state.server_ms or 0.0, 1),
+                        "last_size": state.last_size,
+                        "level": decision.level,
+                        "scale": decision.scale,
+                        "quality": decision.quality,
+                        "interval_ms": decision.interval_ms,
+                        "latency_ms": round(decision.latency_ms, 1),
+                        "bandwidth": int(decision.bandwidth),
+                        "idle_s": round(time.monotonic() - state.updated_at, 1),
+                    }
+                )
+            return clients
+
+
+LIVE_ADAPTIVE = LiveAdaptiveController()
+
+
+def live_frame_etag(digest: str, fmt: str, quality: int, max_width: int, max_height: int) -> str:
+    return f'"{digest}-{fmt}-{quality}-{max_width}x{max_height}"'
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == "*" or candidate == etag:
+            return True
+    return False
+
+
+@app.get("/live/snapshot")
+async def live_snapshot(
+    request: Request,
+    device_id: Optional[str] = None,
+    format: str = "png",
+    quality: int = 70,
+    wait: float = 0,
+    max_width: int = 0,
+    max_height: int = 0,
+    client: Optional[str] = None,
+    recv_ms: Optional[float] = None,
+    target_ms: Optional[float] = None,
+):
+    resolved = await resolve_device_id(device_id)
+    fmt = (format or "png").lower()
+    if fmt == "jpg":
+        fmt = "jpeg"
+    if fmt != "jpeg":
+        quality = 0
+    if_none_match = request.headers.get("if-none-match")
+    started = time.monotonic()
+    deadline = started + max(0.0, min(wait, LIVE_SNAPSHOT_MAX_WAIT))
+    adaptive = LIVE_ADAPTIVE.decide(client, recv_ms, target_ms) if client else None
+    if adaptive and quality:
+        # The requested quality and size stay upper bounds.
+        quality = min(quality, adaptive.quality)
+
+    max_width = max(0, max_width)
+    max_height = max(0, max_height)
+    captured = time.monotonic()
+    screen, digest = await capture_live_screen(resolved)
+    LIVE_SNAPSHOT_CAPTURE.observe(time.monotonic() - captured)
+    if adaptive:
+        max_width, max_height = adaptive.limits(screen, max_width, max_height)
+    etag = live_frame_etag(digest, fmt, quality, max_width, max_height)
+    # Long-poll: keep sampling until the screen differs from the client's copy or time runs out.
+    while etag_matches(if_none_match, etag) and time.monotonic() < deadline:
+        await asyncio.sleep(LIVE_SNAPSHOT_POLL_INTERVAL)
+        captured = time.monotonic()
+        screen, digest = await capture_live_screen(resolved)
+        LIVE_SNAPSHOT_CAPTURE.observe(time.monotonic() - captured)
+        etag = live_frame_etag(digest, fmt, quality, max_width, max_height)
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if adaptive:
+        headers.update(adaptive.headers())
+        headers["X-Live-Size"] = "x".join(map(str, fit_live_size(screen.width, screen.height, max_width, max_height)))
+    if etag_matches(if_none_match, etag):
+        if client:
+            LIVE_ADAPTIVE.record(client, 0, (time.monotonic() - captured) * 1000)
+        LIVE_SNAPSHOTS.inc(1, "not_modified")
+        return Response(status_code=304, headers=headers)
+
+    key = (resolved, fmt, quality, max_width, max_height)
+    frame = LIVE_FRAMES.get(key, digest)
+    if frame is None:
+        encode_started = time.monotonic()
+        content, media_type = await encode_live_frame(screen, fmt, quality, max_width, max_height)
+        LIVE_SNAPSHOT_ENCODE.observe(time.monotonic() - encode_started, fmt)
+        frame = LiveFrame(digest=digest, content=content, media_type=media_type, captured_at=time.time())
+        LIVE_FRAMES.put(key, frame)
+    if client:
+        done = time.monotonic()
+        LIVE_ADAPTIVE.record(client, len(frame.content), (done - captured) * 1000, (captured - started) * 1000)
+    LIVE_SNAPSHOTS.inc(1, "frame")
+    LIVE_SNAPSHOT_BYTES.inc(len(frame.content))
+    return Response(content=frame.content, media_type=frame.media_type, headers=headers)
+
+
+@app.get("/live/adaptive")
+def live_adaptive():
+    return {
+        "target_ms": LIVE_ADAPTIVE.target_ms,
+        "levels": [{"scale": scale, "quality": quality} for scale, quality in LIVE_ADAPTIVE.levels],
+        "clients": LIVE_ADAPTIVE.status(),
+    }
+
+
+@dataclass
+class TileFrame:
+    frame_id: int
+    digest: str
+    width: int
+    height: int
+    hashes: list[bytes]
+
+
+def tile_grid(width: int, height: int, tile: int) -> tuple[int, int]:
+    return -(-width // tile), -(-height // tile)
+
+
+def compute_tile_hashes(rgb: bytes, width: int, height: int, tile: int) -> list[bytes]:
+    cols, rows = tile_grid(width, height, tile)
+    stride = width * 3
+    span = tile * 3
+    view = memoryview(rgb)
+    hashes: list[bytes] = []
+    for ty in range(rows):
+        row_starts = range(ty * tile * stride, min(height, (ty + 1) * tile) * stride, stride)
+        for tx in range(cols):
+            left = tx * span
+            right = min(stride, left + span)
+            hasher = hashlib.blake2b(digest_size=8)
+            # memoryview slices hash the tile rows in place instead of copying them.
+            for start in row_starts:
+                hasher.update(view[start + left : start + right])
+            hashes.append(hasher.digest())
+    return hashes
+
+
+def extract_tile_rgb(rgb: bytes, width: int, height: int, x: int, y: int, tile: int) -> tuple[bytes, int, int]:
+    tile_w = min(tile, width - x)
+    tile_h = min(tile, height - y)
+    stride = width * 3
+    start = x * 3
+    rows = [rgb[row * stride + start : row * stride + start + tile_w * 3] for row in range(y, y + tile_h)]
+    return b"".join(rows), tile_w, tile_h
+
+
+def encode_tile(rgb: bytes, width: int, height: int, fmt: str, quality: int) -> bytes:
+    Image = load_pillow()
+    if Image is not None:
+        return save_pillow_image(Image.frombytes("RGB", (width, height), rgb), fmt, quality)
+    # Per-tile ffmpeg spawns would defeat the purpose; without Pillow tiles are always PNG.
+    return encode_png_rgb(rgb, width, height)
+
+
+class LiveTileSession:
+    """Tile hashes of recent frames for one (device, tile size, format, quality, size) combination."""
+
+    HISTORY = 16
+    # Frame ids are unique across sessions so a stale `since` never matches another session.
+    _frame_ids = itertools.count(1)
+
+    def __init__(self, tile: int, fmt: str, quality: int, max_width: int, max_height: int):
+        self.tile = tile
+        self.fmt = fmt if load_pillow() is not None else "png"
+        self.quality = quality
+        self.max_width = max_width
+        self.max_height = max_height
+        self.frames: deque[TileFrame] = deque(maxlen=self.HISTORY)
+        self._rgb = b""
+        self._encoded: dict[int, tuple[bytes, str]] = {}
+        self._lock = threading.Lock()
+
+    def update(self, screen: RawScreen, digest: str) -> TileFrame:
+        with self._lock:
+            if self.frames and self.frames[-1].digest == digest:
+                return self.frames[-1]
+            rgb, width, height = live_screen_rgb(screen, self.max_width, self.max_height)
+            frame = TileFrame(
+                frame_id=next(self._frame_ids),
+                digest=digest,
+                width=width,
+                height=height,
+                hashes=compute_tile_hashes(rgb, width, height, self.tile),
+            )
+            self.frames.append(frame)
+            self._rgb = rgb
+            self._encoded = {
+                index: cached
+                for index, cached in self._encoded.items()
+                if index < len(frame.hashes) and cached[0] == frame.hashes[index]
+            }
+            return frame
+
+    def delta(self, since: int) -> dict:
+        with self._lock:
+            frame = self.frames[-1]
+            base = next((item for item in self.frames if item.frame_id == since), None)
+            full = base is None or (base.width, base.height) != (frame.width, frame.height)
+            cols, _ = tile_grid(frame.width, frame.height, self.tile)
+            tiles = []
+            for index, digest in enumerate(frame.hashes):
+                if not full and base.hashes[index] == digest:
+                    continue
+                x = (index % cols) * self.tile
+                y = (index // cols) * self.tile
+                cached = self._encoded.get(index)
+                if cached is None or cached[0] != digest:
+                    rgb, tile_w, tile_h = extract_tile_rgb(self._rgb, frame.width, frame.height, x, y, self.tile)
+                    data = base64.b64encode(encode_tile(rgb, tile_w, tile_h, self.fmt, self.quality)).decode("ascii")
+                    cached = (digest, data)
+                    self._encoded[index] = cached
+                tiles.append(
+                    {
+                        "x": x,
+                        "y": y,
+                        "w": min(self.tile, frame.width - x),
+                        "h": min(self.tile, frame.height - y),
+                        "data": cached[1],
+                    }
+                )
+            return {
+                "frame": frame.frame_id,
+                "base": None if full else since,
+                "full": full,
+                "width": frame.width,
+                "height": frame.height,
+                "tile": self.tile,
+                "format": self.fmt,
+                "tiles": tiles,
+            }
+
+
+class LiveTileManager:
+    """Tile sessions by request parameters; each holds a full RGB frame, so only a few recent ones are kept."""
 
+    def __init__(self, max_sessions: int = LIVE_TILE_MAX_SESSIONS, idle_seconds: float = LIVE_TILE_IDLE_SECONDS):
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        self._sessions: OrderedDict[tuple, LiveTileSession] = OrderedDict()
+        self._used: dict[tuple, float] = {}
+
+    def session(
+        self, device_id: str, tile: int, fmt: str, quality: int, max_width: int, max_height: int
+    ) -> LiveTileSession:
+        key = (device_id, tile, fmt, quality, max_width, max_height)
+        now = time.monotonic()
+        with self._lock:
+            for old_key in [item for item, used in self._used.items() if now - used > self.idle_seconds]:
+                del self._sessions[old_key]
+                del self._used[old_key]
+            session = self._sessions.get(key)
+            if session is None:
+                session = LiveTileSession(tile, fmt, quality, max_width, max_height)
+                self._sessions[key] = session
+                while len(self._sessions) > self.max_sessions:
+                    old_key, _ = self._sessions.popitem(last=False)
+                    del self._used[old_key]
+            self._sessions.move_to_end(key)
+            self._used[key] = now
+            return session
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+
+LIVE_TILES = LiveTileManager()
+
+
+@app.get("/live/tiles")
+async def live_tiles(
+    device_id: Optional[str] = None,
+    since: int = 0,
+    tile: int = 64,
+    format: str = "jpeg",
+    quality: int = 70,
+    wait: float = 0,
+    max_width: int = 0,
+    max_height: int = 0,
+):
+    resolved = await resolve_device_id(device_id)
+    fmt = "png" if (format or "").lower() == "png" else "jpeg"
+    tile = max(16, min(512, tile))
+    session = LIVE_TILES.session(resolved, tile, fmt, quality, max(0, max_width), max(0, max_height))
+    deadline = time.monotonic() + max(0.0, min(wait, LIVE_SNAPSHOT_MAX_WAIT))
+
+    screen, digest = await capture_live_screen(resolved)
+    frame = await asyncio.to_thread(session.update, screen, digest)
+    while frame.frame_id == since and time.monotonic() < deadline:
+        await asyncio.sleep(LIVE_SNAPSHOT_POLL_INTERVAL)
+        screen, digest = await capture_live_screen(resolved)
+        frame = await asyncio.to_thread(session.update, screen, digest)
+    return await asyncio.to_thread(session.delta, since)
+
+
+@app.websocket("/live/stream")
+async def live_stream(websocket: WebSocket):
+    await websocket.accept()
+    params = websocket.query_params
+    try:
+        bit_rate = int(params.get("bit_rate") or LIVE_STREAM_BIT_RATE)
+    except ValueError:
+        bit_rate = LIVE_STREAM_BIT_RATE
+    size = params.get("size")
+    if size and not re.fullmatch(r"\d+x\d+", size):
+        size = None
+    try:
+        resolved = await resolve_device_id(params.get("device_id"))
+    except HTTPException as exc:
+        await websocket.send_text(json.dumps({"type": "error", "detail": exc.detail}))
+        await websocket.close(code=1011)
+        return
 
-@app.post("/runner/reload")
-def runner_reload(payload: RunnerReloadRequest):
-    if payload.type.lower() in ("hot", "reload"):
-        RUNNER.hot_reload()
-        return {"status": "ok", "type": "hot"}
-    if payload.type.lower() in ("restart", "hot_restart"):
-        RUNNER.hot_restart()
-        return {"status": "ok", "type": "restart"}
-    raise HTTPException(status_code=400, detail="Unknown reload type")
+    loop = asyncio.get_running_loop()
+    stream, subscriber = SCREEN_STREAMS.subscribe(resolved, bit_rate, size, loop)
+    await websocket.send_text(
+        json.dumps(
+            {
+                "type": "stream",
+                "codec": "h264",
+                "format": "annexb",
+                "device_id": resolved,
+                "bit_rate": stream.bit_rate,
+                "size": stream.size,
+            }
+        )
+    )
 
+    async def sender():
+        while True:
+            unit = await subscriber.queue.get()
+            if unit is None:
+                detail = stream.last_error or "stream ended"
+                await websocket.send_text(json.dumps({"type": "error", "detail": detail}))
+                await websocket.close(code=1011)
+                return
+            await websocket.send_bytes(unit)
 
-@app.post("/runner/rn/host")
-def runner_rn_host(payload: RunnerRnHostRequest):
-    if not payload.host:
-        raise HTTPException(status_code=400, detail="Host is required")
-    device_id = resolve_device_id(payload.device_id)
-    package = payload.package
-    if not package:
-        cwd = resolve_workdir(payload.path)
-        package = detect_android_package(cwd)
-    if not package:
-        raise HTTPException(status_code=400, detail="React Native package not found")
+    sender_task = asyncio.create_task(sender())
     try:
-        set_rn_debug_host(device_id, package, payload.host, payload.port)
-    except HTTPException:
-        raise
-    except Exception as exc:
-        raise HTTPException(status_code=500, detail=str(exc)) from exc
-    return {"status": "ok", "package": package}
+        while True:
+            message = await websocket.receive_text()
+            if message.strip() == "keyframe":
+                await asyncio.to_thread(stream.request_keyframe)
+    except WebSocketDisconnect:
+        pass
+    except Exception:
+        logger.exception("Live stream for %s failed", resolved)
+    finally:
+        sender_task.cancel()
+        await asyncio.to_thread(SCREEN_STREAMS.unsubscribe, stream, subscriber)
 
 
-@app.post("/runner/rn/reload")
-def runner_rn_reload(payload: RunnerRnReloadRequest):
-    device_id = resolve_device_id(payload.device_id)
-    try:
-        rn_reload(device_id)
-    except HTTPException:
-        raise
-    except Exception as exc:
-        raise HTTPException(status_code=500, detail=str(exc)) from exc
-    return {"status": "ok"}
+@app.get("/live/stream/status")
+def live_stream_status():
+    return {"streams": SCREEN_STREAMS.status()}
 
 
-@app.post("/runner/devmenu")
-def runner_devmenu(device_id: Optional[str] = None):
-    resolved = resolve_device_id(device_id)
-    RUNNER.dev_menu(resolved)
-    return {"status": "ok"}
+class ApkHashCache:
+    """sha256 of local APKs, recomputed only when the file's size or mtime change."""
 
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hashes: dict[str, tuple[int, int, str]] = {}
 
-@app.get("/live/devices")
-def live_devices():
-    return {"devices": list_adb_devices()}
+    def sha256(self, path: Path) -> str:
+        stat = path.stat()
+        key = str(path)
+        with self._lock:
+            cached = self._hashes.get(key)
+        if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+        digest = hashlib.sha256()
+        with path.open("rb") as handle:
+            for chunk in iter(lambda: handle.read(1024 * 1024), b""):
+                digest.update(chunk)
+        value = digest.hexdigest()
+        with self._lock:
+            self._hashes[key] = (stat.st_mtime_ns, stat.st_size, value)
+        return value
 
 
-@app.get("/live/snapshot")
-def live_snapshot(device_id: Optional[str] = None, format: str = "png", quality: int = 70):
-    resolved = resolve_device_id(device_id)
-    image = run_adb_binary(["-s", resolved, "exec-out", "screencap", "-p"])
-    if not image:
-        raise HTTPException(status_code=500, detail="Empty screenshot")
-    fmt = (format or "png").lower()
-    if fmt in ("jpg", "jpeg"):
+APK_HASHES = ApkHashCache()
+
+
+async def installed_apk_state(device_id: str, package: str) -> dict:
+    """Hash and version of the base APK currently installed for `package` (empty if not installed)."""
+    quoted = shlex.quote(package)
+    script = (
+        f"pm path {quoted} 2>/dev/null | while IFS=: read -r _ apk; do "
+        'case "$apk" in *base.apk) sha256sum "$apk"; break;; esac; done; '
+        f"dumpsys package {quoted} | grep -m2 -E 'versionCode=|versionName='"
+    )
+    output = await run_adb_async(["-s", device_id, "shell", script])
+    state: dict = {}
+    match = re.search(r"^([0-9a-f]{64})\s", output, re.MULTILINE)
+    if match:
+        state["sha256"] = match.group(1)
+    match = re.search(r"versionName=(\S+)", output)
+    if match:
+        state["version_name"] = match.group(1)
+    match = re.search(r"versionCode=(\d+)", output)
+    if match:
+        state["version_code"] = int(match.group(1))
+    return state
+
+
+async def install_apk(
+    device_id: str,
+    apk: Path,
+    package: str,
+    force: bool = False,
+    on_line: Optional[Callable[[str], None]] = None,
+) -> dict:
+    """Install `apk` unless the device already has a byte-identical copy of it."""
+    started = time.monotonic()
+    local = await asyncio.to_thread(APK_HASHES.sha256, apk)
+    result = {"device_id": device_id, "sha256": local}
+    if not force:
         try:
-            q = max(2, min(31, int(round(31 - (max(1, min(100, quality)) / 100) * 29))))
-            result = subprocess.run(
-                [
-                    "ffmpeg",
-                    "-hide_banner",
-                    "-loglevel",
-                    "error",
-                    "-i",
-                    "pipe:0",
-                    "-vframes",
-                    "1",
-                    "-q:v",
-                    str(q),
-                    "pipe:1",
-                ],
-                input=image,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                check=True,
-            )
-            image = result.stdout
-        except FileNotFoundError as exc:
-            raise HTTPException(status_code=500, detail="ffmpeg not found for JPEG conversion") from exc
-        except subprocess.CalledProcessError as exc:
-            raise HTTPException(status_code=500, detail=exc.stderr.decode("utf-8", errors="ignore")) from exc
-        return Response(content=image, media_type="image/jpeg")
-    return Response(content=image, media_type="image/png")
+            state = await installed_apk_state(device_id, package)
+        except HTTPException as exc:
+            # Could not inspect the device; fall back to a plain install.
+            logger.debug("APK check on %s failed: %s", device_id, exc.detail)
+            state = {}
+        result["installed"] = state
+        if state.get("sha256") == local:
+            return dict(result, status="skipped", duration_ms=int((time.monotonic() - started) * 1000))
+    log = (lambda line: on_line(f"[{device_id}] {line}")) if on_line else None
+    await run_adb_async(["-s", device_id, "install", "-r", str(apk)], ADB_INSTALL_TIMEOUT, on_line=log)
+    return dict(result, status="installed", duration_ms=int((time.monotonic() - started) * 1000))
+
+
+async def install_apk_on_devices(
+    device_ids: list[str],
+    apk: Path,
+    package: str,
+    force: bool = False,
+    on_line: Optional[Callable[[str], None]] = None,
+) -> list[dict]:
+    async def install_one(device_id: str) -> dict:
+        try:
+            return await install_apk(device_id, apk, package, force, on_line)
+        except HTTPException as exc:
+            return {"device_id": device_id, "status": "failed", "error": exc.detail}
+
+    return list(await asyncio.gather(*(install_one(device_id) for device_id in device_ids)))
 
 
 @app.post("/live/install")
-def live_install(device_id: Optional[str] = None):
-    resolved = resolve_device_id(device_id)
+async def live_install(request: Request, device_id: Optional[str] = None, force: bool = False):
+    resolved = await resolve_device_id(device_id)
     if not LIVE_HELPER_APK.exists():
         raise HTTPException(status_code=404, detail=f"Live helper APK not found: {LIVE_HELPER_APK}")
-    run_adb(["-s", resolved, "install", "-r", str(LIVE_HELPER_APK)])
-    return {"status": "ok", "apk": str(LIVE_HELPER_APK)}
+    result = await cancel_on_disconnect(request, install_apk(resolved, LIVE_HELPER_APK, LIVE_HELPER_PACKAGE, force))
+    return {"status": "ok", "apk": str(LIVE_HELPER_APK), "install": result["status"], "sha256": result["sha256"]}
 
 
 @app.post("/live/open")
-def live_open(device_id: Optional[str] = None):
-    resolved = resolve_device_id(device_id)
-    run_adb(
+async def live_open(device_id: Optional[str] = None):
+    resolved = await resolve_device_id(device_id)
+    await run_adb_async(
         [
             "-s",
             resolved,
@@ -1034,17 +4817,18 @@ def live_open(device_id: Optional[str] = None):
 
 
 @app.post("/live/tap")
-def live_tap(payload: LiveTapRequest):
-    resolved = resolve_device_id(payload.device_id)
-    run_adb(["-s", resolved, "shell", "input", "tap", str(payload.x), str(payload.y)])
+async def live_tap(payload: LiveTapRequest):
+    resolved = await resolve_device_id(payload.device_id)
+    await run_adb_async(["-s", resolved, "shell", "input", "tap", str(payload.x), str(payload.y)])
+    LIVE_RECORDER.record(resolved, {"op": "tap", "x": payload.x, "y": payload.y})
     return {"status": "ok"}
 
 
 @app.post("/live/swipe")
-def live_swipe(payload: LiveSwipeRequest):
-    resolved = resolve_device_id(payload.device_id)
+async def live_swipe(payload: LiveSwipeRequest):
+    resolved = await resolve_device_id(payload.device_id)
     duration = payload.duration_ms if payload.duration_ms > 0 else 300
-    run_adb(
+    await run_adb_async(
         [
             "-s",
             resolved,
@@ -1058,13 +4842,17 @@ def live_swipe(payload: LiveSwipeRequest):
             str(duration),
         ]
     )
+    LIVE_RECORDER.record(
+        resolved,
+        {"op": "swipe", "x": payload.x1, "y": payload.y1, "x2": payload.x2, "y2": payload.y2, "duration_ms": duration},
+    )
     return {"status": "ok"}
 
 
 @app.post("/live/longpress")
-def live_longpress(payload: LiveTapRequest):
-    resolved = resolve_device_id(payload.device_id)
-    run_adb(
+async def live_longpress(payload: LiveTapRequest):
+    resolved = await resolve_device_id(payload.device_id)
+    await run_adb_async(
         [
             "-s",
             resolved,
@@ -1078,31 +4866,463 @@ def live_longpress(payload: LiveTapRequest):
             "600",
         ]
     )
+    LIVE_RECORDER.record(resolved, {"op": "longpress", "x": payload.x, "y": payload.y, "duration_ms": 600})
     return {"status": "ok"}
 
 
 @app.post("/live/text")
-def live_text(payload: LiveTextRequest):
-    resolved = resolve_device_id(payload.device_id)
+async def live_text(payload: LiveTextRequest):
+    resolved = await resolve_device_id(payload.device_id)
     text = adb_escape_text(payload.text)
-    run_adb(["-s", resolved, "shell", "input", "text", text])
+    await run_adb_async(["-s", resolved, "shell", "input", "text", text])
+    LIVE_RECORDER.record(resolved, {"op": "text", "text": payload.text})
     return {"status": "ok"}
 
 
 @app.post("/live/key")
-def live_key(payload: LiveKeyRequest):
-    resolved = resolve_device_id(payload.device_id)
-    run_adb(["-s", resolved, "shell", "input", "keyevent", str(payload.keycode)])
+async def live_key(payload: LiveKeyRequest):
+    resolved = await resolve_device_id(payload.device_id)
+    await run_adb_async(["-s", resolved, "shell", "input", "keyevent", str(payload.keycode)])
+    LIVE_RECORDER.record(resolved, {"op": "key", "keycode": payload.keycode})
     return {"status": "ok"}
 
 
 @app.post("/live/wake")
-def live_wake(device_id: Optional[str] = None):
-    resolved = resolve_device_id(device_id)
+async def live_wake(device_id: Optional[str] = None):
+    resolved = await resolve_device_id(device_id)
     try:
-        run_adb(["-s", resolved, "shell", "input", "keyevent", "224"])
+        await run_adb_async(["-s", resolved, "shell", "input", "keyevent", "224"])
     except HTTPException:
-        run_adb(["-s", resolved, "shell", "input", "keyevent", "26"])
+        await run_adb_async(["-s", resolved, "shell", "input", "keyevent", "26"])
+    return {"status": "ok"}
+
+
+LIVE_INPUT_TOUCH_EVENTS = ("down", "move", "up")
+LIVE_INPUT_MAX_PACING = 0.5
+# What `input` prints for `motionevent` before Android 11 (it may still exit with status 0).
+LIVE_INPUT_NO_MOTIONEVENT = re.compile(r"unknown command", re.IGNORECASE)
+
+
+class LiveInputChannel:
+    """Applies one client's touch and key events to a device, in order."""
+
+    def __init__(self, device_id: str):
+        self.device_id = device_id
+        self.motionevent = True
+        self.touch_down: Optional[tuple[int, int, float]] = None
+        self.position: Optional[tuple[int, int]] = None
+        self.closed = False
+        self._last_client_t: Optional[int] = None
+        self._last_applied = 0.0
+        # Serializes events from the worker task with release() from the disconnect handler.
+        self._lock = asyncio.Lock()
+
+    async def apply(self, event: dict) -> None:
+        async with self._lock:
+            if not self.closed:
+                await self._apply(event)
+
+    async def release(self) -> None:
+        """Stop the channel and lift a finger that is still down, e.g. when the client disconnects mid-gesture."""
+        async with self._lock:
+            self.closed = True
+            await self._lift()
+
+    async def _shell(self, *command: str) -> str:
+        return await run_adb_async(["-s", self.device_id, "shell", *command], timeout=ADB_SHELL_TIMEOUT)
+
+    async def _apply(self, event: dict) -> None:
+        kind = event.get("type")
+        await self._pace(event)
+        if kind in LIVE_INPUT_TOUCH_EVENTS:
+            await self._touch(kind, int(event["x"]), int(event["y"]))
+        elif kind == "cancel":
+            await self._lift()
+        elif kind == "key":
+            keycode = int(event["keycode"])
+            await self._shell("input", "keyevent", str(keycode))
+            LIVE_RECORDER.record(self.device_id, {"op": "key", "keycode": keycode})
+        elif kind == "text":
+            text = str(event["text"])
+            await self._shell("input", "text", adb_escape_text(text))
+            LIVE_RECORDER.record(self.device_id, {"op": "text", "text": text})
+        else:
+            raise ValueError(f"Unknown input event: {kind}")
+        self._last_applied = time.monotonic()
+
+    async def _lift(self) -> None:
+        if self.touch_down and self.position:
+            await self._touch("up", *self.position)
+
+    async def _pace(self, event: dict) -> None:
+        # Keep the client's spacing between events when a burst arrives late, but never stall.
+        client_t = event.get("t")
+        if not isinstance(client_t, int):
+            self._last_client_t = None
+            return
+        if self._last_client_t is not None:
+            delay = (client_t - self._last_client_t) / 1_000_000 - (time.monotonic() - self._last_applied)
+            if 0 < delay < LIVE_INPUT_MAX_PACING:
+                await asyncio.sleep(delay)
+        self._last_client_t = client_t
+
+    async def _touch(self, kind: str, x: int, y: int) -> None:
+        if kind == "down":
+            self.touch_down = (x, y, time.monotonic())
+        elif self.touch_down is None:
+            return
+        if self.motionevent:
+            try:
+                output = await self._shell("input", "motionevent", kind.upper(), str(x), str(y))
+            except HTTPException as exc:
+                if kind != "down" or not LIVE_INPUT_NO_MOTIONEVENT.search(str(exc.detail)):
+                    if kind == "down":
+                        # A transient failure: drop this gesture but keep using motionevent.
+                        self.touch_down = None
+                    raise
+                output = str(exc.detail)
+            if kind == "down" and LIVE_INPUT_NO_MOTIONEVENT.search(output):
+                # `input motionevent` needs Android 11+; replay whole gestures as tap/swipe instead.
+                self.motionevent = False
+        self.position = (x, y)
+        if kind == "up":
+            down = self.touch_down
+            self.touch_down = None
+            if down:
+                step = gesture_step(down, x, y)
+                if not self.motionevent:
+                    await self._shell(live_step_command(LiveScriptStep(**step)))
+                LIVE_RECORDER.record(self.device_id, step)
+
+
+def gesture_step(down: tuple[int, int, float], x: int, y: int) -> dict:
+    """Summarise a finished touch gesture as a tap or swipe script step."""
+    x0, y0, started = down
+    duration = int((time.monotonic() - started) * 1000)
+    if abs(x - x0) < 10 and abs(y - y0) < 10 and duration < 500:
+        return {"op": "tap", "x": x, "y": y}
+    return {"op": "swipe", "x": x0, "y": y0, "x2": x, "y2": y, "duration_ms": max(1, duration)}
+
+
+def monotonic_us() -> int:
+    return time.monotonic_ns() // 1000
+
+
+@app.websocket("/live/input")
+async def live_input(websocket: WebSocket):
+    await websocket.accept()
+    try:
+        resolved = await resolve_device_id(websocket.query_params.get("device_id"))
+    except HTTPException as exc:
+        await websocket.send_text(json.dumps({"type": "error", "detail": exc.detail}))
+        await websocket.close(code=1011)
+        return
+
+    channel = LiveInputChannel(resolved)
+    pending: deque[dict] = deque()
+    wakeup = asyncio.Event()
+    await websocket.send_text(json.dumps({"type": "ready", "device_id": resolved}))
+
+    async def worker():
+        while True:
+            await wakeup.wait()
+            wakeup.clear()
+            while pending:
+                event = pending.popleft()
+                coalesced = 0
+                # Only the newest position matters while we are behind on a drag.
+                while event.get("type") == "move" and pending and pending[0].get("type") == "move":
+                    event = pending.popleft()
+                    coalesced += 1
+                try:
+                    await channel.apply(event)
+                except (HTTPException, KeyError, TypeError, ValueError) as exc:
+                    detail = exc.detail if isinstance(exc, HTTPException) else str(exc)
+                    await websocket.send_text(json.dumps({"type": "error", "seq": event.get("seq"), "detail": detail}))
+                    continue
+                applied = monotonic_us()
+                await websocket.send_text(
+                    json.dumps(
+                        {
+                            "type": "ack",
+                            "seq": event.get("seq"),
+                            "event": event.get("type"),
+                            "t": event.get("t"),
+                            "applied_us": applied,
+                            "latency_us": applied - event["received_us"],
+                            "coalesced": coalesced,
+                        }
+                    )
+                )
+
+    worker_task = asyncio.create_task(worker())
+    try:
+        while True:
+            message = await websocket.receive_text()
+            try:
+                event = json.loads(message)
+            except ValueError:
+                continue
+            if not isinstance(event, dict):
+                continue
+            event["received_us"] = monotonic_us()
+            pending.append(event)
+            wakeup.set()
+    except WebSocketDisconnect:
+        pass
+    except Exception:
+        logger.exception("Live input for %s failed", resolved)
+    finally:
+        pending.clear()
+        # Scheduled before awaiting anything so the finger is lifted even if this handler is cancelled;
+        # release() waits for an event the worker is still applying rather than aborting it.
+        release = asyncio.ensure_future(channel.release())
+        try:
+            await asyncio.shield(release)
+        except HTTPException as exc:
+            logger.debug("Releasing touch on %s failed: %s", resolved, exc.detail)
+        finally:
+            worker_task.cancel()
+            # Collect the worker's outcome (e.g. a send on the closed socket) so it is not left unretrieved.
+            await asyncio.gather(worker_task, return_exceptions=True)
+
+
+LIVE_SCRIPTS_PATH = CONFIG_PATH.parent / "live-scripts.json"
+LIVE_SCRIPT_MAX_STEPS = 500
+LIVE_SCRIPT_STEP_FIELDS = ("op", "x", "y", "x2", "y2", "duration_ms", "text", "keycode", "ms")
+LIVE_RECORD_MAX_GAP_MS = 10_000
+LIVE_SCRIPT_FAILED_MARKER = "__codex_step_failed__"
+
+
+def live_step_command(step: LiveScriptStep, index: int = 0) -> str:
+    op = step.op.lower()
+
+    def need(*names: str) -> list[int]:
+        values = [getattr(step, name) for name in names]
+        if any(value is None for value in values):
+            raise HTTPException(status_code=400, detail=f"Step {index}: {op} requires {', '.join(names)}")
+        return values
+
+    if op == "tap":
+        x, y = need("x", "y")
+        return f"input tap {x} {y}"
+    if op == "longpress":
+        x, y = need("x", "y")
+        return f"input swipe {x} {y} {x} {y} {step.duration_ms or 600}"
+    if op == "swipe":
+        x, y, x2, y2 = need("x", "y", "x2", "y2")
+        return f"input swipe {x} {y} {x2} {y2} {step.duration_ms or 300}"
+    if op == "text":
+        if step.text is None:
+            raise HTTPException(status_code=400, detail=f"Step {index}: text requires text")
+        return f"input text {adb_escape_text(step.text)}"
+    if op == "key":
+        (keycode,) = need("keycode")
+        return f"input keyevent {keycode}"
+    if op == "sleep":
+        (ms,) = need("ms")
+        return f"sleep {max(0, ms) / 1000:.3f}"
+    raise HTTPException(status_code=400, detail=f"Step {index}: unknown op {step.op}")
+
+
+def build_live_script(steps: list[LiveScriptStep]) -> str:
+    # Runs in a subshell so a failing step can stop the script without ending the adb shell.
+    commands = [
+        f'out=$({live_step_command(step, index)} 2>&1) || {{ echo "$out"; echo {LIVE_SCRIPT_FAILED_MARKER} {index}; exit 1; }}'
+        for index, step in enumerate(steps)
+    ]
+    return "( " + "; ".join(commands) + " )"
+
+
+def live_step_dict(step: LiveScriptStep) -> dict:
+    return {name: getattr(step, name) for name in LIVE_SCRIPT_STEP_FIELDS if getattr(step, name) is not None}
+
+
+def live_script_duration_ms(steps: list[LiveScriptStep]) -> int:
+    """Time a script spends in sleeps and timed gestures, i.e. the least it takes on the device."""
+    total = 0
+    for step in steps:
+        op = step.op.lower()
+        if op == "sleep":
+            total += max(0, step.ms or 0)
+        elif op == "swipe":
+            total += step.duration_ms or 300
+        elif op == "longpress":
+            total += step.duration_ms or 600
+    return total
+
+
+def write_json_atomic(path: Path, data) -> None:
+    """Write JSON to a temp file next to `path` and rename it over, so readers never see a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            json.dump(data, handle, indent=2, ensure_ascii=False)
+            handle.flush()
+            os.fsync(handle.fileno())
+        try:
+            os.chmod(tmp_name, path.stat().st_mode & 0o777)
+        except FileNotFoundError:
+            pass
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+class LiveScriptStore:
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self) -> dict[str, list[dict]]:
+        with self._lock:
+            return self._read()
+
+    def get(self, name: str) -> Optional[list[dict]]:
+        return self.load().get(name)
+
+    def save(self, name: str, steps: list[dict]) -> None:
+        with self._lock:
+            scripts = self._read()
+            scripts[name] = steps
+            self._write(scripts)
+
+    def delete(self, name: str) -> bool:
+        with self._lock:
+            scripts = self._read()
+            if name not in scripts:
+                return False
+            del scripts[name]
+            self._write(scripts)
+            return True
+
+    def _read(self) -> dict[str, list[dict]]:
+        if not self.path.exists():
+            return {}
+        try:
+            with self.path.open("r", encoding="utf-8") as handle:
+                data = json.load(handle)
+        except Exception:
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _write(self, scripts: dict[str, list[dict]]) -> None:
+        write_json_atomic(self.path, scripts)
+
+
+class LiveRecorder:
+    """Collects input applied to a device into replayable script steps."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._recordings: dict[str, tuple[list[dict], float]] = {}
+
+    def start(self, device_id: str) -> None:
+        with self._lock:
+            self._recordings[device_id] = ([], time.monotonic())
+
+    def stop(self, device_id: str) -> Optional[list[dict]]:
+        with self._lock:
+            recording = self._recordings.pop(device_id, None)
+        return recording[0] if recording else None
+
+    def active(self) -> list[str]:
+        with self._lock:
+            return list(self._recordings)
+
+    def record(self, device_id: str, step: dict) -> None:
+        with self._lock:
+            recording = self._recordings.get(device_id)
+            if recording is None:
+                return
+            steps, last = recording
+            now = time.monotonic()
+            gap = min(int((now - last) * 1000), LIVE_RECORD_MAX_GAP_MS)
+            if steps and gap > 0:
+                steps.append({"op": "sleep", "ms": gap})
+            steps.append(dict(step))
+            self._recordings[device_id] = (steps, now)
+
+
+LIVE_SCRIPTS = LiveScriptStore(LIVE_SCRIPTS_PATH)
+LIVE_RECORDER = LiveRecorder()
+
+
+@app.post("/live/script")
+async def live_script(payload: LiveScriptRequest):
+    steps = payload.steps
+    if payload.name and not steps:
+        saved = LIVE_SCRIPTS.get(payload.name)
+        if saved is None:
+            raise HTTPException(status_code=404, detail=f"Script not found: {payload.name}")
+        steps = [LiveScriptStep(**step) for step in saved]
+    if not steps:
+        raise HTTPException(status_code=400, detail="Script has no steps")
+    if len(steps) > LIVE_SCRIPT_MAX_STEPS:
+        raise HTTPException(status_code=400, detail=f"Script exceeds {LIVE_SCRIPT_MAX_STEPS} steps")
+    # The whole script runs as one shell command, so it has to finish within the shell timeout.
+    duration_ms = live_script_duration_ms(steps)
+    if duration_ms >= ADB_SHELL_TIMEOUT * 1000:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Script sleeps and gestures take {duration_ms / 1000:.1f}s, "
+            f"more than the {ADB_SHELL_TIMEOUT:.0f}s limit",
+        )
+    script = build_live_script(steps)
+    resolved = await resolve_device_id(payload.device_id)
+    if payload.save_as:
+        LIVE_SCRIPTS.save(payload.save_as, [live_step_dict(step) for step in steps])
+
+    start = time.monotonic()
+    try:
+        await run_adb_async(["-s", resolved, "shell", script])
+    except HTTPException as exc:
+        match = re.search(rf"{LIVE_SCRIPT_FAILED_MARKER} (\d+)", str(exc.detail))
+        if not match:
+            raise
+        failed = int(match.group(1))
+        output = str(exc.detail)[: match.start()].strip()
+        raise HTTPException(
+            status_code=500,
+            detail={"failed_step": failed, "completed": failed, "error": output or "step failed"},
+        ) from exc
+    return {
+        "status": "ok",
+        "device_id": resolved,
+        "steps": len(steps),
+        "duration_ms": int((time.monotonic() - start) * 1000),
+    }
+
+
+@app.post("/live/record/start")
+async def live_record_start(payload: LiveRecordRequest):
+    resolved = await resolve_device_id(payload.device_id)
+    LIVE_RECORDER.start(resolved)
+    return {"status": "recording", "device_id": resolved}
+
+
+@app.post("/live/record/stop")
+async def live_record_stop(payload: LiveRecordRequest):
+    resolved = await resolve_device_id(payload.device_id)
+    steps = LIVE_RECORDER.stop(resolved)
+    if steps is None:
+        raise HTTPException(status_code=404, detail=f"No recording in progress for {resolved}")
+    if payload.name:
+        LIVE_SCRIPTS.save(payload.name, steps)
+    return {"status": "ok", "device_id": resolved, "name": payload.name, "steps": steps}
+
+
+@app.get("/live/scripts")
+def live_scripts():
+    return {"scripts": LIVE_SCRIPTS.load(), "recording": LIVE_RECORDER.active()}
+
+
+@app.post("/live/scripts/delete")
+def live_scripts_delete(payload: LiveRecordRequest):
+    if not payload.name or not LIVE_SCRIPTS.delete(payload.name):
+        raise HTTPException(status_code=404, detail=f"Script not found: {payload.name}")
     return {"status": "ok"}
 
 
@@ -1165,7 +5385,6 @@ def api_settings_update(payload: SettingsPayload):
             stt_cfg["compute_type"] = (payload.stt.get("compute_type") or "").strip()
 
     save_config(config)
-    apply_stt_settings(config)
     return {"status": "ok", "config_path": str(CONFIG_PATH)}
 
 
@@ -1269,61 +5488,285 @@ def settings_page():
     return Response(content=html, media_type="text/html")
 
 
+JOB_CONCURRENCY = {"default": 2, "build": 1, "git": 1, "install": 2, "pm2": 1, "delete": 2}
+JOB_OUTPUT_LINES = 5000
+JOB_RETENTION_SECONDS = 6 * 3600
+JOB_RETENTION_COUNT = 50
+JOB_ACTIVE_STATES = ("queued", "running")
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    title: str
+    key: Optional[str] = None
+    status: str = "queued"
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: object = None
+    error: object = None
+    output: LogBuffer = field(default_factory=lambda: LogBuffer(maxlen=JOB_OUTPUT_LINES))
+    task: Optional[asyncio.Task] = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in JOB_ACTIVE_STATES
+
+    def log(self, line: str) -> None:
+        self.output.append(line)
+
+    def to_dict(self, since: Optional[int] = None) -> dict:
+        data = {
+            "id": self.id,
+            "kind": self.kind,
+            "key": self.key,
+            "title": self.title,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+        if since is not None:
+            lines = self.output.since(since)
+            data["output"] = {
+                "seq": lines[-1][0] if lines else since,
+                "truncated": since < self.output.dropped_seq,
+                "lines": [line for _, _, line in lines],
+            }
+        return data
+
+
+class JobManager:
+    """Background jobs for long admin operations.
+
+    Jobs with the same key are deduplicated while one is queued or running,
+    each kind has its own concurrency limit, output is kept per job for
+    incremental polling, and finished jobs are retained for a while so their
+    results can still be fetched.
+    """
+
+    def __init__(self):
+        self._jobs: dict[str, Job] = {}
+        self._limits: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def submit(
+        self, kind: str, title: str, func: Callable[[Job], Awaitable[object]], key: Optional[str] = None
+    ) -> tuple[Job, bool]:
+        if key:
+            for job in self._jobs.values():
+                if job.key == key and job.active:
+                    return job, False
+        self._prune()
+        job = Job(id=uuid.uuid4().hex[:12], kind=kind, title=title, key=key)
+        self._jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job, func))
+        return job, True
+
+    async def _run(self, job: Job, func: Callable[[Job], Awaitable[object]]) -> None:
+        limit = loop_semaphore(self._limits, job.kind, JOB_CONCURRENCY.get(job.kind, JOB_CONCURRENCY["default"]))
+        try:
+            async with limit:
+                job.status = "running"
+                job.started_at = time.time()
+                job.result = await func(job)
+                job.status = "succeeded"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+        except HTTPException as exc:
+            job.status = "failed"
+            job.error = exc.detail
+        except Exception as exc:
+            logger.exception("Job %s (%s) failed", job.id, job.title)
+            job.status = "failed"
+            job.error = str(exc)
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id: str) -> Job:
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+        return job
+
+    def list(self) -> list[Job]:
+        return sorted(self._jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+    def cancel(self, job_id: str) -> Job:
+        job = self.get(job_id)
+        if job.active and job.task:
+            job.task.cancel()
+        return job
+
+    async def wait(self, job: Job) -> Job:
+        if job.task:
+            # Shielded: a client that stops waiting must not cancel the job itself.
+            await asyncio.shield(asyncio.gather(job.task, return_exceptions=True))
+        return job
+
+    def _prune(self) -> None:
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        finished = [job for job in self.list() if not job.active]
+        for index, job in enumerate(finished):
+            if index >= JOB_RETENTION_COUNT or (job.finished_at or 0) < cutoff:
+                del self._jobs[job.id]
+
+
+JOBS = JobManager()
+
+
+async def submit_admin_job(
+    response: Response,
+    kind: str,
+    key: str,
+    title: str,
+    func: Callable[[Job], Awaitable[object]],
+    wait: bool,
+    legacy: Callable[[Job], dict],
+) -> dict:
+    job, created = JOBS.submit(kind, title, func, key)
+    if not wait:
+        response.status_code = 202
+        return {"status": "accepted", "created": created, "job": job.to_dict()}
+    await JOBS.wait(job)
+    if job.status == "succeeded":
+        return legacy(job)
+    raise HTTPException(status_code=500, detail=job.error or f"Job {job.status}")
+
+
+@app.get("/api/jobs")
+def api_jobs():
+    return {"jobs": [job.to_dict() for job in JOBS.list()]}
+
+
+@app.get("/api/jobs/{job_id}")
+def api_job(job_id: str, since: int = 0):
+    return JOBS.get(job_id).to_dict(since=max(0, since))
+
+
+@app.post("/api/jobs/{job_id}/cancel")
+def api_job_cancel(job_id: str):
+    return JOBS.cancel(job_id).to_dict()
+
+
 @app.get("/api/admin/status")
-def admin_status():
+async def admin_status():
     return {
         "repo_root": str(REPO_ROOT),
         "viewer_apk": str(VIEWER_APK),
         "live_apk": str(LIVE_HELPER_APK),
-        "devices": list_adb_devices(),
+        "devices": await list_adb_devices(),
         "backend_port": os.environ.get("CODEX_BACKEND_PORT"),
         "settings_port": os.environ.get("CODEX_SETTINGS_PORT"),
+        "jobs": [job.to_dict() for job in JOBS.list() if job.active],
     }
 
 
 @app.post("/api/admin/git-pull")
-def admin_git_pull():
-    output = run_command(["git", "-C", str(REPO_ROOT), "pull", "--ff-only"])
-    return {"status": "ok", "output": output}
+async def admin_git_pull(response: Response, wait: bool = False):
+    async def pull(job: Job) -> str:
+        return await run_command_async(["git", "-C", str(REPO_ROOT), "pull", "--ff-only"], family="git", on_line=job.log)
+
+    return await submit_admin_job(
+        response, "git", "git-pull", "git pull", pull, wait, lambda job: {"status": "ok", "output": job.result}
+    )
 
 
 @app.post("/api/admin/build")
-def admin_build(target: str = "viewer"):
+async def admin_build(response: Response, target: str = "viewer", wait: bool = False):
     if target == "viewer":
-        if not GRADLE_VIEWER.exists():
-            raise HTTPException(status_code=404, detail=f"Gradle not found at {GRADLE_VIEWER}")
-        output = run_command([str(GRADLE_VIEWER), "-p", str(ANDROID_VIEWER_DIR), ":app:assembleDebug"])
-        return {"status": "ok", "output": output}
-    if target == "live":
-        if not GRADLE_LIVE.exists():
-            raise HTTPException(status_code=404, detail=f"Gradle not found at {GRADLE_LIVE}")
-        output = run_command([str(GRADLE_LIVE), "-p", str(ANDROID_LIVE_DIR), ":app:assembleDebug"])
-        return {"status": "ok", "output": output}
-    raise HTTPException(status_code=400, detail="Unknown build target")
+        gradle, project = GRADLE_VIEWER, ANDROID_VIEWER_DIR
+    elif target == "live":
+        gradle, project = GRADLE_LIVE, ANDROID_LIVE_DIR
+    else:
+        raise HTTPException(status_code=400, detail="Unknown build target")
+    if not gradle.exists():
+        raise HTTPException(status_code=404, detail=f"Gradle not found at {gradle}")
+
+    async def build(job: Job) -> str:
+        return await run_command_async(
+            [str(gradle), "-p", str(project), ":app:assembleDebug"], family="build", on_line=job.log
+        )
+
+    return await submit_admin_job(
+        response,
+        "build",
+        f"build:{target}",
+        f"build {target}",
+        build,
+        wait,
+        lambda job: {"status": "ok", "output": job.result},
+    )
 
 
 @app.post("/api/admin/install")
-def admin_install(target: str = "viewer", device_id: Optional[str] = None):
-    resolved = resolve_device_id(device_id)
+async def admin_install(
+    response: Response,
+    target: str = "viewer",
+    device_id: Optional[str] = None,
+    all_devices: bool = False,
+    force: bool = False,
+    wait: bool = False,
+):
+    if all_devices:
+        resolved = [device["id"] for device in await list_adb_devices()]
+        if not resolved:
+            raise HTTPException(status_code=404, detail="No adb devices connected")
+    else:
+        requested = [item.strip() for item in (device_id or "").split(",") if item.strip()] or [None]
+        resolved = list(dict.fromkeys([await resolve_device_id(item) for item in requested]))
     if target == "viewer":
-        if not VIEWER_APK.exists():
-            raise HTTPException(status_code=404, detail=f"Viewer APK not found: {VIEWER_APK}")
-        run_adb(["-s", resolved, "install", "-r", str(VIEWER_APK)])
-        return {"status": "ok", "apk": str(VIEWER_APK)}
-    if target == "live":
-        if not LIVE_HELPER_APK.exists():
-            raise HTTPException(status_code=404, detail=f"Live APK not found: {LIVE_HELPER_APK}")
-        run_adb(["-s", resolved, "install", "-r", str(LIVE_HELPER_APK)])
-        return {"status": "ok", "apk": str(LIVE_HELPER_APK)}
-    raise HTTPException(status_code=400, detail="Unknown install target")
+        apk, package, label = VIEWER_APK, VIEWER_PACKAGE, "Viewer"
+    elif target == "live":
+        apk, package, label = LIVE_HELPER_APK, LIVE_HELPER_PACKAGE, "Live"
+    else:
+        raise HTTPException(status_code=400, detail="Unknown install target")
+    if not apk.exists():
+        raise HTTPException(status_code=404, detail=f"{label} APK not found: {apk}")
+
+    async def install(job: Job) -> dict:
+        results = await install_apk_on_devices(resolved, apk, package, force, on_line=job.log)
+        job.result = {"apk": str(apk), "devices": results}
+        failed = [item for item in results if item["status"] == "failed"]
+        if failed:
+            raise HTTPException(
+                status_code=500,
+                detail="; ".join(f"{item['device_id']}: {item['error']}" for item in failed),
+            )
+        return job.result
+
+    devices = ",".join(sorted(resolved))
+    return await submit_admin_job(
+        response,
+        "install",
+        f"install:{target}:{devices}:{'force' if force else 'check'}",
+        f"install {target} on {devices}",
+        install,
+        wait,
+        lambda job: {"status": "ok", "apk": str(apk), "devices": job.result["devices"]},
+    )
 
 
 @app.post("/api/admin/pm2-restart")
-def admin_pm2_restart(target: str = "codex-backend"):
+async def admin_pm2_restart(response: Response, target: str = "codex-backend", wait: bool = False):
     if not shutil.which("pm2"):
         raise HTTPException(status_code=500, detail="pm2 not found")
-    output = run_command(["pm2", "restart", target, "--update-env"])
-    return {"status": "ok", "output": output}
+
+    async def restart(job: Job) -> str:
+        return await run_command_async(["pm2", "restart", target, "--update-env"], family="pm2", on_line=job.log)
+
+    return await submit_admin_job(
+        response,
+        "pm2",
+        f"pm2:{target}",
+        f"pm2 restart {target}",
+        restart,
+        wait,
+        lambda job: {"status": "ok", "output": job.result},
+    )
 
 
 DASHBOARD_HTML = f"""
@@ -1387,8 +5830,16 @@ DASHBOARD_HTML = f"""
     </div>
     <div class="card" style="margin-top:16px;">
       <h2>Output</h2>
+      <div class="row" style="align-items:center; margin-bottom:8px;">
+        <span class="muted" id="jobStatus">No job running</span>
+        <button class="danger" id="cancelJob" style="display:none;" onclick="cancelJob()">Cancel</button>
+      </div>
       <pre id="output"></pre>
     </div>
+    <div class="card" style="margin-top:16px;">
+      <h2>Recent Jobs</h2>
+      <div id="jobs" class="muted">None yet</div>
+    </div>
   </div>
   <script>
     async function loadDevices() {{
@@ -1403,6 +5854,12 @@ DASHBOARD_HTML = f"""
         opt.textContent = label;
         sel.appendChild(opt);
       }});
+      if (sel.options.length > 1) {{
+        const opt = document.createElement('option');
+        opt.textContent = 'All devices';
+        opt.value = '*';
+        sel.appendChild(opt);
+      }}
       if (!sel.options.length) {{
         const opt = document.createElement('option');
         opt.textContent = 'No devices';
@@ -1410,24 +5867,88 @@ DASHBOARD_HTML = f"""
         sel.appendChild(opt);
       }}
     }}
+    let currentJob = null;
+    let jobSeq = 0;
+    let pollTimer = null;
+    function showJob(job) {{
+      const label = document.getElementById('jobStatus');
+      const detail = job.error ? ' – ' + (typeof job.error === 'string' ? job.error.split('\\n')[0] : JSON.stringify(job.error)) : '';
+      label.textContent = job.title + ': ' + job.status + detail;
+      document.getElementById('cancelJob').style.display = ['queued', 'running'].includes(job.status) ? '' : 'none';
+    }}
+    async function pollJob() {{
+      if (!currentJob) return;
+      const res = await fetch(`/api/jobs/${{currentJob}}?since=${{jobSeq}}`);
+      if (!res.ok) {{ currentJob = null; return; }}
+      const job = await res.json();
+      const out = document.getElementById('output');
+      if (job.output.lines.length) {{
+        out.textContent += job.output.lines.join('\\n') + '\\n';
+        out.scrollTop = out.scrollHeight;
+      }}
+      jobSeq = job.output.seq;
+      showJob(job);
+      if (['queued', 'running'].includes(job.status)) {{
+        pollTimer = setTimeout(pollJob, 1000);
+      }} else {{
+        loadJobs();
+        loadDevices();
+      }}
+    }}
+    function followJob(id) {{
+      clearTimeout(pollTimer);
+      currentJob = id;
+      jobSeq = 0;
+      document.getElementById('output').textContent = '';
+      pollJob();
+    }}
+    async function cancelJob() {{
+      if (currentJob) await fetch(`/api/jobs/${{currentJob}}/cancel`, {{ method: 'POST' }});
+    }}
+    async function loadJobs() {{
+      const res = await fetch('/api/jobs');
+      const data = await res.json();
+      const list = document.getElementById('jobs');
+      list.innerHTML = '';
+      (data.jobs || []).slice(0, 10).forEach(job => {{
+        const link = document.createElement('a');
+        link.href = '#';
+        link.textContent = job.title + ' – ' + job.status;
+        link.onclick = (event) => {{ event.preventDefault(); followJob(job.id); }};
+        const row = document.createElement('div');
+        row.appendChild(link);
+        list.appendChild(row);
+      }});
+      if (!list.children.length) list.textContent = 'None yet';
+    }}
     async function runAction(url) {{
       const out = document.getElementById('output');
-      out.textContent = 'Running...';
       const res = await fetch(url, {{ method: 'POST' }});
-      const text = await res.text();
-      out.textContent = text;
-      loadDevices();
+      const data = await res.json();
+      if (!res.ok || !data.job) {{
+        out.textContent = JSON.stringify(data, null, 2);
+        return;
+      }}
+      followJob(data.job.id);
+      loadJobs();
     }}
     async function runInstall(target) {{
       const sel = document.getElementById('deviceSelect');
       const device = sel.value || '';
-      const url = `/api/admin/install?target=${{target}}&device_id=${{encodeURIComponent(device)}}`;
+      const url = device === '*'
+        ? `/api/admin/install?target=${{target}}&all_devices=true`
+        : `/api/admin/install?target=${{target}}&device_id=${{encodeURIComponent(device)}}`;
       await runAction(url);
     }}
     function openSettings() {{
       window.open('/settings', '_blank');
     }}
     loadDevices();
+    loadJobs().then(async () => {{
+      const res = await fetch('/api/admin/status');
+      const active = (await res.json()).jobs || [];
+      if (active.length) followJob(active[0].id);
+    }});
   </script>
 </body>
 </html>
@@ -1444,6 +5965,7 @@ async def websocket_endpoint(websocket: WebSocket):
         await websocket.send_text(f"Error: {err}\r\n")
         await websocket.close(code=1011)
         return
+    await asyncio.to_thread(DIR_INDEX.record_use, cwd)
 
     session = HeadlessPTY(cmd, cwd, build_env_with_path(cmd[0] if cmd else None))
     try:
@@ -1452,6 +5974,8 @@ async def websocket_endpoint(websocket: WebSocket):
         await websocket.send_text(f"Error starting codex: {exc}\r\n")
         await websocket.close(code=1011)
         return
+    PTY_SESSIONS.inc()
+    PTY_SESSIONS_TOTAL.inc()
 
     async def pty_reader():
         loop = asyncio.get_running_loop()
@@ -1461,6 +5985,7 @@ async def websocket_endpoint(websocket: WebSocket):
                 data = await loop.run_in_executor(None, session.read, 4096)
                 if not data:
                     break
+                PTY_OUTPUT_BYTES.inc(len(data))
                 data = pending + data
                 pending = b""
                 if data.endswith(b"\x1b"):
@@ -1484,6 +6009,7 @@ async def websocket_endpoint(websocket: WebSocket):
                         await websocket.send_text(data.decode("utf-8", errors="ignore"))
                     except RuntimeError:
                         break
+                    PTY_FRAMES.inc()
             except Exception:
                 break
         await websocket.close()
@@ -1494,12 +6020,15 @@ async def websocket_endpoint(websocket: WebSocket):
         while True:
             data = await websocket.receive_text()
             if data:
-                session.write(data.encode("utf-8"))
+                payload = data.encode("utf-8")
+                session.write(payload)
+                PTY_INPUT_BYTES.inc(len(payload))
     except WebSocketDisconnect:
         pass
     except Exception:
         pass
     finally:
+        PTY_SESSIONS.dec()
         session.stop()
         reader_task.cancel()
 
@@ -1550,20 +6079,89 @@ def resolve_codex_command(cwd_override: Optional[str] = None) -> tuple[list[str]
     return [resolved] + codex_args, cwd, None
 
 
+class ConfigStore:
+    """The parsed config file, re-read only when a `stat` shows it changed.
+
+    Writes go to a temporary file that is renamed over the config, so readers
+    (including the settings UI and the GUI) never see a half-written file.
+    Subscribers are called with the new config whenever its content changes,
+    whether through `save` or an edit on disk.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._stamp: Optional[tuple[int, int, int]] = None
+        self._config: dict = {}
+        self._loaded = False
+        self._subscribers: list[Callable[[dict], None]] = []
+
+    def subscribe(self, callback: Callable[[dict], None]) -> None:
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def load(self) -> dict:
+        """A copy of the current config; callers may modify it freely."""
+        with self._lock:
+            changed = self._refresh()
+            config = copy.deepcopy(self._config)
+        if changed:
+            self._notify(config)
+        return config
+
+    def save(self, config: dict) -> None:
+        with self._lock:
+            write_json_atomic(self.path, config)
+            changed = config != self._config or not self._loaded
+            self._config = copy.deepcopy(config)
+            self._stamp = self._file_stamp()
+            self._loaded = True
+        if changed:
+            self._notify(copy.deepcopy(config))
+
+    def _file_stamp(self) -> Optional[tuple[int, int, int]]:
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def _refresh(self) -> bool:
+        stamp = self._file_stamp()
+        if self._loaded and stamp == self._stamp:
+            return False
+        config: dict = {}
+        if stamp is not None:
+            try:
+                with self.path.open("r", encoding="utf-8") as handle:
+                    config = json.load(handle)
+            except Exception:
+                config = {}
+        changed = config != self._config or not self._loaded
+        self._config = config
+        self._stamp = stamp
+        self._loaded = True
+        return changed
+
+    def _notify(self, config: dict) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(copy.deepcopy(config))
+            except Exception:
+                logger.exception("Config subscriber failed")
+
+
+CONFIG = ConfigStore(CONFIG_PATH)
+
+
 def load_config() -> dict:
-    if not CONFIG_PATH.exists():
-        return {}
-    try:
-        with CONFIG_PATH.open("r", encoding="utf-8") as handle:
-            return json.load(handle)
-    except Exception:
-        return {}
+    return CONFIG.load()
 
 
 def save_config(config: dict) -> None:
-    CONFIG_PATH.parent.mkdir(parents=True, exist_ok=True)
-    with CONFIG_PATH.open("w", encoding="utf-8") as handle:
-        json.dump(config, handle, indent=2, ensure_ascii=False)
+    CONFIG.save(config)
 
 
 def apply_stt_settings(config: dict) -> None:
@@ -1589,7 +6187,57 @@ def apply_stt_settings(config: dict) -> None:
         _stt_model = None
 
 
+CONFIG.subscribe(apply_stt_settings)
+
+
+class CodexResolver:
+    """Remembers where `codex` was found, so each /ws connect costs a couple of stats.
+
+    A cached result is reused while the binary's inode and mtime are
+    unchanged and ~/.nvm/versions/node has not gained or lost a version.
+    Misses are not cached, so installing Codex takes effect immediately.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: dict[tuple[str, str, str], tuple[str, tuple]] = {}
+
+    @staticmethod
+    def _stamp(resolved: str) -> Optional[tuple]:
+        try:
+            binary = os.stat(resolved)
+        except OSError:
+            return None
+        try:
+            nvm = os.stat(Path.home() / ".nvm" / "versions" / "node").st_mtime_ns
+        except OSError:
+            nvm = None
+        return (binary.st_ino, binary.st_mtime_ns, nvm)
+
+    def resolve(self, codex_path: str) -> Optional[str]:
+        key = (codex_path, os.environ.get("PATH", ""), str(Path.home()))
+        with self._lock:
+            cached = self._entries.get(key)
+        if cached and self._stamp(cached[0]) == cached[1]:
+            return cached[0]
+        resolved = find_codex_path(codex_path)
+        stamp = self._stamp(resolved) if resolved else None
+        with self._lock:
+            if stamp:
+                self._entries[key] = (resolved, stamp)
+            else:
+                self._entries.pop(key, None)
+        return resolved
+
+
+CODEX_RESOLVER = CodexResolver()
+
+
 def resolve_codex_path(codex_path: str) -> Optional[str]:
+    return CODEX_RESOLVER.resolve(codex_path)
+
+
+def find_codex_path(codex_path: str) -> Optional[str]:
     candidate = Path(codex_path).expanduser()
     if candidate.is_absolute() and candidate.exists():
         return str(candidate)
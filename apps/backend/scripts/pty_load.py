@@ -0,0 +1,75 @@
+"""Synthetic terminal program for benchmarking /ws, used as CODEX_CMD by ws_bench.py.
+
+Modes:
+  flood   write coloured log lines as fast as the PTY accepts them
+  redraw  repaint a full screen like a TUI at a fixed frame rate
+  echo    raw mode; write back every byte read from the terminal
+"""
+
+import argparse
+import os
+import sys
+import time
+import tty
+
+
+def flood(block_size: int) -> None:
+    lines = []
+    for index in range(1024):
+        lines.append(f"\x1b[32m{index:06d}\x1b[0m {'lorem ipsum dolor sit amet ' * 3}\r\n")
+    block = "".join(lines).encode()
+    block = (block * (block_size // len(block) + 1))[:block_size]
+    out = sys.stdout.buffer
+    while True:
+        out.write(block)
+        out.flush()
+
+
+def redraw(fps: float, rows: int, cols: int) -> None:
+    out = sys.stdout.buffer
+    frame = 0
+    interval = 1.0 / fps
+    next_frame = time.monotonic()
+    while True:
+        parts = ["\x1b[H"]
+        for row in range(rows):
+            text = f" frame {frame:08d} row {row:03d} ".ljust(cols, "#" if (row + frame) % 2 else "=")
+            parts.append(f"\x1b[{row + 1};1H\x1b[{31 + row % 7}m{text[:cols]}\x1b[0m")
+        out.write("".join(parts).encode())
+        out.flush()
+        frame += 1
+        next_frame += interval
+        time.sleep(max(0.0, next_frame - time.monotonic()))
+
+
+def echo() -> None:
+    if os.isatty(0):
+        tty.setraw(0)
+    while True:
+        data = os.read(0, 4096)
+        if not data:
+            return
+        os.write(1, data)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("flood", "redraw", "echo"), default="flood")
+    parser.add_argument("--block-size", type=int, default=64 * 1024)
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--rows", type=int, default=40)
+    parser.add_argument("--cols", type=int, default=120)
+    args = parser.parse_args()
+    try:
+        if args.mode == "flood":
+            flood(args.block_size)
+        elif args.mode == "redraw":
+            redraw(args.fps, args.rows, args.cols)
+        else:
+            echo()
+    except (BrokenPipeError, KeyboardInterrupt):
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""End-to-end benchmark for the /ws terminal stream.
+
+Starts the backend under uvicorn once per scenario with CODEX_CMD pointing
+at pty_load.py, connects N WebSocket clients and prints one JSON document:
+
+  flood   bytes/s and frames/s of a program writing as fast as it can
+  redraw  the same for a 30 fps full-screen TUI
+  echo    keystroke round-trip latency (p50/p99) through the PTY
+
+Server CPU time is read from /proc, so it is only reported on Linux.
+
+    .venv/bin/python scripts/ws_bench.py --clients 8 --duration 10 --output bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shlex
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+try:
+    import websockets
+except ImportError:  # pragma: no cover - runtime guard
+    websockets = None
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+LOAD_SCRIPT = Path(__file__).resolve().with_name("pty_load.py")
+SCENARIOS = ("flood", "redraw", "echo")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values: list[float], fraction: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))]
+
+
+def cpu_seconds(pid: int):
+    """utime + stime of a process from /proc, or None where that is unavailable."""
+    try:
+        with open(f"/proc/{pid}/stat") as handle:
+            fields = handle.read().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+class Backend:
+    """uvicorn running main:app with CODEX_CMD set to a pty_load.py mode."""
+
+    def __init__(self, mode: str, port: int, load_args: list[str]):
+        self.mode = mode
+        self.port = port
+        self.load_args = load_args
+        self.process = None
+        self._tmp = tempfile.TemporaryDirectory(prefix="ws-bench-")
+
+    def __enter__(self) -> "Backend":
+        env = os.environ.copy()
+        env["CODEX_CMD"] = shlex.join([sys.executable, str(LOAD_SCRIPT), "--mode", self.mode, *self.load_args])
+        # Keep the benchmark's sessions out of the real config and directory usage.
+        env["CODEX_CONFIG"] = str(Path(self._tmp.name) / "config.json")
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(self.port),
+             "--log-level", "warning"],
+            cwd=BACKEND_DIR,
+            env=env,
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"backend exited with {self.process.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{self.port}/health", timeout=1):
+                    return self
+            except OSError:
+                time.sleep(0.1)
+        raise RuntimeError("backend did not become healthy within 30s")
+
+    def __exit__(self, *exc_info) -> None:
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self._tmp.cleanup()
+
+    @property
+    def url(self) -> str:
+        return f"ws://127.0.0.1:{self.port}/ws"
+
+
+async def stream_client(url: str, duration: float) -> dict:
+    received = frames = 0
+    async with websockets.connect(url, max_size=None) as ws:
+        started = time.perf_counter()
+        deadline = started + duration
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                message = await asyncio.wait_for(ws.recv(), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+            received += len(message.encode() if isinstance(message, str) else message)
+            frames += 1
+        elapsed = time.perf_counter() - started
+    return {"bytes": received, "frames": frames, "seconds": elapsed}
+
+
+async def echo_client(url: str, duration: float, client_id: int) -> dict:
+    latencies = []
+    async with websockets.connect(url, max_size=None) as ws:
+        # Let the program switch the terminal to raw mode before timing keystrokes.
+        await asyncio.sleep(0.2)
+        started = time.perf_counter()
+        deadline = started + duration
+        seq = 0
+        pending = ""
+        while time.perf_counter() < deadline:
+            token = f"~{client_id}.{seq}~"
+            sent = time.perf_counter()
+            await ws.send(token)
+            while token not in pending:
+                remaining = deadline + 5 - time.perf_counter()
+                message = await asyncio.wait_for(ws.recv(), timeout=max(0.1, remaining))
+                pending += message if isinstance(message, str) else message.decode(errors="ignore")
+            latencies.append((time.perf_counter() - sent) * 1000)
+            pending = pending[pending.index(token) + len(token) :]
+            seq += 1
+        elapsed = time.perf_counter() - started
+    return {"latencies_ms": latencies, "seconds": elapsed}
+
+
+async def run_clients(mode: str, url: str, clients: int, duration: float) -> list[dict]:
+    if mode == "echo":
+        jobs = [echo_client(url, duration, index) for index in range(clients)]
+    else:
+        jobs = [stream_client(url, duration) for _ in range(clients)]
+    return await asyncio.gather(*jobs)
+
+
+def run_scenario(mode: str, clients: int, duration: float, load_args: list[str]) -> dict:
+    with Backend(mode, free_port(), load_args) as backend:
+        cpu_before = cpu_seconds(backend.process.pid)
+        wall_started = time.perf_counter()
+        results = asyncio.run(run_clients(mode, backend.url, clients, duration))
+        wall = time.perf_counter() - wall_started
+        cpu_after = cpu_seconds(backend.process.pid)
+
+    summary = {"clients": clients, "duration_s": round(wall, 3)}
+    if cpu_before is not None and cpu_after is not None:
+        cpu = cpu_after - cpu_before
+        summary["server_cpu_s"] = round(cpu, 3)
+        summary["server_cpu_percent"] = round(100 * cpu / wall, 1)
+        summary["server_cpu_percent_per_session"] = round(100 * cpu / wall / clients, 2)
+    if mode == "echo":
+        latencies = [value for result in results for value in result["latencies_ms"]]
+        summary.update(
+            {
+                "round_trips": len(latencies),
+                "echo_p50_ms": round(percentile(latencies, 0.5), 3) if latencies else None,
+                "echo_p99_ms": round(percentile(latencies, 0.99), 3) if latencies else None,
+                "echo_max_ms": round(max(latencies), 3) if latencies else None,
+            }
+        )
+    else:
+        total_bytes = sum(result["bytes"] for result in results)
+        total_frames = sum(result["frames"] for result in results)
+        seconds = max(result["seconds"] for result in results)
+        summary.update(
+            {
+                "bytes": total_bytes,
+                "frames": total_frames,
+                "bytes_per_s": round(total_bytes / seconds),
+                "frames_per_s": round(total_frames / seconds, 1),
+                "bytes_per_s_per_client": round(total_bytes / seconds / clients),
+                "avg_frame_bytes": round(total_bytes / total_frames) if total_frames else 0,
+            }
+        )
+    return summary
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset of %(default)s")
+    parser.add_argument("--clients", type=int, default=4, help="concurrent WebSocket clients per scenario")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per scenario")
+    parser.add_argument("--fps", type=float, default=30.0, help="redraw frame rate")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    if websockets is None:
+        print("The websockets package is required (pip install 'uvicorn[standard]').", file=sys.stderr)
+        return 2
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = sorted(set(scenarios) - set(SCENARIOS))
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    report = {
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "scenarios": {},
+    }
+    for mode in scenarios:
+        load_args = ["--fps", str(args.fps)] if mode == "redraw" else []
+        report["scenarios"][mode] = run_scenario(mode, args.clients, args.duration, load_args)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+import os
+import socket
+import struct
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import main  # noqa: E402
+
+
+class FakeAdbServer:
+    """Minimal adb server: host services plus `exec:` backed by a local shell."""
+
+    def __init__(self, devices=None):
+        self.devices = devices if devices is not None else {
+            'emulator-5554': 'product:sdk_gphone64 model:Pixel_7 device:emu64 transport_id:1',
+        }
+        self.services = []
+        self.reverses = []
+        self._changed = threading.Condition()
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind(('127.0.0.1', 0))
+        self._sock.listen(16)
+        self.port = self._sock.getsockname()[1]
+        self._running = True
+        self._thread = threading.Thread(target=self._accept_loop, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        self._sock.close()
+        with self._changed:
+            self._changed.notify_all()
+
+    def set_devices(self, devices):
+        with self._changed:
+            self.devices = devices
+            self._changed.notify_all()
+
+    def count(self, service):
+        return sum(1 for item in self.services if item == service)
+
+    def _accept_loop(self):
+        while self._running:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    @staticmethod
+    def _read_exact(conn, size):
+        data = b''
+        while len(data) < size:
+            chunk = conn.recv(size - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return data
+
+    @staticmethod
+    def _send_string(conn, text):
+        payload = text.encode('utf-8')
+        conn.sendall(b'%04x' % len(payload) + payload)
+
+    def _handle(self, conn):
+        try:
+            while True:
+                header = self._read_exact(conn, 4)
+                if header is None:
+                    return
+                service = self._read_exact(conn, int(header, 16)).decode('utf-8')
+                self.services.append(service)
+                if not self._dispatch(conn, service):
+                    return
+        finally:
+            conn.close()
+
+    def _dispatch(self, conn, service):
+        if service == 'host:version':
+            conn.sendall(b'OKAY')
+            self._send_string(conn, '0029')
+            return False
+        if service == 'host:devices-l':
+            conn.sendall(b'OKAY')
+            lines = ''.join(f'{serial}\tdevice {attrs}\n' for serial, attrs in self.devices.items())
+            self._send_string(conn, lines)
+            return False
+        if service == 'host:track-devices':
+            conn.sendall(b'OKAY')
+            self._track_devices(conn)
+            return False
+        if service.startswith('host:transport:'):
+            serial = service.split(':', 2)[2]
+            if serial not in self.devices:
+                conn.sendall(b'FAIL')
+                self._send_string(conn, f"device '{serial}' not found")
+                return False
+            conn.sendall(b'OKAY')
+            return True
+        if service == 'exec:sh':
+            conn.sendall(b'OKAY')
+            self._bridge_shell(conn)
+            return False
+        if service.startswith('exec:'):
+            conn.sendall(b'OKAY')
+            result = subprocess.run(['sh', '-c', service[5:]], stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            conn.sendall(result.stdout)
+            return False
+        if service.startswith('reverse:forward:'):
+            self.reverses.append(service.split(':', 2)[2])
+            conn.sendall(b'OKAYOKAY')
+            return False
+        conn.sendall(b'FAIL')
+        self._send_string(conn, f'unknown service {service}')
+        return False
+
+    def _track_devices(self, conn):
+        with self._changed:
+            while self._running:
+                lines = ''.join(f'{serial}\tdevice\n' for serial in self.devices)
+                try:
+                    self._send_string(conn, lines)
+                except OSError:
+                    return
+                self._changed.wait()
+
+    @staticmethod
+    def _bridge_shell(conn):
+        proc = subprocess.Popen(['sh'], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+
+        def pump():
+            while True:
+                data = os.read(proc.stdout.fileno(), 65536)
+                if not data:
+                    break
+                try:
+                    conn.sendall(data)
+                except OSError:
+                    break
+            try:
+                conn.shutdown(socket.SHUT_WR)
+            except OSError:
+                pass
+
+        reader = threading.Thread(target=pump, daemon=True)
+        reader.start()
+        try:
+            while True:
+                data = conn.recv(65536)
+                if not data:
+                    break
+                proc.stdin.write(data)
+                proc.stdin.flush()
+        except OSError:
+            pass
+        finally:
+            proc.kill()
+            proc.wait()
+            reader.join(timeout=2)
+
+
+@pytest.fixture
+def fake_adb(monkeypatch):
+    server = FakeAdbServer().start()
+    client = main.AdbClient(port=server.port)
+    registry = main.DeviceRegistry(client)
+    monkeypatch.setattr(main, 'ADB', client)
+    monkeypatch.setattr(main, 'ADB_NATIVE', True)
+    monkeypatch.setattr(main, 'DEVICES', registry)
+    yield server
+    registry.stop()
+    client.close()
+    server.stop()
+
+
+@pytest.fixture
+def device_screen(fake_adb, tmp_path, monkeypatch):
+    """Stand-in for the device's `screencap` writing a 64x32 RGBA frame."""
+    frame = tmp_path / 'frame.raw'
+    frame.write_bytes(struct.pack('<III', 64, 32, 1) + bytes(range(256)) * 32)
+    script = tmp_path / 'bin' / 'screencap'
+    script.parent.mkdir()
+    script.write_text(f'#!/bin/sh\nexec {sys.executable} -c "import sys; sys.stdout.buffer.write(open(\'{frame}\', \'rb\').read())"\n')
+    script.chmod(0o755)
+    monkeypatch.setenv('PATH', f"{script.parent}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setattr(main, 'LIVE_ADAPTIVE', main.LiveAdaptiveController(target_ms=200))
+    monkeypatch.setattr(main, 'LIVE_FRAMES', main.LiveFrameCache())
+    return frame
@@ -0,0 +1,167 @@
+import asyncio
+import os
+import socket
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+
+import main
+
+SERIAL = 'emulator-5554'
+
+
+def adb(args):
+    return asyncio.run(main.run_adb_async(args))
+
+
+def test_list_devices_over_adb_server(fake_adb):
+    devices = asyncio.run(main.list_adb_devices())
+
+    assert devices == [
+        {
+            'id': SERIAL,
+            'model': 'Pixel_7',
+            'product': 'sdk_gphone64',
+            'device': 'emu64',
+            'transport_id': '1',
+        }
+    ]
+
+
+def test_shell_commands_reuse_one_persistent_session(fake_adb):
+    assert adb(['-s', SERIAL, 'shell', 'echo', 'one']) == 'one'
+    assert adb(['-s', SERIAL, 'shell', 'echo', 'two', '&&', 'echo', 'three']) == 'two\nthree'
+
+    assert fake_adb.count('exec:sh') == 1
+
+
+def test_shell_failure_raises_and_keeps_session(fake_adb):
+    with pytest.raises(HTTPException) as excinfo:
+        adb(['-s', SERIAL, 'shell', 'echo', 'broken', ';', 'false'])
+
+    assert excinfo.value.detail == 'broken'
+    assert adb(['-s', SERIAL, 'shell', 'echo', 'ok']) == 'ok'
+    assert fake_adb.count('exec:sh') == 1
+
+
+def test_shell_does_not_read_following_commands_as_stdin(fake_adb):
+    assert adb(['-s', SERIAL, 'shell', 'cat']) == ''
+    assert adb(['-s', SERIAL, 'shell', 'echo', 'after']) == 'after'
+
+
+def test_exec_out_returns_binary(fake_adb):
+    data = asyncio.run(main.run_adb_binary_async(['-s', SERIAL, 'exec-out', 'printf', "'\\001\\000\\377'"]))
+
+    assert data == b'\x01\x00\xff'
+
+
+def test_unknown_device_is_reported(fake_adb):
+    with pytest.raises(HTTPException) as excinfo:
+        adb(['-s', 'missing', 'shell', 'echo', 'hi'])
+
+    assert "not found" in excinfo.value.detail
+
+
+def test_reverse_uses_transport_service(fake_adb):
+    adb(['-s', SERIAL, 'reverse', 'tcp:8081', 'tcp:8081'])
+
+    assert fake_adb.reverses == ['tcp:8081;tcp:8081']
+
+
+def test_stale_session_is_replaced(fake_adb):
+    adb(['-s', SERIAL, 'shell', 'echo', 'warm'])
+    session = main.ADB._idle[SERIAL][0]
+    session.conn.sock.shutdown(socket.SHUT_RDWR)
+
+    assert adb(['-s', SERIAL, 'shell', 'echo', 'again']) == 'again'
+    assert fake_adb.count('exec:sh') == 2
+
+
+def test_falls_back_to_binary_without_server(monkeypatch):
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    monkeypatch.setattr(main, 'ADB', main.AdbClient(port=port))
+    monkeypatch.setattr(main, 'ADB_NATIVE', True)
+
+    assert main.try_adb_native(['devices', '-l']) is None
+
+
+def test_unhandled_commands_use_binary(fake_adb):
+    assert main.adb_native_command(['-s', SERIAL, 'install', '-r', 'app.apk']) is None
+    assert fake_adb.services == []
+
+
+def test_unbalanced_quote_fails_fast_and_keeps_session(fake_adb):
+    started = time.monotonic()
+    with pytest.raises(HTTPException) as excinfo:
+        adb(['-s', SERIAL, 'shell', 'echo', "don't"])
+
+    assert time.monotonic() - started < 2
+    assert 'Syntax error' in excinfo.value.detail
+    assert adb(['-s', SERIAL, 'shell', 'echo', 'ok']) == 'ok'
+    assert fake_adb.count('exec:sh') == 1
+
+
+def test_input_text_is_one_shell_word(fake_adb):
+    text = main.adb_escape_text("don't stop; echo $HOME `id` \"x\"")
+
+    assert adb(['-s', SERIAL, 'shell', 'printf', '%s', text]) == "don't%sstop;%secho%s$HOME%s`id`%s\"x\""
+
+
+def test_connect_timeout_falls_back_to_binary(monkeypatch):
+    def hang(*args, **kwargs):
+        raise socket.timeout('timed out')
+
+    monkeypatch.setattr(main.socket, 'create_connection', hang)
+    monkeypatch.setattr(main, 'ADB', main.AdbClient(port=1))
+    monkeypatch.setattr(main, 'ADB_NATIVE', True)
+
+    assert main.try_adb_native(['-s', SERIAL, 'shell', 'echo', 'hi']) is None
+
+
+def test_exec_out_honours_timeout(fake_adb):
+    started = time.monotonic()
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.run_adb_binary_async(['-s', SERIAL, 'exec-out', 'sleep', '3'], timeout=0.3))
+
+    assert 'timed out' in excinfo.value.detail
+    assert time.monotonic() - started < 2
+
+
+def test_cancelled_shell_call_frees_its_worker(fake_adb):
+    adb(['-s', SERIAL, 'shell', 'echo', 'warm'])
+
+    async def cancel_midway():
+        task = asyncio.ensure_future(main.run_adb_binary_async(['-s', SERIAL, 'shell', 'sleep', '5']))
+        await asyncio.sleep(0.3)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    started = time.monotonic()
+    asyncio.run(cancel_midway())
+
+    assert time.monotonic() - started < 2
+    assert main.ADB._open[SERIAL] == 0
+    assert adb(['-s', SERIAL, 'shell', 'echo', 'next']) == 'next'
+
+
+def test_session_lost_after_send_is_not_rerun_through_binary(fake_adb, tmp_path, monkeypatch):
+    binary = tmp_path / 'adb'
+    binary.write_text(f'#!/bin/sh\ntouch {tmp_path / "binary-ran"}\n')
+    binary.chmod(0o755)
+    monkeypatch.setenv('PATH', f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+    adb(['-s', SERIAL, 'shell', 'echo', 'warm'])
+    session = main.ADB._idle[SERIAL][0]
+    timer = threading.Timer(0.3, session.conn.sock.shutdown, (socket.SHUT_RDWR,))
+    timer.start()
+
+    with pytest.raises(HTTPException) as excinfo:
+        adb(['-s', SERIAL, 'shell', 'sleep', '2'])
+
+    assert 'lost while running sleep 2' in excinfo.value.detail
+    assert not (tmp_path / 'binary-ran').exists()
+    assert main.ADB._open[SERIAL] == 0
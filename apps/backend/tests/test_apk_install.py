@@ -0,0 +1,85 @@
+import asyncio
+import os
+
+import pytest
+from fastapi import HTTPException
+
+import main
+
+
+@pytest.fixture
+def device_adb(monkeypatch):
+    """Replaces adb with per-device installed APK hashes and an install log."""
+    installed = {}
+    calls = []
+
+    async def fake_run_adb_async(args, timeout=main.ADB_COMMAND_TIMEOUT, on_line=None):
+        device, command = args[1], args[2]
+        calls.append((device, command))
+        if device == 'offline':
+            raise HTTPException(status_code=500, detail='device offline')
+        if command == 'shell':
+            digest = installed.get(device)
+            if not digest:
+                return ''
+            return f'{digest}  /data/app/~~x/base.apk\n    versionCode=7 minSdk=26\n    versionName=1.2'
+        if on_line:
+            on_line('Performing Streamed Install')
+        installed[device] = main.APK_HASHES.sha256(main.Path(args[-1]))
+        return 'Success'
+
+    monkeypatch.setattr(main, 'run_adb_async', fake_run_adb_async)
+    monkeypatch.setattr(main, 'APK_HASHES', main.ApkHashCache())
+    return installed, calls
+
+
+def test_hash_cache_tracks_size_and_mtime(tmp_path):
+    apk = tmp_path / 'app.apk'
+    apk.write_bytes(b'one')
+    cache = main.ApkHashCache()
+    first = cache.sha256(apk)
+
+    stat = apk.stat()
+    apk.write_bytes(b'two')
+    os.utime(apk, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert cache.sha256(apk) == first
+
+    os.utime(apk, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert cache.sha256(apk) != first
+
+
+def test_identical_apk_is_skipped_unless_forced(device_adb, tmp_path):
+    installed, calls = device_adb
+    apk = tmp_path / 'app.apk'
+    apk.write_bytes(b'build 1')
+
+    first = asyncio.run(main.install_apk('pixel', apk, main.VIEWER_PACKAGE))
+    second = asyncio.run(main.install_apk('pixel', apk, main.VIEWER_PACKAGE))
+    forced = asyncio.run(main.install_apk('pixel', apk, main.VIEWER_PACKAGE, force=True))
+
+    assert [first['status'], second['status'], forced['status']] == ['installed', 'skipped', 'installed']
+    assert second['installed'] == {'sha256': first['sha256'], 'version_name': '1.2', 'version_code': 7}
+    assert [command for _, command in calls].count('install') == 2
+
+    apk.write_bytes(b'build 2 is bigger')
+    assert asyncio.run(main.install_apk('pixel', apk, main.VIEWER_PACKAGE))['status'] == 'installed'
+
+
+def test_multi_device_install_reports_each_device(device_adb, tmp_path):
+    installed, _ = device_adb
+    apk = tmp_path / 'app.apk'
+    apk.write_bytes(b'build')
+    installed['tablet'] = main.ApkHashCache().sha256(apk)
+    lines = []
+
+    results = asyncio.run(
+        main.install_apk_on_devices(['pixel', 'tablet', 'offline'], apk, main.VIEWER_PACKAGE, on_line=lines.append)
+    )
+
+    assert [(item['device_id'], item['status']) for item in results] == [
+        ('pixel', 'installed'),
+        ('tablet', 'skipped'),
+        ('offline', 'failed'),
+    ]
+    assert results[2]['error'] == 'device offline'
+    assert lines == ['[pixel] Performing Streamed Install']
@@ -0,0 +1,33 @@
+import os
+
+import main
+
+
+def install_codex(home, version):
+    binary = home / '.nvm' / 'versions' / 'node' / version / 'bin' / 'codex'
+    binary.parent.mkdir(parents=True)
+    binary.write_text('#!/bin/sh\n')
+    binary.chmod(0o755)
+    return binary
+
+
+def test_resolution_is_cached_until_binary_or_nvm_changes(tmp_path, monkeypatch):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    monkeypatch.setenv('PATH', str(tmp_path / 'empty'))
+    resolver = main.CodexResolver()
+    monkeypatch.setattr(main, 'CODEX_RESOLVER', resolver)
+    lookups = []
+    find = main.find_codex_path
+    monkeypatch.setattr(main, 'find_codex_path', lambda path: lookups.append(path) or find(path))
+
+    assert main.resolve_codex_path('codex') is None
+    old = install_codex(tmp_path, 'v20.11.0')
+    assert main.resolve_codex_path('codex') == str(old)
+    assert main.resolve_codex_path('codex') == str(old)
+    assert len(lookups) == 2
+
+    new = install_codex(tmp_path, 'v22.3.0')
+    assert main.resolve_codex_path('codex') == str(new)
+    os.remove(new)
+    assert main.resolve_codex_path('codex') == str(old)
+    assert len(lookups) == 4
@@ -0,0 +1,87 @@
+import json
+import threading
+
+from fastapi.testclient import TestClient
+
+import main
+
+
+def test_load_rereads_only_when_file_changes(tmp_path, monkeypatch):
+    path = tmp_path / 'config.json'
+    path.write_text(json.dumps({'terminal': {'working_directory': '/srv'}}))
+    store = main.ConfigStore(path)
+    reads = []
+    original_open = main.Path.open
+
+    def counting_open(self, *args, **kwargs):
+        if self == path and args[:1] == ('r',):
+            reads.append(self)
+        return original_open(self, *args, **kwargs)
+
+    monkeypatch.setattr(main.Path, 'open', counting_open)
+
+    first = store.load()
+    first['terminal']['working_directory'] = 'mutated'
+    assert store.load() == {'terminal': {'working_directory': '/srv'}}
+    assert len(reads) == 1
+
+    path.write_text(json.dumps({'terminal': {'working_directory': '/home'}}))
+    assert store.load()['terminal']['working_directory'] == '/home'
+    assert len(reads) == 2
+
+
+def test_save_is_atomic_and_notifies_subscribers(tmp_path):
+    path = tmp_path / 'nested' / 'config.json'
+    store = main.ConfigStore(path)
+    seen = []
+    store.subscribe(seen.append)
+
+    store.save({'stt': {'model': 'small'}})
+    store.save({'stt': {'model': 'small'}})
+
+    assert json.loads(path.read_text()) == {'stt': {'model': 'small'}}
+    assert list(path.parent.iterdir()) == [path]
+    assert seen == [{'stt': {'model': 'small'}}]
+
+    path.write_text(json.dumps({'stt': {'model': 'medium'}}))
+    store.load()
+    assert seen[-1] == {'stt': {'model': 'medium'}}
+
+
+def test_concurrent_readers_never_see_partial_writes(tmp_path):
+    path = tmp_path / 'config.json'
+    writer = main.ConfigStore(path)
+    big = {'terminal': {'codex_args': [f'--flag-{index}' for index in range(2000)]}}
+    writer.save(big)
+    errors = []
+    done = threading.Event()
+
+    def read():
+        while not done.is_set():
+            try:
+                json.loads(path.read_text())
+            except ValueError as exc:
+                errors.append(exc)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    for index in range(50):
+        writer.save({**big, 'round': index})
+    done.set()
+    reader.join()
+
+    assert errors == []
+
+
+def test_settings_update_applies_stt_settings(tmp_path, monkeypatch):
+    store = main.ConfigStore(tmp_path / 'config.json')
+    store.subscribe(main.apply_stt_settings)
+    monkeypatch.setattr(main, 'CONFIG', store)
+    monkeypatch.delenv('STT_MODEL', raising=False)
+    monkeypatch.setattr(main, 'STT_MODEL_NAME', 'base')
+
+    response = TestClient(main.app).post('/api/settings', json={'stt': {'model': 'large-v3'}})
+
+    assert response.status_code == 200
+    assert main.STT_MODEL_NAME == 'large-v3'
+    assert main.load_config()['stt']['model'] == 'large-v3'
@@ -0,0 +1,84 @@
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+import main
+
+SERIAL = 'emulator-5554'
+
+
+def wait_for(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_registry_serves_device_list_from_memory(fake_adb):
+    main.DEVICES.start()
+    assert wait_for(lambda: main.DEVICES.devices() is not None)
+    queries = fake_adb.count('host:devices-l')
+
+    for _ in range(5):
+        assert asyncio.run(main.resolve_device_id(None)) == SERIAL
+    assert asyncio.run(main.list_adb_devices())[0]['model'] == 'Pixel_7'
+
+    assert fake_adb.count('host:devices-l') == queries
+
+
+def test_registry_follows_hotplug(fake_adb):
+    main.DEVICES.start()
+    assert wait_for(lambda: main.DEVICES.devices() is not None)
+
+    fake_adb.set_devices({
+        SERIAL: fake_adb.devices[SERIAL],
+        'R58M123': 'product:a52 model:SM_A525F device:a52q transport_id:2',
+    })
+    assert wait_for(lambda: len(main.DEVICES.devices()) == 2)
+    added = [device for device in main.DEVICES.devices() if device['id'] == 'R58M123'][0]
+    assert added['model'] == 'SM_A525F'
+
+    fake_adb.set_devices({'R58M123': 'product:a52 model:SM_A525F device:a52q transport_id:2'})
+    assert wait_for(lambda: [d['id'] for d in main.DEVICES.devices()] == ['R58M123'])
+
+
+def test_registry_notifies_subscribers(fake_adb):
+    async def scenario():
+        main.DEVICES.start()
+        queue = main.DEVICES.subscribe(asyncio.get_running_loop())
+        first = await asyncio.wait_for(queue.get(), 1)
+        assert first['type'] == 'snapshot'
+        if not first['devices']:
+            added = await asyncio.wait_for(queue.get(), 3)
+            assert added['type'] == 'added'
+
+        fake_adb.set_devices({})
+        removed = await asyncio.wait_for(queue.get(), 3)
+        main.DEVICES.unsubscribe(queue)
+        return removed
+
+    removed = asyncio.run(scenario())
+
+    assert removed['type'] == 'removed'
+    assert removed['device']['id'] == SERIAL
+
+
+def test_event_stream_failure_is_logged_and_closes_socket(fake_adb, monkeypatch, caplog):
+    def subscribe(loop):
+        queue = asyncio.Queue()
+        queue.put_nowait({'type': 'snapshot', 'devices': object()})
+        return queue
+
+    monkeypatch.setattr(main.DEVICES, 'subscribe', subscribe)
+
+    with TestClient(main.app).websocket_connect('/devices/events') as ws:
+        with pytest.raises(WebSocketDisconnect) as excinfo:
+            ws.receive_text()
+
+    assert excinfo.value.code == 1011
+    assert 'Device event stream failed' in caplog.text
@@ -0,0 +1,107 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / 'work'
+    for path in ('mobile-app/android', 'mobile-web', 'tools/mobility', 'node_modules/mobile-app', '.cache/mobile-app'):
+        (root / path).mkdir(parents=True)
+    return root
+
+
+@pytest.fixture
+def index(tree, tmp_path, monkeypatch):
+    dir_index = main.DirIndex(roots=[tree], usage_path=tmp_path / 'usage.json')
+    monkeypatch.setattr(main, 'DIR_INDEX', dir_index)
+    yield dir_index
+    dir_index.stop()
+
+
+def wait_for(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return predicate()
+
+
+def test_fuzzy_match_prefers_name_and_word_starts():
+    assert main.fuzzy_match_score('mbap', '~/work/tools') is None
+    name = main.fuzzy_match_score('mobapp', '~/work/mobile-app')
+    spread = main.fuzzy_match_score('mobapp', '~/mobile/android/app')
+    assert name is not None and spread is not None and name > spread
+
+
+def test_suggest_ranks_matches_and_skips_ignored_dirs(index, tree):
+    index.ensure_started()
+    assert index.wait_ready(3)
+
+    paths = [item['path'] for item in index.search('mobapp')]
+
+    assert paths[0] == str(tree / 'mobile-app')
+    assert not any('node_modules' in path or '.cache' in path for path in paths)
+    assert [item['path'] for item in index.search('mob web')] == [str(tree / 'mobile-web')]
+
+
+def test_usage_boosts_ranking_and_persists(index, tree, tmp_path):
+    index.rebuild()
+    assert index.search('mob')[0]['path'] != str(tree / 'tools' / 'mobility')
+
+    for _ in range(5):
+        index.record_use(tree / 'tools' / 'mobility')
+
+    assert index.search('mob')[0]['path'] == str(tree / 'tools' / 'mobility')
+    reloaded = main.DirIndex(roots=[tree], usage_path=tmp_path / 'usage.json')
+    assert reloaded.frecency(str(tree / 'tools' / 'mobility')) == pytest.approx(5, rel=0.01)
+
+
+def test_watcher_tracks_created_and_removed_dirs(index, tree):
+    index.ensure_started()
+    assert index.wait_ready(3)
+    assert index.status()['watcher'] == 'inotify'
+
+    (tree / 'tools' / 'fresh-project' / 'lib').mkdir(parents=True)
+    assert wait_for(lambda: [item['path'] for item in index.search('freshlib')] == [str(tree / 'tools' / 'fresh-project' / 'lib')])
+
+    (tree / 'tools' / 'fresh-project' / 'lib').rmdir()
+    (tree / 'tools' / 'fresh-project').rename(tree / 'renamed')
+    assert wait_for(lambda: not any('fresh' in item['path'] for item in index.search('fresh')))
+    assert wait_for(lambda: [item['path'] for item in index.search('renamed')] == [str(tree / 'renamed')])
+
+
+def test_suggest_endpoint(index, tree):
+    index.rebuild()
+
+    body = TestClient(main.app).get('/dirs/suggest', params={'q': 'mobility'}).json()
+
+    assert body['results'][0]['path'] == str(tree / 'tools' / 'mobility')
+    assert body['ready'] and body['dirs'] == 6
+
+
+def test_removed_subtree_leaves_siblings_and_prefixes_current(index, tree):
+    index.rebuild()
+    assert index.search('mo')
+
+    index._on_event(str(tree), 'mobile-app', main.InotifyWatcher.IN_DELETE | main.InotifyWatcher.IN_ISDIR)
+    (tree / 'tools' / 'moon').mkdir()
+    index._on_event(str(tree / 'tools'), 'moon', main.InotifyWatcher.IN_CREATE | main.InotifyWatcher.IN_ISDIR)
+
+    assert str(tree / 'mobile-app' / 'android') not in index._entries
+    assert str(tree / 'mobile-app') not in index._children.get(str(tree), set())
+    assert sorted(item['path'] for item in index.search('mo')) == [
+        str(tree / 'mobile-web'), str(tree / 'tools' / 'mobility'), str(tree / 'tools' / 'moon'),
+    ]
+    assert 'an' not in index._prefixes
+
+
+def test_watch_budget_follows_inotify_limit(monkeypatch):
+    limit = {'value': '16384\n'}
+    monkeypatch.setattr(main.Path, 'read_text', lambda self, *args, **kwargs: limit['value'])
+    assert main.inotify_watch_budget() == 12288
+
+    limit['value'] = '1048576\n'
+    assert main.inotify_watch_budget() == main.DIR_INDEX_MAX_DIRS
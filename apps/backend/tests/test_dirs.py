@@ -0,0 +1,172 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.fixture
+def listings(monkeypatch):
+    cache = main.DirListingCache()
+    monkeypatch.setattr(main, 'DIR_LISTINGS', cache)
+    return cache
+
+
+def test_pages_through_directories_in_order(tmp_path, listings):
+    for index in range(25):
+        (tmp_path / f'dir{index:02d}').mkdir()
+        (tmp_path / f'file{index:02d}').write_text('')
+    client = TestClient(main.app)
+
+    first = client.get('/dirs', params={'path': str(tmp_path), 'limit': 10}).json()
+    assert first['dirs'][0] == str(tmp_path.parent)
+    assert first['dirs'][1:] == [str(tmp_path / f'dir{index:02d}') for index in range(9)]
+
+    seen = first['dirs'][1:]
+    cursor = first['next_cursor']
+    while cursor:
+        page = client.get('/dirs', params={'path': str(tmp_path), 'limit': 10, 'cursor': cursor}).json()
+        seen += page['dirs']
+        cursor = page['next_cursor']
+    assert seen == [str(tmp_path / f'dir{index:02d}') for index in range(25)]
+    assert listings.reads == 1
+
+
+def test_prefix_filters_and_listing_refreshes_on_change(tmp_path, listings):
+    for name in ('alpha', 'beta', 'alps'):
+        (tmp_path / name).mkdir()
+
+    result = main.list_directory_suggestions(str(tmp_path / 'al'))
+    assert result['base'] == str(tmp_path)
+    assert result['dirs'][1:] == [str(tmp_path / 'alpha'), str(tmp_path / 'alps')]
+    assert result['next_cursor'] is None
+
+    (tmp_path / 'almond').mkdir()
+    result = main.list_directory_suggestions(str(tmp_path / 'al'))
+    assert result['dirs'][1] == str(tmp_path / 'almond')
+    assert listings.reads == 2
+
+
+def test_missing_directory_is_404(tmp_path, listings):
+    response = TestClient(main.app).get('/dirs', params={'path': str(tmp_path / 'nope' / 'deeper') + '/'})
+
+    assert response.status_code == 404
+
+
+def test_depth_returns_bounded_subtree(tmp_path, listings):
+    for path in ('a/x/deep', 'a/y', 'b', 'c'):
+        (tmp_path / path).mkdir(parents=True)
+
+    body = TestClient(main.app).get('/dirs', params={'path': str(tmp_path), 'depth': 2, 'limit': 2}).json()
+
+    tree = body['tree']
+    assert [child['path'] for child in tree['children']] == [str(tmp_path / 'a'), str(tmp_path / 'b')]
+    assert tree['more'] is True
+    a = tree['children'][0]
+    assert [child['path'] for child in a['children']] == [str(tmp_path / 'a' / 'x'), str(tmp_path / 'a' / 'y')]
+    assert a['children'][0]['children'] is None
+    assert tree['children'][1]['children'] == []
+    assert body['truncated'] is False
+
+
+def test_batch_reports_each_operation(tmp_path, listings):
+    (tmp_path / 'old').mkdir()
+    (tmp_path / 'full').mkdir()
+    (tmp_path / 'full' / 'file.txt').write_text('x')
+    operations = [
+        {'op': 'create', 'path': str(tmp_path / 'new' / 'nested')},
+        {'op': 'rename', 'src': str(tmp_path / 'old'), 'dst': str(tmp_path / 'renamed')},
+        {'op': 'delete', 'path': str(tmp_path / 'full')},
+        {'op': 'create', 'path': str(tmp_path / 'new')},
+        {'op': 'chmod', 'path': str(tmp_path)},
+    ]
+
+    body = TestClient(main.app).post('/dirs/batch', json={'operations': operations}).json()
+
+    assert body['status'] == 'error'
+    assert [item['status'] for item in body['results']] == ['ok', 'ok', 'error', 'error', 'error']
+    assert [item.get('status_code') for item in body['results']] == [None, None, 500, 409, 400]
+    assert (tmp_path / 'new' / 'nested').is_dir() and (tmp_path / 'renamed').is_dir()
+
+    stopped = TestClient(main.app).post(
+        '/dirs/batch',
+        json={'operations': [{'op': 'create', 'path': str(tmp_path / 'new')}, {'op': 'create', 'path': str(tmp_path / 'z')}], 'stop_on_error': True},
+    ).json()
+    assert [item['status'] for item in stopped['results']] == ['error', 'skipped']
+    assert not (tmp_path / 'z').exists()
+
+
+def test_recursive_delete_runs_as_job(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, 'JOBS', main.JobManager())
+    monkeypatch.setattr(main, 'DIR_DELETE_PROGRESS_EVERY', 10)
+    small = tmp_path / 'small'
+    (small / 'inner').mkdir(parents=True)
+    (small / 'inner' / 'file').write_text('x')
+    (small / 'link').symlink_to(tmp_path)
+    big = tmp_path / 'big'
+    for index in range(30):
+        (big / f'd{index}').mkdir(parents=True)
+        (big / f'd{index}' / 'file').write_text('x')
+
+    with TestClient(main.app) as client:
+        quick = client.post('/dirs/delete', json={'path': str(small), 'recursive': True})
+        assert quick.status_code == 200
+        assert quick.json()['result'] == {'files': 2, 'dirs': 2}
+        assert not small.exists() and tmp_path.exists()
+
+        monkeypatch.setattr(main, 'DIR_DELETE_INLINE_SECONDS', 0)
+        slow = client.post('/dirs/delete', json={'path': str(big), 'recursive': True, 'background': True})
+        assert slow.status_code == 202
+        job_id = slow.json()['job']['id']
+        deadline = time.monotonic() + 5
+        while (job := client.get(f'/api/jobs/{job_id}').json())['status'] != 'succeeded':
+            assert time.monotonic() < deadline
+            time.sleep(0.02)
+
+    assert job['result'] == {'files': 30, 'dirs': 31}
+    assert 'Deleted 10 files, 0 directories' in job['output']['lines']
+    assert not big.exists()
+
+
+
+def test_recursive_delete_waits_for_completion_by_default(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, 'JOBS', main.JobManager())
+    monkeypatch.setattr(main, 'DIR_DELETE_INLINE_SECONDS', 0)
+    tree = tmp_path / 'tree'
+    for index in range(20):
+        (tree / f'd{index}').mkdir(parents=True)
+        (tree / f'd{index}' / 'file').write_text('x')
+
+    with TestClient(main.app) as client:
+        response = client.post('/dirs/delete', json={'path': str(tree), 'recursive': True})
+
+    assert response.status_code == 200
+    assert response.json() == {'status': 'ok', 'result': {'files': 20, 'dirs': 21}}
+    assert not tree.exists()
+
+def test_parent_counts_toward_limit(tmp_path, listings):
+    for name in ('a', 'b'):
+        (tmp_path / name).mkdir()
+    client = TestClient(main.app)
+
+    first = client.get('/dirs', params={'path': str(tmp_path), 'limit': 1}).json()
+    assert first['dirs'] == [str(tmp_path.parent)]
+
+    second = client.get('/dirs', params={'path': str(tmp_path), 'limit': 1, 'cursor': first['next_cursor']}).json()
+    third = client.get('/dirs', params={'path': str(tmp_path), 'limit': 1, 'cursor': second['next_cursor']}).json()
+    assert second['dirs'] + third['dirs'] == [str(tmp_path / 'a'), str(tmp_path / 'b')]
+    assert third['next_cursor'] is None
+
+
+def test_prefix_pages_bisect_into_sorted_listing(tmp_path, listings):
+    for name in ('.hidden', 'app', 'apple', 'apricot', 'banana', 'zeta'):
+        (tmp_path / name).mkdir()
+
+    first = main.list_directory_suggestions(str(tmp_path / 'ap'), limit=2)
+    rest = main.list_directory_suggestions(str(tmp_path / 'ap'), limit=2, cursor=first['next_cursor'])
+
+    assert first['dirs'] == [str(tmp_path.parent), str(tmp_path / 'app')]
+    assert rest['dirs'] == [str(tmp_path / 'apple'), str(tmp_path / 'apricot')]
+    assert rest['next_cursor'] is None
+    assert listings.names(tmp_path) == ['.hidden', 'app', 'apple', 'apricot', 'banana', 'zeta']
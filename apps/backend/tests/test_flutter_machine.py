@@ -0,0 +1,93 @@
+import sys
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+DAEMON = r'''
+import json
+import os
+import sys
+import time
+
+
+def send(message):
+    print(json.dumps([message]), flush=True)
+
+
+print('Launching lib/main.dart on sdk gphone64 in debug mode...', flush=True)
+send({'event': 'app.start', 'params': {'appId': 'app-1', 'deviceId': sys.argv[-1], 'supportsRestart': True}})
+send({'event': 'app.started', 'params': {'appId': 'app-1'}})
+for line in sys.stdin:
+    request = json.loads(line)[0]
+    params = request['params']
+    assert request['method'] == 'app.restart' and params['appId'] == 'app-1'
+    send({'event': 'app.progress', 'params': {'appId': 'app-1', 'id': '1', 'message': 'Performing hot reload...'}})
+    time.sleep(float(os.environ.get('RELOAD_SECONDS', '0.05')))
+    if os.path.exists(os.environ['FAIL_FLAG']):
+        send({'id': request['id'], 'result': {'code': 1, 'message': 'Compilation failed'}})
+    else:
+        send({'event': 'app.log', 'params': {'appId': 'app-1', 'log': 'full' if params['fullRestart'] else 'hot'}})
+        send({'id': request['id'], 'result': {'code': 0, 'message': ''}})
+'''
+
+
+@pytest.fixture
+def flutter(tmp_path, monkeypatch):
+    script = tmp_path / 'flutter_daemon.py'
+    script.write_text(DAEMON)
+    fail_flag = tmp_path / 'fail'
+    monkeypatch.setenv('FAIL_FLAG', str(fail_flag))
+    monkeypatch.setattr(main, 'FLUTTER_COMMAND', f'{sys.executable} {script}')
+    monkeypatch.setattr(main, 'RUNNER_LOGS', main.RunnerLogStore(tmp_path / 'logs'))
+    manager = main.RunnerManager()
+    monkeypatch.setattr(main, 'RUNNER', manager)
+    manager.start_flutter(tmp_path, 'emulator-5554')
+    deadline = time.monotonic() + 5
+    while not manager.flutter_machine.app_started and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert manager.flutter_machine.app_started
+    yield fail_flag
+    manager.stop()
+
+
+def test_reload_waits_for_daemon_response(flutter):
+    client = TestClient(main.app)
+
+    hot = client.post('/runner/reload', json={'type': 'hot'})
+    restart = client.post('/runner/reload', json={'type': 'restart'})
+
+    assert hot.status_code == 200 and hot.json()['duration_ms'] >= 50
+    assert restart.json()['type'] == 'restart'
+    status = client.get('/runner/status').json()['flutter']
+    assert status['app_id'] == 'app-1'
+    assert [item['type'] for item in status['reloads']] == ['hot', 'restart']
+    assert status['reload_stats']['count'] == 2
+    assert status['reload_stats']['hot']['last_ms'] == hot.json()['duration_ms']
+
+    logs = client.get('/runner/logs').json()['flutter']
+    assert logs[0].startswith('Launching lib/main.dart')
+    assert 'Performing hot reload...' in logs and 'hot' in logs and 'full' in logs
+    assert not any(line.startswith('[{') for line in logs)
+
+
+def test_failed_reload_is_recorded(flutter):
+    client = TestClient(main.app)
+    flutter.write_text('')
+
+    response = client.post('/runner/reload', json={'type': 'hot'})
+
+    assert response.status_code == 500
+    assert response.json()['detail'] == 'Compilation failed'
+    stats = client.get('/runner/status').json()['flutter']['reload_stats']
+    assert stats == {'count': 1, 'failures': 1}
+
+
+def test_reload_without_flutter_session_is_ignored(monkeypatch):
+    monkeypatch.setattr(main, 'RUNNER', main.RunnerManager())
+
+    response = TestClient(main.app).post('/runner/reload', json={'type': 'hot'})
+
+    assert response.json() == {'status': 'ignored', 'type': 'hot'}
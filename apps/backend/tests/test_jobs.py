@@ -0,0 +1,129 @@
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+    manager = main.JobManager()
+    monkeypatch.setattr(main, 'JOBS', manager)
+    return manager
+
+
+@pytest.fixture
+def gradle(tmp_path, monkeypatch):
+    """Stand-in Gradle that prints progress and waits for a release file."""
+    release = tmp_path / 'release'
+    script = tmp_path / 'gradle'
+    script.write_text(
+        '#!/bin/sh\n'
+        'echo "> Task :app:compileDebugKotlin"\n'
+        f'while [ ! -f {release} ]; do sleep 0.02; done\n'
+        'echo "BUILD SUCCESSFUL"\n'
+    )
+    script.chmod(0o755)
+    monkeypatch.setattr(main, 'GRADLE_VIEWER', script)
+    return release
+
+
+def poll(client, job_id, predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f'/api/jobs/{job_id}').json()
+        if predicate(job):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f'job never matched: {job}')
+
+
+def test_build_runs_in_background_and_dedupes(jobs, gradle):
+    with TestClient(main.app) as client:
+        first = client.post('/api/admin/build', params={'target': 'viewer'})
+        assert first.status_code == 202
+        job_id = first.json()['job']['id']
+
+        running = poll(client, job_id, lambda job: job['output']['lines'])
+        assert running['status'] == 'running'
+        assert running['output']['lines'] == ['> Task :app:compileDebugKotlin']
+
+        second = client.post('/api/admin/build', params={'target': 'viewer'}).json()
+        assert second['created'] is False
+        assert second['job']['id'] == job_id
+
+        gradle.write_text('')
+        done = poll(client, job_id, lambda job: job['status'] == 'succeeded')
+        delta = client.get(f'/api/jobs/{job_id}', params={'since': running['output']['seq']}).json()
+        assert delta['output']['lines'] == ['BUILD SUCCESSFUL']
+        assert 'BUILD SUCCESSFUL' in done['result']
+
+        third = client.post('/api/admin/build', params={'target': 'viewer'}).json()
+        assert third['created'] is True
+        gradle.write_text('')
+        poll(client, third['job']['id'], lambda job: job['status'] == 'succeeded')
+
+
+def test_cancel_stops_running_job(jobs, gradle):
+    with TestClient(main.app) as client:
+        job_id = client.post('/api/admin/build').json()['job']['id']
+        poll(client, job_id, lambda job: job['status'] == 'running')
+
+        client.post(f'/api/jobs/{job_id}/cancel')
+
+        assert poll(client, job_id, lambda job: job['status'] == 'cancelled')['finished_at']
+        assert [job['status'] for job in client.get('/api/jobs').json()['jobs']] == ['cancelled']
+
+
+def test_wait_keeps_blocking_response(jobs, gradle):
+    gradle.write_text('')
+    with TestClient(main.app) as client:
+        response = client.post('/api/admin/build', params={'wait': True})
+
+    assert response.status_code == 200
+    assert response.json() == {'status': 'ok', 'output': '> Task :app:compileDebugKotlin\nBUILD SUCCESSFUL'}
+
+
+def test_kind_limit_queues_jobs(jobs, monkeypatch):
+    monkeypatch.setitem(main.JOB_CONCURRENCY, 'test', 1)
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def work(job):
+            await release.wait()
+            return job.id
+
+        first, _ = jobs.submit('test', 'first', work)
+        second, _ = jobs.submit('test', 'second', work)
+        await asyncio.sleep(0.05)
+        states = (first.status, second.status)
+        release.set()
+        await jobs.wait(first)
+        await jobs.wait(second)
+        return states, (first.status, second.status)
+
+    before, after = asyncio.run(scenario())
+    assert before == ('running', 'queued')
+    assert after == ('succeeded', 'succeeded')
+
+
+def test_failed_jobs_keep_error_and_are_pruned(jobs, monkeypatch):
+    monkeypatch.setattr(main, 'JOB_RETENTION_COUNT', 2)
+
+    async def fail(job):
+        job.log('about to fail')
+        raise main.HTTPException(status_code=500, detail='boom')
+
+    async def scenario():
+        for _ in range(4):
+            job, _ = jobs.submit('test', 'fail', fail)
+            await jobs.wait(job)
+        return job
+
+    last = asyncio.run(scenario())
+    assert last.status == 'failed' and last.error == 'boom'
+    assert last.to_dict(since=0)['output']['lines'] == ['about to fail']
+    assert len(jobs.list()) == 3
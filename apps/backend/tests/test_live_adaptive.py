@@ -0,0 +1,62 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+def test_slow_delivery_steps_quality_down():
+    controller = main.LiveAdaptiveController(target_ms=200)
+    start = controller.decide('viewer').level
+
+    for _ in range(6):
+        controller.record('viewer', 200_000, 40)
+        decision = controller.decide('viewer', recv_ms=900)
+
+    assert decision.level > start
+    assert decision.interval_ms >= 600
+    assert decision.bandwidth < 300_000
+
+
+def test_fast_delivery_steps_quality_back_up():
+    controller = main.LiveAdaptiveController(target_ms=200)
+    start = controller.decide('viewer').level
+
+    for _ in range(20):
+        controller.record('viewer', 20_000, 10)
+        decision = controller.decide('viewer', recv_ms=30)
+
+    assert decision.level < start
+    assert decision.interval_ms == main.LIVE_ADAPTIVE_MIN_INTERVAL_MS
+
+
+def test_not_modified_and_long_poll_time_is_not_latency():
+    controller = main.LiveAdaptiveController(target_ms=200)
+    start = controller.decide('viewer').level
+
+    for _ in range(6):
+        controller.record('viewer', 0, 10)
+        controller.decide('viewer', recv_ms=5000)
+        controller.record('viewer', 50_000, 10, waited_ms=4000)
+        decision = controller.decide('viewer', recv_ms=4100)
+
+    assert decision.latency_ms == pytest.approx(100)
+    assert decision.level <= start
+
+
+def test_snapshot_reports_decision_headers(device_screen):
+    client = TestClient(main.app)
+
+    response = client.get('/live/snapshot', params={'format': 'jpeg', 'quality': 90, 'client': 'tablet'})
+
+    assert response.status_code == 200
+    scale, quality = main.LIVE_ADAPTIVE_LEVELS[main.LIVE_ADAPTIVE_START_LEVEL]
+    assert response.headers['x-live-quality'] == str(quality)
+    assert response.headers['x-live-size'] == f'{int(64 * scale)}x{int(32 * scale)}'
+    assert 'x-live-interval-ms' in response.headers
+
+    status = client.get('/live/adaptive').json()
+    assert status['clients'][0]['client'] == 'tablet'
+    assert status['clients'][0]['frames'] == 1
+
+    plain = client.get('/live/snapshot', params={'format': 'jpeg'})
+    assert 'x-live-quality' not in plain.headers
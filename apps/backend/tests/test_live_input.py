@@ -0,0 +1,133 @@
+import asyncio
+import os
+import time
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import main
+
+SERIAL = 'emulator-5554'
+
+
+class FakeInput:
+    """Stand-in for the device's `input` command that logs every call."""
+
+    def __init__(self, directory):
+        self.log = directory / 'input.log'
+        self.script = directory / 'bin' / 'input'
+        self.script.parent.mkdir()
+        self.install()
+
+    def install(self, body=''):
+        self.script.write_text(f'#!/bin/sh\necho "$*" >> {self.log}\n{body}\n')
+        self.script.chmod(0o755)
+
+    def calls(self):
+        return self.log.read_text().splitlines() if self.log.exists() else []
+
+    def wait_for(self, line, timeout=5):
+        deadline = time.monotonic() + timeout
+        while line not in self.calls():
+            assert time.monotonic() < deadline, self.calls()
+            time.sleep(0.02)
+
+
+@pytest.fixture
+def device_input(fake_adb, tmp_path, monkeypatch):
+    device = FakeInput(tmp_path)
+    monkeypatch.setenv('PATH', f"{device.script.parent}{os.pathsep}{os.environ['PATH']}")
+    return device
+
+
+def test_queued_moves_are_coalesced(device_input):
+    device_input.install('[ "$2" = MOVE ] && sleep 0.2; true')
+
+    with TestClient(main.app).websocket_connect('/live/input') as ws:
+        assert ws.receive_json()['type'] == 'ready'
+        ws.send_json({'type': 'down', 'x': 0, 'y': 0, 'seq': 0})
+        for index in range(1, 11):
+            ws.send_json({'type': 'move', 'x': index * 10, 'y': 0, 'seq': index})
+        ws.send_json({'type': 'up', 'x': 100, 'y': 0, 'seq': 11})
+        acks = []
+        while not acks or acks[-1]['seq'] != 11:
+            acks.append(ws.receive_json())
+
+    moves = [call for call in device_input.calls() if ' MOVE ' in call]
+    assert device_input.calls()[0] == 'motionevent DOWN 0 0'
+    assert device_input.calls()[-1] == 'motionevent UP 100 0'
+    assert moves[-1] == 'motionevent MOVE 100 0'
+    assert len(moves) < 10
+    assert sum(ack['coalesced'] for ack in acks) == 10 - len(moves)
+
+
+def test_disconnect_mid_gesture_lifts_finger(device_input):
+    with TestClient(main.app).websocket_connect('/live/input') as ws:
+        ws.receive_json()
+        ws.send_json({'type': 'down', 'x': 5, 'y': 5, 'seq': 0})
+        ws.send_json({'type': 'move', 'x': 50, 'y': 60, 'seq': 1})
+        assert ws.receive_json()['seq'] == 0
+        assert ws.receive_json()['seq'] == 1
+
+    device_input.wait_for('motionevent UP 50 60')
+    assert device_input.calls() == ['motionevent DOWN 5 5', 'motionevent MOVE 50 60', 'motionevent UP 50 60']
+
+
+def test_release_waits_for_event_in_progress(device_input):
+    device_input.install('[ "$2" = MOVE ] && sleep 0.3; true')
+
+    async def scenario():
+        channel = main.LiveInputChannel(SERIAL)
+        await channel.apply({'type': 'down', 'x': 1, 'y': 1})
+        mover = asyncio.ensure_future(channel.apply({'type': 'move', 'x': 9, 'y': 9}))
+        await asyncio.sleep(0.1)
+        await channel.release()
+        await channel.apply({'type': 'down', 'x': 2, 'y': 2})
+        await mover
+
+    asyncio.run(scenario())
+
+    assert device_input.calls() == ['motionevent DOWN 1 1', 'motionevent MOVE 9 9', 'motionevent UP 9 9']
+
+
+def test_old_android_replays_gesture_as_tap(device_input):
+    device_input.install('[ "$1" = motionevent ] && echo "Error: Unknown command: motionevent"; true')
+    channel = main.LiveInputChannel(SERIAL)
+
+    async def scenario():
+        await channel.apply({'type': 'down', 'x': 30, 'y': 40})
+        await channel.apply({'type': 'up', 'x': 30, 'y': 40})
+
+    asyncio.run(scenario())
+
+    assert channel.motionevent is False
+    assert device_input.calls()[-1] == 'tap 30 40'
+
+
+def test_transient_failure_keeps_motionevent(device_input):
+    device_input.install('[ -e {flag} ] || {{ touch {flag}; echo "device busy"; exit 1; }}'.format(flag=device_input.log.parent / 'failed'))
+    channel = main.LiveInputChannel(SERIAL)
+
+    async def scenario():
+        with pytest.raises(HTTPException):
+            await channel.apply({'type': 'down', 'x': 1, 'y': 2})
+        await channel.apply({'type': 'down', 'x': 3, 'y': 4})
+
+    asyncio.run(scenario())
+
+    assert channel.motionevent is True
+    assert channel.touch_down[:2] == (3, 4)
+
+
+def test_hung_input_command_times_out(device_input, monkeypatch):
+    device_input.install('sleep 5')
+    monkeypatch.setattr(main, 'ADB_SHELL_TIMEOUT', 0.3)
+    channel = main.LiveInputChannel(SERIAL)
+    started = time.monotonic()
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(channel.apply({'type': 'key', 'keycode': 4}))
+
+    assert 'timed out' in excinfo.value.detail
+    assert time.monotonic() - started < 2
@@ -0,0 +1,106 @@
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+SERIAL = 'emulator-5554'
+
+
+@pytest.fixture
+def device_input(fake_adb, tmp_path, monkeypatch):
+    """Stand-in for the device's `input` command that logs its arguments."""
+    log = tmp_path / 'input.log'
+    script = tmp_path / 'bin' / 'input'
+    script.parent.mkdir()
+    script.write_text(
+        '#!/bin/sh\n'
+        f'echo "$@" >> {log}\n'
+        'if [ "$2" = "999" ]; then echo "bad keycode"; exit 1; fi\n'
+    )
+    script.chmod(0o755)
+    monkeypatch.setenv('PATH', f"{script.parent}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setattr(main, 'LIVE_SCRIPTS', main.LiveScriptStore(tmp_path / 'scripts.json'))
+    monkeypatch.setattr(main, 'LIVE_RECORDER', main.LiveRecorder())
+    return log
+
+
+def test_script_runs_all_steps_in_one_shell_call(device_input, fake_adb):
+    client = TestClient(main.app)
+    steps = [
+        {'op': 'tap', 'x': 10, 'y': 20},
+        {'op': 'sleep', 'ms': 10},
+        {'op': 'text', 'text': "it's here"},
+        {'op': 'key', 'keycode': 66},
+        {'op': 'swipe', 'x': 1, 'y': 2, 'x2': 3, 'y2': 4},
+    ]
+
+    response = client.post('/live/script', json={'steps': steps, 'save_as': 'smoke'})
+
+    assert response.status_code == 200
+    assert response.json()['steps'] == 5
+    assert device_input.read_text().splitlines() == [
+        'tap 10 20',
+        "text it's%shere",
+        'keyevent 66',
+        'swipe 1 2 3 4 300',
+    ]
+    assert fake_adb.count('exec:sh') == 1
+    assert main.LIVE_SCRIPTS.get('smoke')[2] == {'op': 'text', 'text': "it's here"}
+
+
+def test_script_stops_at_failing_step(device_input):
+    client = TestClient(main.app)
+    steps = [{'op': 'key', 'keycode': 4}, {'op': 'key', 'keycode': 999}, {'op': 'key', 'keycode': 3}]
+
+    response = client.post('/live/script', json={'steps': steps})
+
+    assert response.status_code == 500
+    assert response.json()['detail'] == {'failed_step': 1, 'completed': 1, 'error': 'bad keycode'}
+    assert device_input.read_text().splitlines() == ['keyevent 4', 'keyevent 999']
+
+
+def test_invalid_step_is_rejected(device_input):
+    client = TestClient(main.app)
+
+    response = client.post('/live/script', json={'steps': [{'op': 'tap', 'x': 1}]})
+
+    assert response.status_code == 400
+
+
+def test_record_and_replay(device_input):
+    client = TestClient(main.app)
+    client.post('/live/record/start', json={})
+    client.post('/live/tap', json={'x': 5, 'y': 6})
+    client.post('/live/key', json={'keycode': 4})
+    stopped = client.post('/live/record/stop', json={'name': 'back'}).json()
+
+    ops = [step['op'] for step in stopped['steps']]
+    assert ops in (['tap', 'sleep', 'key'], ['tap', 'key'])
+
+    replay = client.post('/live/script', json={'name': 'back'})
+    assert replay.status_code == 200
+    assert device_input.read_text().splitlines()[-2:] == ['tap 5 6', 'keyevent 4']
+
+
+def test_script_longer_than_shell_timeout_is_rejected(device_input, fake_adb):
+    steps = [{'op': 'tap', 'x': 1, 'y': 1}, {'op': 'sleep', 'ms': 61_000}, {'op': 'swipe', 'x': 1, 'y': 2, 'x2': 3, 'y2': 4, 'duration_ms': 60_000}]
+
+    response = TestClient(main.app).post('/live/script', json={'steps': steps})
+
+    assert response.status_code == 400
+    assert '121.0s' in response.json()['detail']
+    assert not device_input.exists()
+    assert fake_adb.count('exec:sh') == 0
+
+
+def test_saved_scripts_are_replaced_atomically(tmp_path):
+    path = tmp_path / 'scripts.json'
+    store = main.LiveScriptStore(path)
+
+    store.save('a', [{'op': 'key', 'keycode': 3}])
+    store.save('b', [{'op': 'key', 'keycode': 4}])
+
+    assert sorted(store.load()) == ['a', 'b']
+    assert list(tmp_path.iterdir()) == [path]
@@ -0,0 +1,71 @@
+import struct
+import threading
+import zlib
+
+from fastapi.testclient import TestClient
+
+import main
+
+
+def test_unchanged_screen_answers_304(device_screen):
+    client = TestClient(main.app)
+
+    first = client.get('/live/snapshot')
+    again = client.get('/live/snapshot', headers={'If-None-Match': first.headers['etag']})
+
+    assert first.status_code == 200 and first.content.startswith(b'\x89PNG')
+    assert again.status_code == 304
+    assert again.content == b''
+    assert again.headers['etag'] == first.headers['etag']
+
+
+def test_long_poll_returns_when_screen_changes(device_screen):
+    client = TestClient(main.app)
+    etag = client.get('/live/snapshot').headers['etag']
+    changed = struct.pack('<III', 64, 32, 1) + bytes(reversed(range(256))) * 32
+    timer = threading.Timer(0.3, device_screen.write_bytes, (changed,))
+    timer.start()
+
+    try:
+        response = client.get('/live/snapshot', params={'wait': 10}, headers={'If-None-Match': etag})
+    finally:
+        timer.cancel()
+
+    assert response.status_code == 200
+    assert response.headers['etag'] != etag
+
+
+def png_pixels(data):
+    """RGB rows of a filter-0 PNG as written by encode_png_rgb."""
+    width, height = struct.unpack('>II', data[16:24])
+    offset, idat = 8, b''
+    while offset < len(data):
+        (length,) = struct.unpack('>I', data[offset : offset + 4])
+        if data[offset + 4 : offset + 8] == b'IDAT':
+            idat += data[offset + 8 : offset + 8 + length]
+        offset += 12 + length
+    raw = zlib.decompress(idat)
+    stride = width * 3 + 1
+    return width, height, b''.join(raw[y * stride + 1 : (y + 1) * stride] for y in range(height))
+
+
+def test_raw_screencap_headers_are_parsed():
+    pixels = bytes([10, 20, 30, 255, 40, 50, 60, 255])
+    legacy = main.parse_raw_screencap(struct.pack('<III', 2, 1, 1) + pixels)
+    modern = main.parse_raw_screencap(struct.pack('<IIII', 2, 1, 5, 0) + pixels)
+
+    assert (legacy.width, legacy.height, legacy.rawmode, legacy.pixels) == (2, 1, 'RGBA', pixels)
+    assert (modern.rawmode, modern.pixels) == ('BGRA', pixels)
+
+
+def test_png_without_pillow_downscales_by_decimation(device_screen, monkeypatch):
+    monkeypatch.setattr(main, 'load_pillow', lambda: None)
+
+    response = TestClient(main.app).get('/live/snapshot', params={'max_width': 32})
+
+    width, height, rgb = png_pixels(response.content)
+    source = bytes(range(256)) * 32
+    assert (width, height) == (32, 16)
+    # Every second pixel of every second row, alpha dropped.
+    assert rgb[:6] == source[0:3] + source[8:11]
+    assert rgb[32 * 3 : 32 * 3 + 3] == source[2 * 64 * 4 : 2 * 64 * 4 + 3]
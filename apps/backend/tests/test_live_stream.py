@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+import main
+
+SPS = main.H264_START_CODE + b'\x67sps'
+PPS = main.H264_START_CODE + b'\x68pps'
+IDR = main.H264_START_CODE + b'\x65idr'
+
+
+def p_frame(index):
+    return main.H264_START_CODE + b'\x41' + str(index).encode()
+
+
+@pytest.fixture
+def stream(monkeypatch):
+    # No screenrecord: units are fed through _publish directly.
+    monkeypatch.setattr(main.ScreenStream, '_run', lambda self: None)
+    return main.ScreenStream('emulator-5554', 4_000_000, None)
+
+
+def drain(queue):
+    items = []
+    while not queue.empty():
+        items.append(queue.get_nowait())
+    return items
+
+
+def test_late_joiner_is_primed_with_config_and_gop(stream):
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        stream.subscribe(loop)
+        for unit in (SPS, PPS, IDR, p_frame(1), p_frame(2)):
+            stream._publish(unit)
+        await asyncio.sleep(0)
+        late = stream.subscribe(loop)
+        return drain(late.queue), late.needs_keyframe
+
+    units, needs_keyframe = asyncio.run(scenario())
+
+    assert units == [SPS, PPS, IDR, p_frame(1), p_frame(2)]
+    assert needs_keyframe is False
+
+
+def test_gop_longer_than_queue_starts_late_joiner_at_next_keyframe(stream):
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        for unit in (SPS, PPS, IDR, *(p_frame(index) for index in range(main.LIVE_STREAM_QUEUE_SIZE))):
+            stream._publish(unit)
+        late = stream.subscribe(loop)
+        before = drain(late.queue)
+        stream._publish(p_frame(-1))
+        stream._publish(IDR)
+        await asyncio.sleep(0)
+        return before, drain(late.queue)
+
+    before, after = asyncio.run(scenario())
+
+    assert before == []
+    assert after == [SPS, PPS, IDR]
+
+
+def test_slow_client_drops_backlog_and_resumes_at_keyframe(stream):
+    async def scenario():
+        subscriber = stream.subscribe(asyncio.get_running_loop())
+        for unit in (SPS, PPS, IDR, *(p_frame(index) for index in range(main.LIVE_STREAM_QUEUE_SIZE))):
+            stream._publish(unit)
+        await asyncio.sleep(0)
+        dropped = (subscriber.dropped, subscriber.needs_keyframe, subscriber.queue.qsize())
+        stream._publish(p_frame(999))
+        stream._publish(IDR)
+        stream._publish(p_frame(1000))
+        await asyncio.sleep(0)
+        return dropped, drain(subscriber.queue)
+
+    dropped, resumed = asyncio.run(scenario())
+
+    assert dropped == (1, True, 0)
+    assert resumed == [SPS, PPS, IDR, p_frame(1000)]
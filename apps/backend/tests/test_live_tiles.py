@@ -0,0 +1,56 @@
+import struct
+
+from fastapi.testclient import TestClient
+
+import main
+
+
+def test_only_changed_tiles_are_sent(device_screen, monkeypatch):
+    monkeypatch.setattr(main, 'LIVE_TILES', main.LiveTileManager())
+    client = TestClient(main.app)
+    params = {'tile': 16, 'format': 'png'}
+
+    first = client.get('/live/tiles', params=params).json()
+    assert first['full'] is True
+    assert len(first['tiles']) == 4 * 2
+
+    pixels = bytearray(bytes(range(256)) * 32)
+    pixels[(20 * 64 + 40) * 4] ^= 0xFF
+    device_screen.write_bytes(struct.pack('<III', 64, 32, 1) + bytes(pixels))
+    delta = client.get('/live/tiles', params={**params, 'since': first['frame']}).json()
+
+    assert delta['full'] is False
+    assert delta['base'] == first['frame']
+    assert [(item['x'], item['y']) for item in delta['tiles']] == [(32, 16)]
+
+
+def test_tile_hashes_cover_partial_edge_tiles():
+    width, height = 10, 256
+    rgb = bytes(range(256)) * 30
+    changed = bytearray(rgb)
+    changed[9 * 3] ^= 1
+
+    before = main.compute_tile_hashes(rgb, width, height, 4)
+    after = main.compute_tile_hashes(bytes(changed), width, height, 4)
+
+    assert len(before) == 3 * 64
+    assert [index for index, (a, b) in enumerate(zip(before, after)) if a != b] == [2]
+
+
+def test_sessions_are_evicted_by_count_and_idle_time(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(main.time, 'monotonic', lambda: now[0])
+    manager = main.LiveTileManager(max_sessions=2, idle_seconds=60)
+
+    first = manager.session('dev', 64, 'jpeg', 70, 0, 0)
+    manager.session('dev', 64, 'jpeg', 50, 0, 0)
+    assert manager.session('dev', 64, 'jpeg', 70, 0, 0) is first
+    manager.session('dev', 32, 'jpeg', 70, 0, 0)
+
+    assert len(manager) == 2
+    assert manager.session('dev', 64, 'jpeg', 70, 0, 0) is first
+
+    now[0] += 61
+    manager.session('other', 64, 'jpeg', 70, 0, 0)
+    assert len(manager) == 1
+    assert manager.session('dev', 64, 'jpeg', 70, 0, 0) is not first
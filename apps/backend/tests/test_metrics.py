@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import main
+
+SERIAL = 'emulator-5554'
+
+
+def sample(text, line_prefix):
+    values = [line.rsplit(' ', 1)[1] for line in text.splitlines() if line.startswith(line_prefix + ' ')]
+    assert len(values) == 1, f'{line_prefix} not in output'
+    return float(values[0])
+
+
+def test_registry_renders_text_exposition_format():
+    registry = main.MetricsRegistry()
+    counter = registry.counter('demo_events_total', 'Events.', ('kind',))
+    gauge = registry.gauge('demo_depth', 'Depth.')
+    histogram = registry.histogram('demo_seconds', 'Latency.', ('op',), buckets=(0.1, 1.0))
+
+    counter.inc(1, 'say "hi"\n')
+    counter.inc(2, 'say "hi"\n')
+    gauge.inc()
+    gauge.inc()
+    gauge.dec()
+    for value in (0.05, 0.5, 3):
+        histogram.observe(value, 'read')
+
+    assert registry.render().splitlines() == [
+        '# HELP demo_events_total Events.',
+        '# TYPE demo_events_total counter',
+        'demo_events_total{kind="say \\"hi\\"\\n"} 3',
+        '# HELP demo_depth Depth.',
+        '# TYPE demo_depth gauge',
+        'demo_depth 1',
+        '# HELP demo_seconds Latency.',
+        '# TYPE demo_seconds histogram',
+        'demo_seconds_bucket{op="read",le="0.1"} 1',
+        'demo_seconds_bucket{op="read",le="1"} 2',
+        'demo_seconds_bucket{op="read",le="+Inf"} 3',
+        'demo_seconds_sum{op="read"} 3.55',
+        'demo_seconds_count{op="read"} 3',
+    ]
+
+
+def test_request_latency_is_labelled_by_route_template():
+    client = TestClient(main.app)
+    before = client.get('/metrics').text
+    key = 'codex_http_request_duration_seconds_count{method="GET",route="/api/jobs/{job_id}",status="404"}'
+    start = sample(before, key) if key + ' ' in before else 0
+
+    client.get('/api/jobs/abc')
+    client.get('/api/jobs/def')
+    response = client.get('/metrics')
+
+    assert response.headers['content-type'].startswith('text/plain; version=0.0.4')
+    assert sample(response.text, key) == start + 2
+    assert '# TYPE codex_runner_processes_running gauge' in response.text
+    assert 'codex_runner_processes_running{process="metro"} 0' in response.text
+
+
+def test_adb_commands_are_timed(fake_adb):
+    text = main.METRICS.render()
+    key = 'codex_adb_command_duration_seconds_count{command="shell",transport="native"}'
+    start = sample(text, key) if key + ' ' in text else 0
+    errors_key = 'codex_adb_command_errors_total{command="shell"}'
+    errors = sample(text, errors_key) if errors_key + ' ' in text else 0
+
+    asyncio.run(main.run_adb_async(['-s', SERIAL, 'shell', 'echo', 'ok']))
+    with pytest.raises(HTTPException):
+        asyncio.run(main.run_adb_async(['-s', SERIAL, 'shell', 'false']))
+
+    text = main.METRICS.render()
+    assert sample(text, key) == start + 1
+    assert sample(text, errors_key) == errors + 1
+
+
+def test_failed_binary_adb_call_is_not_timed(tmp_path, monkeypatch):
+    binary = tmp_path / 'adb'
+    binary.write_text('#!/bin/sh\necho "device offline"\nexit 1\n')
+    binary.chmod(0o755)
+    monkeypatch.setenv('PATH', f"{tmp_path}:{main.os.environ['PATH']}")
+    monkeypatch.setattr(main, 'ADB_NATIVE', False)
+    key = 'codex_adb_command_duration_seconds_count{command="shell",transport="binary"}'
+    text = main.METRICS.render()
+    start = sample(text, key) if key + ' ' in text else 0
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.run_adb_async(['-s', SERIAL, 'shell', 'true']))
+
+    assert excinfo.value.detail == 'device offline'
+    text = main.METRICS.render()
+    assert (sample(text, key) if key + ' ' in text else 0) == start
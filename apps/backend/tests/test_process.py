@@ -0,0 +1,88 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+import main
+
+
+def process_alive(pid):
+    try:
+        with open(f'/proc/{pid}/stat') as handle:
+            # Orphans may linger as zombies until init reaps them.
+            return handle.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except FileNotFoundError:
+        return False
+
+
+def test_run_process_captures_output_and_exit_code():
+    result = asyncio.run(main.run_process(['sh', '-c', 'echo out; echo err >&2; exit 3']))
+
+    assert result.returncode == 3
+    assert result.stdout == b'out\nerr\n'
+
+
+def test_run_process_feeds_stdin_and_splits_stderr():
+    result = asyncio.run(
+        main.run_process(['sh', '-c', 'cat; echo warn >&2'], input=b'payload', merge_stderr=False)
+    )
+
+    assert result.stdout == b'payload'
+    assert result.stderr == b'warn\n'
+
+
+def test_run_process_keeps_tail_of_large_output():
+    result = asyncio.run(main.run_process(['sh', '-c', 'seq 1 20000'], max_output=64))
+
+    assert result.truncated
+    assert len(result.stdout) == 64
+    assert result.stdout.endswith(b'19999\n20000\n')
+
+
+def test_timeout_kills_process_group(tmp_path):
+    pid_file = tmp_path / 'child.pid'
+
+    async def scenario():
+        with pytest.raises(main.CommandTimeout):
+            await main.run_process(['sh', '-c', f'sleep 30 & echo $! > {pid_file}; wait'], timeout=0.3)
+
+    asyncio.run(scenario())
+    child = int(pid_file.read_text())
+    time.sleep(0.1)
+    assert not process_alive(child)
+
+
+def test_cancel_kills_process():
+    async def scenario():
+        task = asyncio.create_task(main.run_process(['sleep', '30']))
+        await asyncio.sleep(0.2)
+        task.cancel()
+        start = time.monotonic()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return time.monotonic() - start
+
+    assert asyncio.run(scenario()) < 2
+
+
+def test_family_limits_concurrency(monkeypatch):
+    monkeypatch.setitem(main.COMMAND_CONCURRENCY, 'test', 2)
+
+    async def scenario():
+        start = time.monotonic()
+        await asyncio.gather(*(main.run_process(['sleep', '0.3'], family='test') for _ in range(4)))
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(scenario())
+    assert 0.55 < elapsed < 2
+
+
+def test_run_command_async_reports_failures():
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.run_command_async(['sh', '-c', 'echo nope; exit 1']))
+    assert excinfo.value.detail == 'nope'
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.run_command_async(['definitely-not-a-command']))
+    assert excinfo.value.detail == 'Command not found: definitely-not-a-command'
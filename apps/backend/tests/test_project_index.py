@@ -0,0 +1,126 @@
+import json
+import os
+import time
+
+from fastapi.testclient import TestClient
+
+import main
+
+
+def make_rn_project(path, package='com.example.app'):
+    path.mkdir(parents=True)
+    (path / 'package.json').write_text(json.dumps({'dependencies': {'react-native': '0.74.0'}}))
+    gradle = path / 'android' / 'app' / 'build.gradle'
+    gradle.parent.mkdir(parents=True)
+    gradle.write_text(f'android {{\n    defaultConfig {{\n        applicationId "{package}"\n    }}\n}}\n')
+
+
+def test_scan_finds_projects_and_skips_ignored_dirs(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, 'PROJECT_INDEX', main.ProjectIndex())
+    make_rn_project(tmp_path / 'apps' / 'mobile')
+    (tmp_path / 'apps' / 'flutter_app').mkdir()
+    (tmp_path / 'apps' / 'flutter_app' / 'pubspec.yaml').write_text('name: demo\n')
+    make_rn_project(tmp_path / 'node_modules' / 'vendored')
+    (tmp_path / 'link').symlink_to(tmp_path / 'apps')
+
+    response = TestClient(main.app).get('/runner/scan', params={'path': str(tmp_path), 'depth': 2}).json()
+
+    assert sorted((item['path'], item['project_type'], item['android_package']) for item in response['projects']) == [
+        (str(tmp_path / 'apps' / 'flutter_app'), 'flutter', None),
+        (str(tmp_path / 'apps' / 'mobile'), 'react-native', 'com.example.app'),
+    ]
+    shallow = main.scan_projects(tmp_path, 1)
+    assert shallow == []
+
+
+def test_repeat_scan_is_served_from_cache_until_tree_changes(tmp_path, monkeypatch):
+    index = main.ProjectIndex()
+    monkeypatch.setattr(main, 'PROJECT_INDEX', index)
+    make_rn_project(tmp_path / 'one')
+    (tmp_path / 'empty').mkdir()
+
+    assert [item['path'] for item in main.scan_projects(tmp_path, 3)] == [str(tmp_path / 'one')]
+    misses = index.misses
+    assert main.scan_projects(tmp_path, 3) == main.scan_projects(tmp_path, 3)
+    assert index.misses == misses
+
+    make_rn_project(tmp_path / 'empty' / 'two')
+    assert {item['path'] for item in main.scan_projects(tmp_path, 3)} == {
+        str(tmp_path / 'one'),
+        str(tmp_path / 'empty' / 'two'),
+    }
+
+    package_json = tmp_path / 'one' / 'package.json'
+    package_json.write_text(json.dumps({'dependencies': {'react': '18.0.0'}}))
+    stat = package_json.stat()
+    os.utime(package_json, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert [item['path'] for item in main.scan_projects(tmp_path, 3)] == [str(tmp_path / 'empty' / 'two')]
+
+
+def test_expired_entries_are_reread(tmp_path, monkeypatch):
+    index = main.ProjectIndex(ttl=0)
+    monkeypatch.setattr(main, 'PROJECT_INDEX', index)
+    make_rn_project(tmp_path / 'app', package='com.example.old')
+    assert main.scan_projects(tmp_path, 1)[0]['android_package'] == 'com.example.old'
+
+    gradle = tmp_path / 'app' / 'android' / 'app' / 'build.gradle'
+    gradle.write_text('android { defaultConfig { applicationId "com.example.new" } }\n')
+
+    assert main.scan_projects(tmp_path, 1)[0]['android_package'] == 'com.example.new'
+
+
+def test_stream_yields_projects_then_summary(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, 'PROJECT_INDEX', main.ProjectIndex())
+    for name in ('a', 'b', 'c'):
+        make_rn_project(tmp_path / 'work' / name, package=f'com.example.{name}')
+
+    response = TestClient(main.app).get('/runner/scan/stream', params={'path': str(tmp_path), 'depth': 3})
+
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    items = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(item['android_package'] for item in items[:-1]) == ['com.example.a', 'com.example.b', 'com.example.c']
+    assert {item['type'] for item in items[:-1]} == {'project'}
+    assert items[-1]['type'] == 'done' and items[-1]['projects'] == 3
+    assert not items[-1]['timed_out']
+
+
+def test_stream_stops_at_budget(tmp_path, monkeypatch):
+    class SlowIndex(main.ProjectIndex):
+        def node(self, path):
+            time.sleep(0.3)
+            return super().node(path)
+
+    monkeypatch.setattr(main, 'PROJECT_INDEX', SlowIndex())
+    (tmp_path / 'a' / 'b').mkdir(parents=True)
+
+    started = time.monotonic()
+    response = TestClient(main.app).get(
+        '/runner/scan/stream', params={'path': str(tmp_path), 'depth': 4, 'budget': 0.4, 'format': 'sse'}
+    )
+
+    assert time.monotonic() - started < 1.5
+    summary = json.loads(response.text.strip().split('\n\n')[-1].removeprefix('data: '))
+    assert summary['timed_out'] and summary['scanned'] < 3
+
+
+def test_project_files_are_parsed_once_per_change(tmp_path, monkeypatch):
+    cache = main.ProjectFileCache()
+    monkeypatch.setattr(main, 'PROJECT_FILES', cache)
+    make_rn_project(tmp_path / 'app', package='com.example.one')
+    app = tmp_path / 'app'
+
+    for _ in range(3):
+        assert main.detect_project_type(app) == 'react-native'
+        assert main.detect_android_package(app) == 'com.example.one'
+    assert cache.reads == 2
+
+    gradle = app / 'android' / 'app' / 'build.gradle'
+    gradle.write_text('android { namespace = "com.example.two" }\n')
+    assert main.detect_android_package(app) == 'com.example.two'
+    assert cache.reads == 3
+
+    gradle.unlink()
+    manifest = app / 'android' / 'app' / 'src' / 'main' / 'AndroidManifest.xml'
+    manifest.parent.mkdir(parents=True)
+    manifest.write_text('<manifest xmlns:android="http://schemas.android.com/apk/res/android" package="com.example.three">')
+    assert main.detect_android_package(app) == 'com.example.three'
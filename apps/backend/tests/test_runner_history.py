@@ -0,0 +1,116 @@
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, 'RUNNER_LOG_SEGMENT_BYTES', 2048)
+    monkeypatch.setattr(main, 'RUNNER_LOG_INDEX_STRIDE', 8)
+    store = main.RunnerLogStore(tmp_path / 'runner-logs')
+    monkeypatch.setattr(main, 'RUNNER_LOGS', store)
+    return store
+
+
+def record_run(store, lines, stream='metro', start=1000.0):
+    run = store.open_run({'project_type': 'react-native'})
+    writer = run.writer(stream)
+    for number in range(lines):
+        writer.append(f'{stream} line {number}', ts=start + number)
+    run.close()
+    return run.meta['id']
+
+
+def test_tail_and_seek_span_segments(store):
+    run_id = record_run(store, 500)
+    segments = main.log_segments(store.root / run_id, 'metro')
+    assert len(segments) > 3
+
+    tail = store.tail(run_id, 'metro', 3)
+    assert tail['total'] == 500
+    assert [entry['text'] for entry in tail['lines']] == ['metro line 497', 'metro line 498', 'metro line 499']
+
+    start = segments[2].first_line - 1
+    window = store.read(run_id, 'metro', start, 3)
+    assert [entry['line'] for entry in window['lines']] == [start, start + 1, start + 2]
+    assert window['lines'][1]['text'] == f'metro line {start + 1}'
+
+    assert store.line_at(run_id, 'metro', 1000 + 321.5) == 322
+    assert store.line_at(run_id, 'metro', 0) == 0
+    assert store.line_at(run_id, 'metro', 99999) == 500
+
+
+def test_old_segments_rotate_out(store, monkeypatch):
+    monkeypatch.setattr(main, 'RUNNER_LOG_SEGMENTS', 2)
+    run_id = record_run(store, 500)
+
+    segments = main.log_segments(store.root / run_id, 'metro')
+    assert len(segments) == 2
+    window = store.read(run_id, 'metro', 0, 1)
+    assert window['first_line'] == segments[0].first_line
+    assert window['lines'][0]['line'] == segments[0].first_line
+    assert store.tail(run_id, 'metro', 1)['lines'][0]['text'] == 'metro line 499'
+
+
+def test_search_across_runs_newest_first(store):
+    first = record_run(store, 50, stream='app')
+    second = record_run(store, 50, stream='app')
+
+    matches = store.search('LINE 42')
+    assert [(match['run'], match['line']) for match in matches] == [(second, 42), (first, 42)]
+    assert store.search('1000') == []
+    assert len(store.search('app line', limit=5)) == 5
+
+
+def test_history_endpoints(store):
+    run_id = record_run(store, 40)
+    client = TestClient(main.app)
+
+    runs = client.get('/runner/history').json()['runs']
+    assert runs[0]['id'] == run_id and runs[0]['stopped_at']
+
+    tail = client.get('/runner/history/latest/metro', params={'tail': 2}).json()
+    assert tail['run'] == run_id
+    assert [entry['line'] for entry in tail['lines']] == [38, 39]
+
+    seek = client.get(f'/runner/history/{run_id}/metro', params={'at': 1010, 'count': 1}).json()
+    assert seek['lines'][0]['text'] == 'metro line 10'
+
+    found = client.get('/runner/history/search', params={'q': 'line 7'}).json()['matches']
+    assert [match['line'] for match in found] == [7]
+
+    assert client.get('/runner/history/nope/metro').status_code == 404
+    assert client.get(f'/runner/history/{run_id}/gradle').status_code == 404
+
+
+def test_keeps_configured_number_of_runs(store, monkeypatch):
+    monkeypatch.setattr(main, 'RUNNER_LOG_RUNS', 3)
+
+    for _ in range(5):
+        record_run(store, 1)
+
+    assert len(store._run_dirs()) == 3
+
+
+def test_close_during_appends_does_not_raise(store):
+    run = store.open_run({'project_type': 'flutter'})
+    writer = run.writer('flutter')
+    errors = []
+
+    def append():
+        try:
+            for number in range(5000):
+                writer.append(f'line {number}')
+        except Exception as exc:
+            errors.append(exc)
+
+    thread = threading.Thread(target=append)
+    thread.start()
+    run.close()
+    thread.join()
+
+    assert errors == []
+    assert writer.closed
@@ -0,0 +1,151 @@
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+import main
+
+
+@pytest.fixture
+def runner(monkeypatch, tmp_path):
+    manager = main.RunnerManager()
+    monkeypatch.setattr(main, 'RUNNER', manager)
+
+    def start(name, script):
+        proc = main.RunnerProcess(
+            name=name,
+            command=['sh', '-c', script],
+            cwd=tmp_path,
+            env={'PATH': '/usr/bin:/bin'},
+            output=main.LogBuffer(signal=manager.log_signal),
+        )
+        setattr(manager, name, proc)
+        proc.start()
+        return proc
+
+    yield start
+    manager.stop()
+
+
+def wait_for_lines(proc, count, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while len(proc.output) < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(proc.output) >= count
+
+
+def test_buffer_returns_only_newer_lines():
+    buffer = main.LogBuffer(maxlen=3)
+    seqs = [buffer.append(f'line {index}') for index in range(5)]
+
+    assert [line for _, _, line in buffer.since(seqs[2])] == ['line 3', 'line 4']
+    assert buffer.since(seqs[-1]) == []
+    assert list(buffer) == ['line 2', 'line 3', 'line 4']
+    assert buffer.dropped_seq == seqs[1]
+
+
+def test_logs_since_returns_deltas_across_processes(runner):
+    client = TestClient(main.app)
+    metro = runner('metro', 'echo bundling; echo ready')
+    wait_for_lines(metro, 2)
+
+    first = client.get('/runner/logs', params={'since': 0}).json()
+    assert [(entry['stream'], entry['line']) for entry in first['lines']] == [
+        ('metro', 'bundling'),
+        ('metro', 'ready'),
+    ]
+
+    app = runner('app', 'echo installing')
+    wait_for_lines(app, 1)
+    delta = client.get('/runner/logs', params={'since': first['seq']}).json()
+    assert [entry['line'] for entry in delta['lines']] == ['installing']
+    assert delta['seq'] > first['seq']
+    assert not delta['truncated']
+
+    idle = client.get('/runner/logs', params={'since': delta['seq']}).json()
+    assert idle['lines'] == [] and idle['seq'] == delta['seq']
+
+    legacy = client.get('/runner/logs').json()
+    assert legacy == {'metro': ['bundling', 'ready'], 'app': ['installing'], 'flutter': []}
+
+
+def test_cursor_from_future_resets(runner):
+    client = TestClient(main.app)
+    wait_for_lines(runner('metro', 'echo hello'), 1)
+
+    response = client.get('/runner/logs', params={'since': main.LogBuffer.last_issued() + 1000}).json()
+
+    assert response['reset']
+    assert [entry['line'] for entry in response['lines']] == ['hello']
+
+
+def test_stream_pushes_new_lines(runner):
+    client = TestClient(main.app)
+    metro = runner('metro', 'echo one; read next; echo "$next"; sleep 5')
+    wait_for_lines(metro, 1)
+
+    with client.websocket_connect('/runner/logs/stream?since=0') as websocket:
+        first = json.loads(websocket.receive_text())
+        assert [entry['line'] for entry in first['lines']] == ['one']
+
+        metro.write('two\n')
+        second = json.loads(websocket.receive_text())
+        assert [entry['line'] for entry in second['lines']] == ['two']
+        assert second['lines'][0]['seq'] > first['seq']
+
+
+def test_stream_failure_is_logged_and_closes_socket(runner, monkeypatch, caplog):
+    def broken(since):
+        raise RuntimeError('log buffer corrupted')
+
+    monkeypatch.setattr(main.RUNNER, 'logs_since', broken)
+
+    with TestClient(main.app).websocket_connect('/runner/logs/stream?since=0') as websocket:
+        with pytest.raises(WebSocketDisconnect) as excinfo:
+            websocket.receive_text()
+
+    assert excinfo.value.code == 1011
+    assert 'Runner log stream failed' in caplog.text
+    assert 'log buffer corrupted' in caplog.text
+
+
+def buffered(manager, name, lines):
+    proc = SimpleNamespace(name=name, output=main.LogBuffer())
+    setattr(manager, name, proc)
+    return [proc.output.append(line) for line in lines]
+
+
+def test_large_backlog_is_paged_oldest_first():
+    manager = main.RunnerManager()
+    metro = buffered(manager, 'metro', ['m0', 'm1', 'm2'])
+    buffered(manager, 'app', ['a0', 'a1'])
+
+    pages, since = [], metro[0] - 1
+    while True:
+        page = manager.logs_since(since, limit=2)
+        pages.append([entry['line'] for entry in page['lines']])
+        since = page['seq']
+        if not page['more']:
+            break
+
+    assert pages == [['m0', 'm1'], ['m2', 'a0'], ['a1']]
+    assert since == main.LogBuffer.last_issued()
+
+
+def test_lines_after_the_snapshot_wait_for_the_next_call(monkeypatch):
+    manager = main.RunnerManager()
+    metro = buffered(manager, 'metro', ['m0'])
+    app = buffered(manager, 'app', ['a0', 'a1'])
+    # As if `a1` was appended after the snapshot, while the buffers were being read.
+    monkeypatch.setattr(main.LogBuffer, 'last_issued', classmethod(lambda cls: app[0]))
+
+    first = manager.logs_since(metro[0] - 1)
+    monkeypatch.undo()
+    second = manager.logs_since(first['seq'])
+
+    assert [entry['line'] for entry in first['lines']] == ['m0', 'a0']
+    assert first['seq'] == app[0]
+    assert [entry['line'] for entry in second['lines']] == ['a1']
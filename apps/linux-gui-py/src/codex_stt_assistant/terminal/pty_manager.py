@@ -85,9 +85,41 @@ class PTYManager:
             self.on_exit(status)
 
 
+# (codex_path, PATH, home) -> (resolved binary, stamp from _resolve_stamp)
+_RESOLVE_CACHE = {}
+
+
+def _resolve_stamp(resolved):
+    """Identity of the binary plus the nvm versions dir, so Node upgrades invalidate."""
+    try:
+        binary = os.stat(resolved)
+    except OSError:
+        return None
+    try:
+        nvm = os.stat(Path.home() / '.nvm' / 'versions' / 'node').st_mtime_ns
+    except OSError:
+        nvm = None
+    return (binary.st_ino, binary.st_mtime_ns, nvm)
+
+
 def _resolve_codex_path(codex_path):
     if os.environ.get("CODEX_STT_NO_TERMINAL") == "1":
         return None
+    key = (codex_path, os.environ.get('PATH', ''), str(Path.home()))
+    cached = _RESOLVE_CACHE.get(key)
+    if cached and _resolve_stamp(cached[0]) == cached[1]:
+        return cached[0]
+    resolved = _find_codex_path(codex_path)
+    stamp = _resolve_stamp(resolved) if resolved else None
+    if stamp:
+        _RESOLVE_CACHE[key] = (resolved, stamp)
+    else:
+        # Misses are not cached so a fresh install is found on the next spawn.
+        _RESOLVE_CACHE.pop(key, None)
+    return resolved
+
+
+def _find_codex_path(codex_path):
     if codex_path:
         candidate = Path(codex_path).expanduser()
         if candidate.is_absolute() and candidate.exists():
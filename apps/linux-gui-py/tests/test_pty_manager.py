@@ -0,0 +1,54 @@
+import os
+from pathlib import Path
+
+from codex_stt_assistant.terminal import pty_manager
+
+
+def _install_codex(home, version):
+    binary = home / '.nvm' / 'versions' / 'node' / version / 'bin' / 'codex'
+    binary.parent.mkdir(parents=True)
+    binary.write_text('#!/bin/sh\n')
+    binary.chmod(0o755)
+    return binary
+
+
+def test_resolve_codex_path_is_cached_until_nvm_changes(tmp_path, monkeypatch):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    monkeypatch.setenv('PATH', str(tmp_path / 'empty'))
+    monkeypatch.delenv('CODEX_STT_NO_TERMINAL', raising=False)
+    monkeypatch.setattr(pty_manager, '_RESOLVE_CACHE', {})
+    old = _install_codex(tmp_path, 'v20.11.0')
+    globs = []
+    original_glob = Path.glob
+
+    def counting_glob(self, pattern):
+        globs.append(pattern)
+        return original_glob(self, pattern)
+
+    monkeypatch.setattr(Path, 'glob', counting_glob)
+
+    assert pty_manager._resolve_codex_path('codex') == str(old)
+    assert pty_manager._resolve_codex_path('codex') == str(old)
+    assert len(globs) == 1
+
+    new = _install_codex(tmp_path, 'v22.3.0')
+    assert pty_manager._resolve_codex_path('codex') == str(new)
+    assert len(globs) == 2
+
+    os.remove(new)
+    assert pty_manager._resolve_codex_path('codex') == str(old)
+
+
+def test_missing_codex_is_not_cached(tmp_path, monkeypatch):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    monkeypatch.setenv('PATH', str(tmp_path / 'bin'))
+    monkeypatch.delenv('CODEX_STT_NO_TERMINAL', raising=False)
+    monkeypatch.setattr(pty_manager, '_RESOLVE_CACHE', {})
+
+    assert pty_manager._resolve_codex_path('codex') is None
+
+    binary = tmp_path / 'bin' / 'codex'
+    binary.parent.mkdir()
+    binary.write_text('#!/bin/sh\n')
+    binary.chmod(0o755)
+    assert pty_manager._resolve_codex_path('codex') == str(binary)